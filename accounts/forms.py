@@ -2,22 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm, AuthenticationForm, PasswordResetForm, SetPasswordForm
 from django.utils.translation import gettext_lazy as _
 from .models import CustomUser
-
-class BootstrapFormMixin:
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        for field_name, field in self.fields.items():
-            if isinstance(field.widget, (forms.TextInput, forms.EmailInput, forms.DateInput, forms.PasswordInput)):
-                field.widget.attrs.update({'class': 'form-control'})
-            elif isinstance(field.widget, forms.CheckboxInput):
-                field.widget.attrs.update({'class': 'form-check-input'})
-            
-            # Supprimons les attributs HTMX
-            # field.widget.attrs.update({
-            #     'hx-post': 'validate-field',
-            #     'hx-trigger': 'blur',
-            #     'hx-target': f'#{field_name}-errors',
-            # })
+from commonapp.forms import BootstrapFormMixin
 
 class CustomUserCreationForm(BootstrapFormMixin, UserCreationForm):
     email = forms.EmailField(
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:22
+
+import commonapp.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_accounts_cu_last_na_7f00e5_idx'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=commonapp.models.PrefixSearchIndex('last_name', name='user_last_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=commonapp.models.PrefixSearchIndex('first_name', name='user_first_name_prefix_idx'),
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.mail import send_mail
-from commonapp.models import TimestampMixin
+from commonapp.models import TimestampMixin, PrefixSearchIndex
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -43,6 +43,11 @@ class CustomUser(AbstractBaseUser, PermissionsMixin, TimestampMixin):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            models.Index(fields=['last_name', 'first_name']),
+            PrefixSearchIndex('last_name', name='user_last_name_prefix_idx'),
+            PrefixSearchIndex('first_name', name='user_first_name_prefix_idx'),
+        ]
 
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -1,6 +1,136 @@
+import copy
+import hashlib
+import json
+
 from django import forms
-from django.utils.translation import gettext_lazy as _
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language, gettext_lazy as _
 from .models import Currency, Attachment
+from config.autocomplete import AutocompleteSelect
+from config.metrics import record_cache_lookup
+from config.telemetry import timed
+from config.versions import SHARED, SHARED_MODELS, salon_version
+
+class BootstrapFormMixin:
+    """
+    Bootstrap classes (and, with ``validate_fields``, HTMX blur validation
+    against the app's ``validate_field`` endpoint) for every widget.
+
+    The attributes are worked out once per form class and stored on its
+    ``base_fields``, so instances only pay for Django's usual field copy.
+    Unbound create forms also cache their rendered HTML per form class,
+    salon, user and data version of the models behind their selects. Forms
+    whose HTML depends on other rows (fields built from live data, choices
+    excluding rows of another model) set ``render_cache`` to False.
+    """
+    validate_fields = False
+    render_cache = True
+
+    def __init__(self, *args, **kwargs):
+        cls = type(self)
+        if not cls.__dict__.get('_widgets_prepared'):
+            cls.prepare_widgets()
+        # ModelForms fill ``initial`` from the new instance's defaults; only caller-supplied values matter here.
+        self._initial_given = bool(kwargs.get('initial'))
+        super().__init__(*args, **kwargs)
+        for field_name in self.fields.keys() - self.base_fields.keys():
+            self.fields[field_name].widget.attrs.update(cls.get_widget_attrs(field_name, self.fields[field_name]))
+
+    @classmethod
+    def prepare_widgets(cls):
+        for field_name, field in list(cls.base_fields.items()):
+            attrs = cls.get_widget_attrs(field_name, field)
+            if attrs:
+                # Parent classes may share the declared field, so store a copy.
+                field = cls.base_fields[field_name] = copy.deepcopy(field)
+                field.widget.attrs.update(attrs)
+        cls._widgets_prepared = True
+
+    @classmethod
+    def get_widget_attrs(cls, field_name, field):
+        widget = field.widget
+        if isinstance(widget, forms.HiddenInput):
+            return {}
+        if isinstance(widget, forms.CheckboxInput):
+            attrs = {'class': 'form-check-input'}
+        elif isinstance(widget, forms.Select):
+            attrs = {'class': 'form-select'}
+        elif isinstance(widget, forms.Textarea):
+            attrs = {'class': 'form-control', 'rows': 3}
+        elif isinstance(widget, forms.widgets.Input):
+            attrs = {'class': 'form-control'}
+        else:
+            attrs = {}
+
+        # Widgets that already talk to the server (search filters) keep their own trigger.
+        if cls.validate_fields and 'hx-trigger' not in widget.attrs:
+            try:
+                url = reverse(f"{cls.__module__.split('.')[0]}:validate_field")
+            except NoReverseMatch:
+                return attrs
+            attrs.update({
+                'hx-post': url,
+                'hx-trigger': 'blur',
+                'hx-target': f'#{field_name}-errors',
+                'hx-vals': json.dumps({'form_class': cls.__name__}),
+            })
+        return attrs
+
+    def full_clean(self):
+        with timed('form'):
+            super().full_clean()
+
+    def render(self, template_name=None, context=None, renderer=None):
+        key = None if context is not None else self.get_render_cache_key(template_name or self.template_name)
+        if key:
+            html = cache.get(key)
+            record_cache_lookup('form_html', html is not None)
+            if html is not None:
+                return mark_safe(html)
+        html = super().render(template_name, context, renderer)
+        if key:
+            cache.set(key, str(html), getattr(settings, 'FORM_CACHE_TIMEOUT', 300))
+        return html
+
+    # Django binds these to its own render, which would bypass the cache for {{ form }}.
+    __str__ = render
+    __html__ = render
+
+    def get_render_cache_key(self, template_name):
+        """None unless this is an empty create form whose choices can be versioned."""
+        if not self.render_cache or self.is_bound or self._initial_given or getattr(getattr(self, 'instance', None), 'pk', None):
+            return None
+        if self.fields.keys() - self.base_fields.keys():
+            # Fields added per instance come from data no version covers.
+            return None
+        salon = getattr(self, 'salon', None)
+        shared, owned, widget_salons = [], [], []
+        for field in self.fields.values():
+            if isinstance(field.widget, AutocompleteSelect):
+                # The search URL carries the widget's salon.
+                widget_salons.append(getattr(field.widget.salon, 'pk', field.widget.salon))
+                continue
+            if not isinstance(field, forms.ModelChoiceField):
+                continue
+            model = field.queryset.model
+            if model._meta.label_lower in SHARED_MODELS:
+                shared.append(model)
+            elif salon is None:
+                return None
+            else:
+                owned.append(model)
+        user = getattr(self, 'user', None)
+        parts = [
+            f'{type(self).__module__}.{type(self).__name__}', template_name, self.prefix or '',
+            getattr(salon, 'pk', ''), getattr(user, 'pk', ''), get_language(), timezone.localdate().isoformat(),
+            salon_version(SHARED, *shared) if shared else '', salon_version(salon, *owned) if owned else '',
+            widget_salons,
+        ]
+        return 'form-html:' + hashlib.md5(':'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
 
 class CurrencyForm(forms.ModelForm):
     class Meta:
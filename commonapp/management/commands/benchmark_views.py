@@ -0,0 +1,111 @@
+''' End-to-end latency and query benchmark for the salon views '''
+
+import logging
+import math
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.conf import settings
+from django.test.utils import override_settings
+from django.urls import get_resolver, reverse, NoReverseMatch, URLResolver
+
+from commonapp.synthetic import SalonDataGenerator
+from config.instrumentation import record_queries
+
+BENCHMARK_NAMESPACES = ['saloon', 'saloonfinance', 'saloonservices', 'salooninventory']
+
+VALIDATE_FIELD_CASES = {
+    'saloonfinance': [('CashRegisterForm', 'name', 'Main'), ('PaymentForm', 'amount', '100'), ('TransalonForm', 'amount', '-5')],
+    'saloonservices': [('HairstyleForm', 'current_tariff', '25'), ('ShaveForm', 'amount', '15')],
+    'salooninventory': [('ItemForm', 'price', '4'), ('ItemUsedForm', 'quantity', '1'), ('ItemPurchaseForm', 'quantity', '0')],
+}
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic data at each scale and time every list, create and validate-field "
+        "endpoint through the test client. Writes to the configured database; use a scratch one. "
+        "Fails when an endpoint answers with anything but 200, since its timings would not be comparable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=[1, 5], help="Data scales to benchmark.")
+        parser.add_argument('--branches', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=20, help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per endpoint.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        failures = []
+        self.stdout.write(f"{'scale':>5}  {'endpoint':<62} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7}")
+        for scale in options['scales']:
+            data = SalonDataGenerator(chains=1, branches=options['branches'], scale=scale, seed=options['seed']).generate()
+            salon = data['salons'][0]
+            client = Client(raise_request_exception=False)
+            client.force_login(data['owners'][0])
+            # Budgets are reported here, not enforced, so every endpoint gets measured;
+            # failures show up in the status column instead of as logged tracebacks.
+            logging.getLogger('django.request').disabled = True
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], QUERY_BUDGET_RAISE=False):
+                for label, method, url, payload in self.endpoints(salon):
+                    result = self.run(client, method, url, payload, options)
+                    self.report(scale, label, result)
+                    if result['status'] != '200':
+                        failures.append(f"{label} (scale {scale}): {result['status']}")
+        if failures:
+            raise CommandError("Endpoints that did not answer 200:\n  " + "\n  ".join(failures))
+
+    def endpoints(self, salon):
+        resolver = get_resolver()
+        for namespace in BENCHMARK_NAMESPACES:
+            app_resolver = next(
+                pattern for pattern in resolver.url_patterns
+                if isinstance(pattern, URLResolver) and pattern.namespace == namespace
+            )
+            for pattern in app_resolver.url_patterns:
+                name = getattr(pattern, 'name', None) or ''
+                if not name.endswith(('_list', '_create')):
+                    continue
+                try:
+                    url = reverse(f'{namespace}:{name}', kwargs={'salon_id': salon.pk})
+                except NoReverseMatch:
+                    url = reverse(f'{namespace}:{name}')
+                yield f'{namespace}:{name}', 'get', url, None
+            for form_class, field_name, value in VALIDATE_FIELD_CASES.get(namespace, []):
+                yield (
+                    f'{namespace}:validate_field {form_class}.{field_name}', 'post',
+                    reverse(f'{namespace}:validate_field'),
+                    {'form_class': form_class, 'field_name': field_name, 'field_value': value},
+                )
+
+    def run(self, client, method, url, payload, options):
+        request = getattr(client, method)
+        for _ in range(options['warmup']):
+            request(url, payload)
+        timings, queries, statuses = [], [], set()
+        for _ in range(options['repeat']):
+            with record_queries() as recorder:
+                start = time.perf_counter()
+                response = request(url, payload)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(recorder.count)
+            statuses.add(response.status_code)
+        timings.sort()
+        return {
+            'status': '/'.join(str(status) for status in sorted(statuses)),
+            'p50': percentile(timings, 50),
+            'p95': percentile(timings, 95),
+            'p99': percentile(timings, 99),
+            'queries': max(queries),
+        }
+
+    def report(self, scale, label, result):
+        line = (
+            f"{scale:>5}  {label:<62} {result['status']:>6} {result['p50']:>8.1f} "
+            f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['queries']:>7}"
+        )
+        self.stdout.write(line if result['status'] == '200' else self.style.ERROR(line))
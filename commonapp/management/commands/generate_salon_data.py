@@ -0,0 +1,28 @@
+''' Fill the database with synthetic salon chains '''
+
+from django.core.management.base import BaseCommand
+
+from commonapp.synthetic import SalonDataGenerator
+
+class Command(BaseCommand):
+    help = "Generate synthetic salon chains with staff, services, inventory and finance records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chains', type=int, default=1, help="Number of salon trees (one owner each).")
+        parser.add_argument('--branches', type=int, default=2, help="Branch salons under each chain.")
+        parser.add_argument('--scale', type=int, default=1, help="Multiplier for per-salon record counts.")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--password', default='password', help="Password shared by every generated user.")
+
+    def handle(self, *args, **options):
+        result = SalonDataGenerator(
+            chains=options['chains'],
+            branches=options['branches'],
+            scale=options['scale'],
+            seed=options['seed'],
+            password=options['password'],
+        ).generate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(result['salons'])} salons (tag {result['tag']}). "
+            f"Owner logins: {', '.join(owner.email for owner in result['owners'])}"
+        ))
@@ -1,6 +1,12 @@
 ''' Common models for the project '''
 
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.backends.ddl_references import Statement
+from django.db.models.functions import Cast, Upper
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
 class TimestampMixin(models.Model):
@@ -10,6 +16,69 @@ class TimestampMixin(models.Model):
     class Meta:
         abstract = True
 
+class PrefixSearchIndex(models.Index):
+    """
+    Index for ``istartswith`` searches on ``field``, after the equality
+    columns in ``scope``.
+
+    PostgreSQL runs those searches as ``UPPER(field::text) LIKE UPPER(%s)``,
+    which a plain index on the column cannot serve; this one indexes that
+    expression with ``text_pattern_ops`` so prefix matches work under any
+    collation. Other databases get the expression index without the operator
+    class.
+    """
+
+    def __init__(self, field, *, scope=(), name):
+        self.search_field, self.scope = field, tuple(scope)
+        super().__init__(*map(models.F, self.scope), Upper(Cast(field, models.TextField())), name=name)
+
+    def deconstruct(self):
+        path, _args, _kwargs = super().deconstruct()
+        kwargs = {'scope': self.scope, 'name': self.name} if self.scope else {'name': self.name}
+        return path, (self.search_field,), kwargs
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        quote = schema_editor.quote_name
+        columns = [quote(model._meta.get_field(name).column) for name in self.scope]
+        columns.append(f'UPPER({quote(model._meta.get_field(self.search_field).column)}::text) text_pattern_ops')
+        return Statement(
+            'CREATE INDEX%(concurrently)s %(name)s ON %(table)s (%(columns)s)',
+            concurrently=' CONCURRENTLY' if kwargs.get('concurrently') else '',
+            name=quote(self.name), table=quote(model._meta.db_table), columns=', '.join(columns),
+        )
+
+class SalonQuerySet(models.QuerySet):
+    """
+    QuerySet for models owned by a salon.
+
+    Subclasses set ``salon_field`` when the salon is reached through a relation
+    and declare named loading ``profiles`` (``list``, ``detail``, ``export``),
+    each a dict of ``select_related`` / ``prefetch_related`` lookups.
+    """
+    salon_field = 'salon'
+    profiles = {}
+
+    def for_salon(self, salon, profile='list'):
+        queryset = self.filter(**{self.salon_field: salon})
+        return queryset.with_profile(profile) if profile else queryset
+
+    def for_owner(self, user, profile='list'):
+        queryset = self.filter(**{f'{self.salon_field}__owner': user})
+        return queryset.with_profile(profile) if profile else queryset
+
+    def with_profile(self, name):
+        profile = self.profiles[name]
+        queryset = self
+        if profile.get('select_related'):
+            queryset = queryset.select_related(*profile['select_related'])
+        if profile.get('prefetch_related'):
+            queryset = queryset.prefetch_related(*profile['prefetch_related'])
+        return queryset
+
+DEFAULT_CURRENCY_KEY = 'currency:default'
+
 class Currency(TimestampMixin):
     code = models.CharField(_("Code"), max_length=3, unique=True)
     name = models.CharField(_("Name"), max_length=50, unique=True)
@@ -20,10 +89,20 @@ class Currency(TimestampMixin):
     
     @classmethod
     def get_default(cls):
-        return cls.objects.get_or_create(
+        currency = cls.objects.get_or_create(
             code='USD',
             defaults={'name': _('US Dollar'), 'is_default': True}
         )[0]
+        # Only cache rows that are committed, so a rolled back insert is never served.
+        timeout = getattr(settings, 'DEFAULT_LOOKUP_CACHE_TIMEOUT', 300)
+        transaction.on_commit(lambda: cache.set(DEFAULT_CURRENCY_KEY, currency.pk, timeout))
+        return currency
+
+    @classmethod
+    def get_default_pk(cls):
+        """The default currency's pk, cached; used as the field default of every currency foreign key."""
+        pk = cache.get(DEFAULT_CURRENCY_KEY)
+        return cls.get_default().pk if pk is None else pk
     
     def save(self, *args, **kwargs):
         if self.is_default:
@@ -34,6 +113,11 @@ class Currency(TimestampMixin):
         verbose_name = _("Currency")
         verbose_name_plural = _("Currencies")
 
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+def forget_default_currency(sender, **kwargs):
+    cache.delete(DEFAULT_CURRENCY_KEY)
+
 class Attachment(TimestampMixin):
     file = models.FileField(_("File"), upload_to="attachments/")
     description = models.CharField(_("Description"), max_length=255)
@@ -0,0 +1,222 @@
+''' Synthetic salon data for benchmarks and local load testing '''
+
+import random
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from commonapp.models import Currency
+from saloon.models import Salon, Barber, Client, BarberType
+from saloonfinance.models import CashRegister, PaymentType, Payment, Transalon
+from saloonservices.models import Hairstyle, HairstyleTariffHistory, Shave
+from salooninventory.models import Item, ItemUsed, ItemPurchase, HairstyleRecipe, StockReservation
+
+HAIRSTYLE_NAMES = ['Fade', 'Buzz cut', 'Crew cut', 'Undercut', 'Pompadour', 'Quiff', 'Taper', 'Mohawk', 'Afro trim', 'Beard trim']
+ITEM_NAMES = ['Gel', 'Wax', 'Pomade', 'Shampoo', 'Conditioner', 'Beard oil', 'Aftershave', 'Razor blades', 'Towels', 'Hair spray']
+SUPPLIERS = ['Barber Supply Co', 'Grooming Wholesale', 'Local Market']
+
+class SalonDataGenerator:
+    """
+    Build a complete dataset for ``chains`` salon trees of ``1 + branches``
+    salons each. Per-salon volumes are multiplied by ``scale`` and every table
+    is filled with ``bulk_create``, so model ``save`` hooks and signals (tariff
+    history, stock and balance updates) are replayed here by hand instead.
+    """
+
+    def __init__(self, chains=1, branches=2, scale=1, seed=None, password='password', batch_size=1000):
+        self.chains = chains
+        self.branches = branches
+        self.scale = scale
+        self.random = random.Random(seed)
+        self.password = make_password(password)
+        self.batch_size = batch_size
+        self.tag = uuid.uuid4().hex[:8]
+        self.today = timezone.now().date()
+
+    def count(self, per_salon):
+        return max(1, per_salon * self.scale)
+
+    def days_ago(self, days=365):
+        return self.today - timedelta(days=self.random.randint(0, days))
+
+    def money(self, low, high):
+        return Decimal(self.random.randint(low * 100, high * 100)) / 100
+
+    def bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def users(self, role, count):
+        return self.bulk(get_user_model(), [
+            get_user_model()(
+                email=f"{role}{n}-{self.tag}@example.com",
+                first_name=f"{role.title()}{n}",
+                last_name=self.tag,
+                password=self.password,
+            )
+            for n in range(count)
+        ])
+
+    @transaction.atomic
+    def generate(self):
+        self.currency = Currency.get_default()
+        self.payment_type = PaymentType.get_default()
+        self.barber_types = [BarberType.objects.get_or_create(name=name)[0] for name in ('Junior', 'Senior', 'Master')]
+
+        owners = self.users('owner', self.chains)
+        salons = self.salons(owners)
+        for salon in salons:
+            self.populate(salon)
+        return {'tag': self.tag, 'owners': owners, 'salons': salons}
+
+    def salons(self, owners):
+        # Tree fields are filled in by a single rebuild once every row exists.
+        with Salon.objects.disable_mptt_updates():
+            roots = self.bulk(Salon, [
+                Salon(name=f"Chain {n} {self.tag}", owner=owner, lft=0, rght=0, tree_id=0, level=0)
+                for n, owner in enumerate(owners)
+            ])
+            branches = self.bulk(Salon, [
+                Salon(name=f"{root.name} branch {n}", owner=root.owner, parent=root, lft=0, rght=0, tree_id=0, level=0)
+                for root in roots for n in range(self.branches)
+            ])
+        Salon.objects.rebuild()
+        return roots + branches
+
+    def populate(self, salon):
+        barbers = self.bulk(Barber, [
+            Barber(
+                user=user, salon=salon, barber_type=self.random.choice(self.barber_types),
+                start_date=self.days_ago(1000), phone=f"+1555{self.random.randint(1000000, 9999999)}",
+            )
+            for user in self.users(f'barber{salon.pk}.', self.count(5))
+        ])
+        clients = self.bulk(Client, [
+            Client(user=user, salon=salon, phone=f"+1555{self.random.randint(1000000, 9999999)}")
+            for user in self.users(f'client{salon.pk}.', self.count(40))
+        ])
+        registers = self.bulk(CashRegister, [
+            CashRegister(name=name, salon=salon, currency=self.currency)
+            for name in ('Main', 'Backup')
+        ])
+        balances = {register.pk: Decimal(0) for register in registers}
+
+        hairstyles = self.bulk(Hairstyle, [
+            Hairstyle(name=name, salon=salon, currency=self.currency, current_tariff=self.money(10, 60))
+            for name in HAIRSTYLE_NAMES
+        ])
+        history = []
+        for hairstyle in hairstyles:
+            tariff = hairstyle.current_tariff
+            for months in range(3, 0, -1):
+                history.append(HairstyleTariffHistory(
+                    hairstyle=hairstyle, tariff=tariff - months,
+                    effective_date=timezone.now() - timedelta(days=30 * months),
+                ))
+            history.append(HairstyleTariffHistory(hairstyle=hairstyle, tariff=tariff))
+        self.bulk(HairstyleTariffHistory, history)
+
+        items = []
+        for name in ITEM_NAMES:
+            price = self.money(2, 30)
+            items.append(Item(
+                name=name, salon=salon, currency=self.currency, price=price,
+                amount_in_default_currency=price, current_stock=self.random.randint(50, 500),
+            ))
+        items = self.bulk(Item, items)
+        self.bulk(Item.item_purpose.through, [
+            Item.item_purpose.through(item=item, hairstyle=hairstyle)
+            for item in items for hairstyle in self.random.sample(hairstyles, 3)
+        ])
+        recipes = {
+            hairstyle.pk: self.random.sample(items, 2)
+            for hairstyle in hairstyles
+        }
+        self.bulk(HairstyleRecipe, [
+            HairstyleRecipe(hairstyle_id=hairstyle_id, item=item, quantity=1, salon=salon)
+            for hairstyle_id, recipe_items in recipes.items() for item in recipe_items
+        ])
+
+        shaves = []
+        for n in range(self.count(200)):
+            hairstyle = self.random.choice(hairstyles)
+            register = self.random.choice(registers)
+            status = self.random.choices(['COMPLETED', 'SCHEDULED', 'CANCELLED'], weights=[8, 1, 1])[0]
+            if status == 'COMPLETED':
+                balances[register.pk] += hairstyle.current_tariff
+            shaves.append(Shave(
+                barber=self.random.choice(barbers), hairstyle=hairstyle, client=self.random.choice(clients),
+                cashregister=register, amount=hairstyle.current_tariff, currency=self.currency,
+                amount_in_default_currency=hairstyle.current_tariff, date_shave=self.days_ago(), status=status,
+                salon=salon,
+            ))
+        shaves = self.bulk(Shave, shaves)
+
+        used = [
+            ItemUsed(item=item, shave=shave, barber=shave.barber, quantity=1, salon=salon)
+            for shave in shaves if shave.status == 'COMPLETED'
+            for item in recipes[shave.hairstyle_id]
+        ]
+        self.bulk(ItemUsed, used)
+
+        reservations = [
+            StockReservation(shave=shave, item=item, quantity=1, salon=salon)
+            for shave in shaves if shave.status == 'SCHEDULED'
+            for item in recipes[shave.hairstyle_id]
+        ]
+        self.bulk(StockReservation, reservations)
+        reserved = Counter(reservation.item_id for reservation in reservations)
+        for item in items:
+            item.reserved_stock = reserved[item.pk]
+        Item.objects.bulk_update(items, ['reserved_stock'])
+
+        purchases = []
+        for n in range(self.count(20)):
+            item = self.random.choice(items)
+            register = self.random.choice(registers)
+            price = self.money(20, 200)
+            quantity = self.random.randint(5, 50)
+            # Matches the ItemPurchase post_save handler, which debits the whole line.
+            balances[register.pk] -= price * quantity
+            purchases.append(ItemPurchase(
+                item=item, quantity=quantity, purchase_price=price, currency=self.currency,
+                purchase_price_in_default_currency=price, purchase_date=self.days_ago(), cashregister=register,
+                supplier=self.random.choice(SUPPLIERS), salon=salon,
+            ))
+        self.bulk(ItemPurchase, purchases)
+
+        payments = []
+        for barber in barbers:
+            for month in range(self.count(3)):
+                start = self.today - timedelta(days=30 * (month + 1))
+                amount = self.money(300, 900)
+                register = self.random.choice(registers)
+                balances[register.pk] -= amount
+                payments.append(Payment(
+                    barber=barber, amount=amount, currency=self.currency, amount_in_default_currency=amount,
+                    start_date=start, end_date=start + timedelta(days=29), date_payment=start + timedelta(days=30),
+                    payment_type=self.payment_type, cashregister=register, salon=salon,
+                ))
+        self.bulk(Payment, payments)
+
+        transactions = []
+        for n in range(self.count(30)):
+            trans_type = self.random.choice(Transalon.TransactionType.values)
+            amount = self.money(10, 300)
+            register = self.random.choice(registers)
+            balances[register.pk] += amount if trans_type == Transalon.TransactionType.INCOME else -amount
+            transactions.append(Transalon(
+                trans_name=f"{trans_type.title()} #{n}", amount=amount, currency=self.currency,
+                amount_in_default_currency=amount, date_trans=self.days_ago(), trans_type=trans_type,
+                cashregister=register, salon=salon,
+            ))
+        self.bulk(Transalon, transactions)
+
+        for register in registers:
+            register.balance = balances[register.pk]
+        CashRegister.objects.bulk_update(registers, ['balance'])
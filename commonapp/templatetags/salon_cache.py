@@ -0,0 +1,15 @@
+from django import template
+
+from config.versions import salon_version as get_salon_version
+
+register = template.Library()
+
+@register.simple_tag
+def salon_version(salon, *models):
+    """
+    Version token for fragment caching, e.g.::
+
+        {% salon_version salon 'saloonfinance.payment' 'saloon.barber' as version %}
+        {% cache 300 payment-rows salon.pk version %}...{% endcache %}
+    """
+    return get_salon_version(salon, *models)
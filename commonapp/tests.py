@@ -1,3 +1,314 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
 
-# Create your tests here.
+from django import forms
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from config.instrumentation import QueryBudgetExceeded, QueryBudgetMiddleware, _explain, record_queries, slow_queries, slow_query_wrapper
+from config.metrics import RETIRED_SNAPSHOT, collect, registry
+from config.profiling import ProfilingMiddleware
+from config.validation import FieldValidator
+from saloon.models import Salon, Barber, BarberType
+from saloonfinance.models import CashRegister
+from saloonservices.models import Hairstyle, HairstyleTariffHistory, Shave
+from salooninventory.models import Item
+from .management.commands import benchmark_views
+from .models import Currency, PrefixSearchIndex
+from .synthetic import SalonDataGenerator
+
+class CommonTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.owner = CustomUser.objects.create_user('owner@example.com', 'password')
+        cls.salon = Salon.objects.create(name='Main', owner=cls.owner)
+        cls.other_owner = CustomUser.objects.create_user('other@example.com', 'password')
+        cls.other_salon = Salon.objects.create(name='Other', owner=cls.other_owner)
+        barber_user = CustomUser.objects.create_user('barber@example.com', 'password', first_name='Bob', last_name='Barber')
+        cls.barber = Barber.objects.create(
+            user=barber_user, salon=cls.salon, barber_type=BarberType.objects.create(name='Senior'),
+            start_date=datetime.date(2024, 1, 1),
+        )
+        cls.register = CashRegister.objects.create(name='Front desk', salon=cls.salon, currency=Currency.get_default())
+        cls.fade = Hairstyle.objects.create(name='Fade', salon=cls.salon, current_tariff=10)
+        cls.other_fade = Hairstyle.objects.create(name='Fade', salon=cls.other_salon, current_tariff=12)
+
+    def setUp(self):
+        # The default currency is only cached once committed, which test transactions never are.
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.get_default()
+
+    def create_shave(self, **kwargs):
+        fields = {'barber': self.barber, 'hairstyle': self.fade, 'cashregister': self.register, 'salon': self.salon, 'amount': 10}
+        fields.update(kwargs)
+        return Shave.objects.create(**fields)
+
+class SalonQuerySetTests(CommonTestCase):
+    def test_for_salon_and_for_owner_scope_rows(self):
+        self.assertEqual(list(Hairstyle.objects.for_salon(self.salon)), [self.fade])
+        self.assertEqual(list(Hairstyle.objects.for_owner(self.other_owner)), [self.other_fade])
+
+    def test_salon_field_follows_relations(self):
+        self.assertEqual(
+            set(HairstyleTariffHistory.objects.for_salon(self.salon, profile=None).values_list('hairstyle', flat=True)),
+            {self.fade.pk},
+        )
+
+    def test_list_profile_loads_related_rows(self):
+        self.create_shave()
+        self.create_shave()
+        with self.assertNumQueries(1):
+            labels = [(shave.barber.user.get_full_name(), shave.hairstyle.name, shave.currency.code) for shave in Shave.objects.for_salon(self.salon)]
+        self.assertEqual(labels, [('Bob Barber', 'Fade', 'USD')] * 2)
+
+    def test_detail_profile_prefetches(self):
+        shave = self.create_shave()
+        with self.assertNumQueries(2):
+            loaded = Shave.objects.for_salon(self.salon, profile='detail').get(pk=shave.pk)
+            self.assertEqual((loaded.salon.name, list(loaded.items_used.all())), ('Main', []))
+
+    def test_unknown_profiles_are_errors(self):
+        with self.assertRaises(KeyError):
+            Shave.objects.for_salon(self.salon, profile='everything')
+
+class QueryBudgetTests(CommonTestCase):
+    def run_request(self, queries, **view_attributes):
+        view = type('BudgetedView', (), view_attributes)
+
+        def get_response(request):
+            for _ in range(queries):
+                list(Hairstyle.objects.filter(salon=self.salon))
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(get_response)
+        request = RequestFactory().get('/')
+        middleware.process_view(request, view, (), {})
+        return middleware(request)
+
+    def test_recorder_groups_queries_by_shape(self):
+        with record_queries() as recorder:
+            list(Hairstyle.objects.filter(salon=self.salon))
+            list(Hairstyle.objects.filter(salon=self.other_salon))
+            list(Salon.objects.all())
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual([count for _sql, count in recorder.repeated(2)], [2])
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_over_budget_requests_raise(self):
+        self.run_request(2, query_budget=2, query_repeat_threshold=None)
+        with self.assertRaisesMessage(QueryBudgetExceeded, '3 queries'):
+            self.run_request(3, query_budget=2, query_repeat_threshold=None)
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_repeated_shapes_are_flagged(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '4x SELECT'):
+            self.run_request(4, query_repeat_threshold=4)
+
+    @override_settings(QUERY_BUDGET_RAISE=True, QUERY_BUDGET_DEFAULT=1)
+    def test_undeclared_views_only_log(self):
+        with self.assertLogs('config.instrumentation', 'WARNING') as logs:
+            response = self.run_request(6)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('6x SELECT', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    def test_offenders_are_logged_otherwise(self):
+        with self.assertLogs('config.instrumentation', 'WARNING') as logs:
+            response = self.run_request(3, query_budget=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('budget 1', logs.output[0])
+
+class SyntheticDataTests(CommonTestCase):
+    def test_register_balances_match_the_ledger(self):
+        data = SalonDataGenerator(branches=1, seed=3).generate()
+        self.assertEqual(len(data['salons']), 2)
+        for register in CashRegister.objects.filter(salon__in=data['salons']):
+            expected = (
+                sum(shave.amount for shave in register.shaves.filter(status='COMPLETED'))
+                - sum(purchase.purchase_price * purchase.quantity for purchase in register.purchases.all())
+                - sum(payment.amount for payment in register.payments.all())
+                + sum(entry.amount if entry.trans_type == 'INCOME' else -entry.amount for entry in register.transactions.all())
+            )
+            self.assertEqual(register.balance, expected, register)
+
+class BenchmarkViewsTests(CommonTestCase):
+    class Command(benchmark_views.Command):
+        def endpoints(self, salon):
+            yield 'home', 'get', reverse('commonapp:home'), None
+            yield 'missing', 'get', '/no-such-page/', None
+
+    def test_endpoints_not_answering_200_fail_the_run(self):
+        stdout = io.StringIO()
+        with self.assertRaisesMessage(CommandError, 'missing (scale 1): 404'):
+            call_command(self.Command(), scales=[1], repeat=1, warmup=0, stdout=stdout)
+        self.assertIn('home', stdout.getvalue())
+        self.assertNotIn('home (scale 1)', stdout.getvalue())
+
+class ServerTimingTests(CommonTestCase):
+    def test_header_and_log_line_break_the_request_down(self):
+        self.client.force_login(self.owner)
+        with self.assertLogs('config.telemetry', 'INFO') as logs:
+            response = self.client.get(reverse('salooninventory:available_to_promise', kwargs={'salon_id': self.salon.pk}))
+        phases = {part.split(';')[0].strip() for part in response['Server-Timing'].split(',')}
+        self.assertEqual(phases, {'db', 'template', 'form', 'app', 'total'})
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            {key: entry[key] for key in ('view', 'method', 'status', 'salon_id', 'htmx')},
+            {'view': 'salooninventory:available_to_promise', 'method': 'GET', 'status': 200, 'salon_id': self.salon.pk, 'htmx': False},
+        )
+        self.assertEqual(entry['response_bytes'], len(response.content))
+
+    def test_log_lines_stay_out_of_the_test_output(self):
+        handlers = logging.getLogger('config.telemetry').handlers
+        self.assertEqual([type(handler) for handler in handlers], [logging.NullHandler])
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_can_be_turned_off(self):
+        response = self.client.get(reverse('commonapp:home'))
+        self.assertNotIn('Server-Timing', response)
+
+class MetricsTests(CommonTestCase):
+    class NoteForm(forms.Form):
+        note = forms.CharField(max_length=5)
+
+    def lookups(self, cache_name, result):
+        return registry.counters[('salon_cache_requests_total', (('cache', cache_name), ('result', result)))]
+
+    def test_field_validation_lookups_are_counted(self):
+        misses, hits = self.lookups('field_validation', 'miss'), self.lookups('field_validation', 'hit')
+        validator = FieldValidator(self.NoteForm)
+        self.assertEqual(validator.validate(self.NoteForm, {'note': 'toolong'}, self.owner), {'note': 'Ensure this value has at most 5 characters (it has 7).'})
+        validator.validate(self.NoteForm, {'note': 'toolong'}, self.owner)
+        self.assertEqual(self.lookups('field_validation', 'miss'), misses + 1)
+        self.assertEqual(self.lookups('field_validation', 'hit'), hits + 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_scrapes_need_the_token_or_a_superuser(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        response = self.client.get(url, headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.client.force_login(CustomUser.objects.create_superuser('admin@example.com', 'password'))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_exited_workers_keep_their_totals(self):
+        process = subprocess.Popen(['true'])
+        process.wait()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, f'{process.pid}.json'), 'w') as handle:
+                json.dump({'counters': [['salon_exited_total', [], 3]], 'histograms': []}, handle)
+            key = ('salon_exited_total', ())
+            self.assertEqual(collect()[0][key], 3)
+            self.assertEqual(collect()[0][key], 3)
+            self.assertEqual(sorted(os.listdir(directory)), sorted([RETIRED_SNAPSHOT, f'{os.getpid()}.json', 'metrics.lock']))
+
+class ProfilingTests(CommonTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILING_DIR=directory.name, PROFILING_TOKEN='secret'))
+        self.directory = Path(directory.name)
+
+    def test_token_holders_can_fetch_their_profiles(self):
+        response = self.client.get(reverse('commonapp:home'), headers={'X-Profile': 'sample', 'X-Profile-Token': 'secret'})
+        profile = self.client.get(response['X-Profile-Url'], headers={'X-Profile-Token': 'secret'})
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual(profile['Content-Disposition'], f'attachment; filename="{response["X-Profile-Id"]}.folded"')
+        profile.close()
+
+    def test_pruning_skips_files_removed_by_other_workers(self):
+        for index in range(3):
+            (self.directory / f'{index}.folded').write_text('')
+            os.utime(self.directory / f'{index}.folded', (index, index))
+        # A file deleted between listing and stat() looks like a dangling link.
+        (self.directory / 'gone.folded').symlink_to(self.directory / 'missing')
+        with override_settings(PROFILING_MAX_FILES=2):
+            ProfilingMiddleware(None).prune(self.directory)
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ['1.folded', '2.folded', 'gone.folded'])
+
+    def test_other_callers_get_nothing(self):
+        response = self.client.get(reverse('commonapp:home'), headers={'X-Profile': 'sample', 'X-Profile-Token': 'wrong'})
+        self.assertNotIn('X-Profile-Url', response)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse('profile_download', args=['0' * 32])).status_code, 403)
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class SlowQueryTests(CommonTestCase):
+    def setUp(self):
+        super().setUp()
+        slow_queries.clear()
+        self.addCleanup(slow_queries.clear)
+
+    def test_slow_selects_are_recorded_with_their_plan(self):
+        with connection.execute_wrapper(slow_query_wrapper):
+            list(Hairstyle.objects.filter(salon=self.salon))
+        entry = slow_queries[-1]
+        self.assertIn('FROM "saloonservices_hairstyle"', entry['sql'])
+        self.assertIn('commonapp/tests.py', entry['origin'])
+        self.assertTrue(entry['explain'])
+        self.assertNotIn('EXPLAIN failed', entry['explain'])
+
+    def test_failed_explain_leaves_the_transaction_usable(self):
+        self.assertIn('EXPLAIN failed', _explain(connection, 'SELECT * FROM no_such_table', ()))
+        self.assertFalse(connection.needs_rollback)
+        self.assertEqual(Hairstyle.objects.filter(salon=self.salon).count(), 1)
+
+    def test_superusers_see_the_worst_queries(self):
+        with connection.execute_wrapper(slow_query_wrapper):
+            list(Hairstyle.objects.filter(salon=self.salon))
+        self.client.force_login(CustomUser.objects.create_superuser('admin@example.com', 'password'))
+        response = self.client.get(reverse('commonapp:slow_query_list'))
+        self.assertContains(response, 'saloonservices_hairstyle')
+        self.client.force_login(self.owner)
+        self.assertNotEqual(self.client.get(reverse('commonapp:slow_query_list')).status_code, 200)
+
+class HomePageTests(CommonTestCase):
+    def test_anonymous_visitors_share_a_cached_page(self):
+        hits = ('salon_cache_requests_total', (('cache', 'home_page'), ('result', 'hit')))
+        before = registry.counters[hits]
+        html = self.client.get(reverse('commonapp:home')).content
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('commonapp:home')).content, html)
+        self.assertEqual(registry.counters[hits], before + 1)
+
+    def test_hairstyles_are_ranked_by_completed_shaves(self):
+        buzz = Hairstyle.objects.create(name='Buzz', salon=self.salon, current_tariff=8)
+        self.create_shave(hairstyle=buzz, status='COMPLETED')
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('commonapp:home'))
+        self.assertEqual([hairstyle.pk for hairstyle in response.context['popular_hairstyles']][:1], [buzz.pk])
+
+    def test_logged_in_users_get_their_own_cards(self):
+        self.client.force_login(CustomUser.objects.create_superuser('admin@example.com', 'password'))
+        self.assertContains(self.client.get(reverse('commonapp:home')), reverse('commonapp:currency_list'))
+        self.client.force_login(self.owner)
+        self.assertNotContains(self.client.get(reverse('commonapp:home')), reverse('commonapp:currency_list'))
+
+class PrefixSearchIndexTests(TestCase):
+    def test_postgresql_gets_the_pattern_operator_class(self):
+        index = next(index for index in Item._meta.indexes if isinstance(index, PrefixSearchIndex))
+        editor = SimpleNamespace(connection=SimpleNamespace(vendor='postgresql'), quote_name=connection.ops.quote_name)
+        self.assertEqual(
+            str(index.create_sql(Item, editor)),
+            'CREATE INDEX "item_name_prefix_idx" ON "salooninventory_item" ("salon_id", UPPER("name"::text) text_pattern_ops)',
+        )
+        self.assertEqual(index.deconstruct()[1:], (('name',), {'scope': ('salon',), 'name': 'item_name_prefix_idx'}))
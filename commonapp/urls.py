@@ -17,4 +17,7 @@ urlpatterns = [
     path('attachments/create/', views.AttachmentCreateView.as_view(), name='attachment_create'),
     path('attachments/<int:pk>/update/', views.AttachmentUpdateView.as_view(), name='attachment_update'),
     path('attachments/<int:pk>/delete/', views.AttachmentDeleteView.as_view(), name='attachment_delete'),
+
+    # Diagnostics
+    path('slow-queries/', views.SlowQueryListView.as_view(), name='slow_query_list'),
 ]
@@ -1,8 +1,12 @@
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
 from django.shortcuts import render
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView
 from django.urls import reverse_lazy
 from django.http import HttpResponse
-from django.utils.translation import gettext_lazy as _
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language, gettext_lazy as _
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
@@ -11,26 +15,34 @@ from .models import Currency, Attachment
 from .forms import CurrencyForm, AttachmentForm, CurrencySearchForm, AttachmentSearchForm
 from saloon.models import Salon
 from saloonservices.models import Hairstyle
-from config.permissions import (
-    CanManageSalonMixin, CanReadSalonMixin, CanManageFinanceMixin,
-    is_salon_owner, is_assigned_barber
-)
+from accounts.views import SuperUserRequiredMixin
+from config.instrumentation import worst_slow_queries
+from config.metrics import record_cache_lookup
+from config.permissions import CanManageSalonMixin, CanReadSalonMixin, CanManageFinanceMixin
 
 class HomeView(TemplateView):
+    """
+    Landing page. Anonymous visitors share one cached copy of the whole page
+    per language; logged-in users get the page rendered for them, with the
+    salon and hairstyle sections taken from a shared fragment cache and their
+    own cards from a per-user one. The querysets are lazy, so cached sections
+    cost no queries. Both caches expire after HOME_PAGE_CACHE_TIMEOUT seconds.
+    """
     template_name = 'commonapp/home.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = _("Welcome to Saloon Management System")
         context['featured_salons'] = Salon.objects.filter(is_active=True)[:5]
-        context['popular_hairstyles'] = Hairstyle.objects.all().order_by('-id')[:6]
-        
+        context['popular_hairstyles'] = Hairstyle.objects.filter(salon__is_active=True).order_by('-completed_shaves_count', 'id')[:6]
+        context['home_cache_timeout'] = getattr(settings, 'HOME_PAGE_CACHE_TIMEOUT', 60)
+
         user = self.request.user
         if user.is_authenticated:
-            salon_id = self.kwargs.get('salon_id')
-            context['can_manage_currency'] = is_salon_owner(user, salon_id) or is_assigned_barber(user, salon_id)
-            context['can_manage_attachment'] = is_salon_owner(user, salon_id) or is_assigned_barber(user, salon_id)
-        
+            # The currency and attachment pages are not tied to a salon, so only superusers pass their checks.
+            context['can_manage_currency'] = user.is_superuser
+            context['can_manage_attachment'] = user.is_superuser
+
         return context
 
     @method_decorator(csrf_protect)
@@ -38,8 +50,26 @@ class HomeView(TemplateView):
         return super().dispatch(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
-        context = self.get_context_data(**kwargs)
-        return self.render_to_response(context)
+        key = self.get_page_cache_key()
+        content = cache.get(key) if key else None
+        if key:
+            record_cache_lookup('home_page', content is not None)
+        if content is not None:
+            response = HttpResponse(content)
+        else:
+            response = self.render_to_response(self.get_context_data(**kwargs))
+            if key:
+                timeout = getattr(settings, 'HOME_PAGE_CACHE_TIMEOUT', 60)
+                response.add_post_render_callback(lambda rendered: cache.set(key, rendered.content, timeout))
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def get_page_cache_key(self):
+        """The shared page key for anonymous visitors, or None when the page must be rendered."""
+        request = self.request
+        if request.user.is_authenticated or request.GET or len(get_messages(request)):
+            return None
+        return f"home-page:{get_language()}"
 
     @method_decorator(login_required)
     def post(self, request, *args, **kwargs):
@@ -139,4 +169,12 @@ class AttachmentDeleteView(LoginRequiredMixin, CanManageSalonMixin, DeleteView):
     def delete(self, request, *args, **kwargs):
         self.object = self.get_object()
         self.object.delete()
-        return HttpResponse(status=204)
\ No newline at end of file
+        return HttpResponse(status=204)
+
+class SlowQueryListView(LoginRequiredMixin, SuperUserRequiredMixin, TemplateView):
+    template_name = 'commonapp/slow_query_list.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['slow_queries'] = worst_slow_queries()
+        return context
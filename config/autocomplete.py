@@ -0,0 +1,135 @@
+''' Paged autocomplete endpoints and select widgets that load their options on demand '''
+
+import json
+
+from django import forms
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.http import urlencode
+from django.utils.translation import gettext as _
+
+from config.permissions import is_salon_owner, is_assigned_barber
+from config.salon_context import get_salon
+from saloon.models import Barber, Client
+from saloonservices.models import Hairstyle, Shave
+from salooninventory.models import Item
+
+PAGE_SIZE = 20
+
+# kind: (model, prefix-searched fields, ordering). Searches use istartswith,
+# which the PrefixSearchIndex indexes on names serve.
+SOURCES = {
+    'barber': (Barber, ('user__last_name', 'user__first_name'), ('user__last_name', 'user__first_name', 'pk')),
+    'client': (Client, ('user__last_name', 'user__first_name'), ('user__last_name', 'user__first_name', 'pk')),
+    'hairstyle': (Hairstyle, ('name',), ('name', 'pk')),
+    'item': (Item, ('name',), ('name', 'pk')),
+    'shave': (Shave, ('hairstyle__name', 'barber__user__last_name', 'barber__user__first_name'), ('-date_shave', '-pk')),
+}
+
+def search(kind, user, salon=None, term='', page=1):
+    """Return ``(objects, more)`` for one page of ``kind`` visible to ``user``, optionally in ``salon``."""
+    model, fields, ordering = SOURCES[kind]
+    queryset = model.objects.for_salon(salon, 'choices') if salon else model.objects.for_owner(user, 'choices')
+    for word in term.split():
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__istartswith': word})
+        queryset = queryset.filter(condition)
+    start = (page - 1) * PAGE_SIZE
+    objects = list(queryset.order_by(*ordering)[start:start + PAGE_SIZE + 1])
+    return objects[:PAGE_SIZE], len(objects) > PAGE_SIZE
+
+def autocomplete_view(request, kind):
+    """
+    ``?q=`` filters by prefix, ``?page=`` pages and ``?salon=`` narrows to one
+    salon. HTMX requests get ``<option>`` tags, others
+    ``{'results': [{'id', 'text'}], 'more': bool}``.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': _("Authentication required")}, status=403)
+    if kind not in SOURCES:
+        return JsonResponse({'error': _("Unknown autocomplete source")}, status=404)
+
+    salon = None
+    salon_id = request.GET.get('salon')
+    if salon_id:
+        salon = get_salon(salon_id) if salon_id.isdigit() else None
+        if salon is None or not (is_salon_owner(request.user, salon) or is_assigned_barber(request.user, salon.pk)):
+            return JsonResponse({'error': _("Invalid salon")}, status=403)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    objects, more = search(kind, request.user, salon, request.GET.get('q', '').strip(), page)
+    if getattr(request, 'htmx', False):
+        # The widget sends its current value under ``field`` so the swap keeps the selection.
+        selected = [value for value in request.GET.getlist(request.GET.get('field', '')) if value.isdigit()]
+        if selected:
+            model = SOURCES[kind][0]
+            kept = model.objects.for_salon(salon, 'choices') if salon else model.objects.for_owner(request.user, 'choices')
+            kept = list(kept.filter(pk__in=selected))
+            objects = kept + [obj for obj in objects if obj not in kept]
+        options = format_html_join('', '<option value="{}"{}>{}</option>', (
+            (obj.pk, ' selected' if str(obj.pk) in selected else '', str(obj)) for obj in objects
+        ))
+        if request.GET.get('empty') and page == 1:
+            options = format_html('<option value="">{}</option>{}', request.GET['empty'], options)
+        return HttpResponse(options)
+    return JsonResponse({'results': [{'id': obj.pk, 'text': str(obj)} for obj in objects], 'more': more})
+
+class AutocompleteSelect(forms.Select):
+    """
+    A select that renders only the empty and selected options. The rest come
+    from the autocomplete endpoint when the user focuses the select or types
+    in the search box rendered next to it, so rendering never loads the table.
+
+    Set ``salon`` (usually in the form's ``__init__``) to search one salon
+    instead of every salon of the user.
+    """
+    template_name = 'commonapp/widgets/autocomplete_select.html'
+
+    def __init__(self, kind, attrs=None, salon=None):
+        super().__init__(attrs)
+        self.kind = kind
+        self.salon = salon
+
+    def get_autocomplete_url(self):
+        url = reverse('autocomplete', args=[self.kind])
+        if self.salon:
+            url += '?' + urlencode({'salon': getattr(self.salon, 'pk', self.salon)})
+        return url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        empty_label = getattr(getattr(self.choices, 'field', None), 'empty_label', None)
+        vals = {'field': name}
+        if empty_label and not self.allow_multiple_selected:
+            vals['empty'] = str(empty_label)
+        context['widget'].update({'autocomplete_url': self.get_autocomplete_url(), 'autocomplete_vals': json.dumps(vals)})
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        field = getattr(iterator, 'field', None)
+        if field is None:
+            return super().optgroups(name, value, attrs)
+        choices = []
+        if field.empty_label is not None and not self.allow_multiple_selected:
+            choices.append(('', field.empty_label))
+        selected = [item for item in value if item not in field.empty_values]
+        if selected:
+            try:
+                choices.extend(iterator.choice(obj) for obj in iterator.queryset.filter(**{f'{field.to_field_name or "pk"}__in': selected}))
+            except (ValueError, TypeError):
+                pass
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+class AutocompleteSelectMultiple(AutocompleteSelect, forms.SelectMultiple):
+    pass
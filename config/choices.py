@@ -0,0 +1,34 @@
+''' Cached choice lists for the small select fields of salon forms '''
+
+from django.conf import settings
+from django.core.cache import cache
+
+from config.metrics import record_cache_lookup
+from config.versions import SHARED, salon_cache_key
+
+def cached_choices(queryset, salon=None, *dependencies):
+    """
+    ``(pk, label)`` pairs of ``queryset``, cached until its model (or one of
+    ``dependencies``) changes. ``queryset`` must be exactly the salon's rows
+    (``for_salon(salon)``), or the whole table for shared lookup tables when
+    ``salon`` is None.
+    """
+    key = salon_cache_key('choices', salon or SHARED, queryset.model, *dependencies, extra=queryset.model._meta.label_lower)
+    choices = cache.get(key)
+    record_cache_lookup('choices', choices is not None)
+    if choices is None:
+        choices = [(obj.pk, str(obj)) for obj in queryset]
+        cache.set(key, choices, getattr(settings, 'CHOICES_CACHE_TIMEOUT', 3600))
+    return choices
+
+def use_cached_choices(field, salon=None, *dependencies):
+    """
+    Render ``field`` from the cached choices instead of iterating its queryset.
+
+    Submitted ids are still cleaned against ``field.queryset``, so validation
+    is unchanged and only happens on POST.
+    """
+    choices = cached_choices(field.queryset, salon, *dependencies)
+    if field.empty_label is not None:
+        choices = [('', field.empty_label)] + choices
+    field.widget.choices = choices
@@ -0,0 +1,49 @@
+''' Conditional GET for salon list and report views '''
+
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from config.versions import SalonVersionMixin
+
+class ConditionalGetMixin(SalonVersionMixin):
+    """
+    Answer GET requests with 304 Not Modified while the salon version of the
+    data shown is unchanged, before any query or rendering happens.
+
+    The ETag covers the salon version, the user, the CSRF token embedded in
+    the page's forms (it rotates on login), the query string, the language and
+    whether HTMX asked for a fragment. It is skipped while flash messages are
+    pending, since they are shown only once.
+    """
+
+    def get_etag(self):
+        request = self.request
+        # get_token() masks the secret differently on every call; the secret itself is stable.
+        get_token(request)
+        parts = [
+            self.get_salon_version(),
+            str(request.user.pk),
+            request.META['CSRF_COOKIE'],
+            request.GET.urlencode(),
+            getattr(request, 'LANGUAGE_CODE', ''),
+            request.headers.get('HX-Request', ''),
+        ]
+        return '"%s"' % hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        # Runs after the salon permission mixin has set ``self.salon``.
+        if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+            return super().dispatch(request, *args, **kwargs)
+        etag = self.get_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+        # Make browsers and tablets revalidate instead of reusing a stale copy.
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['HX-Request'])
+        return response
@@ -0,0 +1,38 @@
+''' Flags for bulk deletions that make per-row bookkeeping pointless '''
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_skip_balance_reversal = ContextVar('skip_balance_reversal', default=False)
+_skip_sync_tombstones = ContextVar('skip_sync_tombstones', default=False)
+
+@contextmanager
+def skip_balance_reversal():
+    """
+    Inside this block, deleting payments, transactions and shaves does not
+    give their amounts back to the cash register: the register is being
+    deleted too.
+    """
+    token = _skip_balance_reversal.set(True)
+    try:
+        yield
+    finally:
+        _skip_balance_reversal.reset(token)
+
+def balance_reversal_skipped():
+    return _skip_balance_reversal.get()
+
+@contextmanager
+def skip_sync_tombstones():
+    """
+    Inside this block, deleted rows leave no sync tombstones: their whole
+    salon is being deleted, so no client will sync it again.
+    """
+    token = _skip_sync_tombstones.set(True)
+    try:
+        yield
+    finally:
+        _skip_sync_tombstones.reset(token)
+
+def sync_tombstones_skipped():
+    return _skip_sync_tombstones.get()
@@ -0,0 +1,51 @@
+''' HTMX list fragments: serve and cache only the table rows of salon list views '''
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from config.metrics import record_cache_lookup
+from config.versions import SalonVersionMixin
+
+class HtmxFragmentMixin(SalonVersionMixin):
+    """
+    Answer HTMX requests to a salon list view with ``fragment_template_name``
+    (the table rows and pager) instead of the full page.
+
+    Rendered fragments are cached per salon, query string and salon version, so
+    repeated searches and page flips skip the queryset and template entirely.
+    The view must set ``self.salon`` before ``get`` runs.
+    """
+    fragment_template_name = None
+
+    def is_fragment_request(self):
+        htmx = getattr(self.request, 'htmx', None)
+        return bool(self.fragment_template_name and htmx and not htmx.boosted)
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_fragment_request():
+            response = super().get(request, *args, **kwargs)
+        else:
+            key = self.get_fragment_cache_key()
+            content = cache.get(key)
+            record_cache_lookup('fragment', content is not None)
+            if content is not None:
+                response = HttpResponse(content)
+            else:
+                response = super().get(request, *args, **kwargs)
+                timeout = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300)
+                response.add_post_render_callback(lambda rendered: cache.set(key, rendered.content, timeout))
+        patch_vary_headers(response, ['HX-Request'])
+        return response
+
+    def get_template_names(self):
+        if self.is_fragment_request():
+            return [self.fragment_template_name]
+        return super().get_template_names()
+
+    def get_fragment_cache_key(self):
+        query = hashlib.md5(self.request.GET.urlencode().encode(), usedforsecurity=False).hexdigest()
+        return f"fragment:{self.model._meta.label_lower}:{self.salon.pk}:{query}:{self.get_salon_version()}"
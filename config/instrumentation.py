@@ -0,0 +1,183 @@
+''' SQL instrumentation: per-request query counting, timing, budgets and slow-query capture '''
+
+import logging
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('config.slow_queries')
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times queries and groups them by SQL shape."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Parameters are kept out of the SQL, so identical text means identical shape.
+            self.shapes[sql] += 1
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.shapes.most_common() if count >= threshold]
+
+@contextmanager
+def record_queries():
+    """Record the queries run on every database connection inside the block."""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+class QueryBudgetMiddleware:
+    """
+    Compare each request's queries against the ``query_budget`` declared on its
+    view class (or QUERY_BUDGET_DEFAULT) and flag SQL shapes repeated at least
+    ``query_repeat_threshold`` (or QUERY_BUDGET_REPEAT_THRESHOLD) times, the
+    usual sign of an N+1 loop. Views may change either on the request, or set
+    them to None to turn the check off.
+    Offenders raise QueryBudgetExceeded when QUERY_BUDGET_RAISE is set and
+    their view declares either attribute; they are logged as warnings
+    otherwise, so the admin and older views only report.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', view_func)
+        request.query_budget_declared = hasattr(view, 'query_budget') or hasattr(view, 'query_repeat_threshold')
+        request.query_budget = getattr(view, 'query_budget', getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+        request.query_repeat_threshold = getattr(view, 'query_repeat_threshold', getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', 5))
+
+    def check(self, request, recorder):
+        budget = getattr(request, 'query_budget', None)
+        threshold = getattr(request, 'query_repeat_threshold', getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', 5))
+        repeated = recorder.repeated(threshold) if threshold else []
+        over_budget = budget is not None and recorder.count > budget
+        if not (over_budget or repeated):
+            return
+
+        match = getattr(request, 'resolver_match', None)
+        lines = [
+            f"{match.view_name if match else request.path}: {recorder.count} queries "
+            f"in {recorder.duration * 1000:.1f} ms (budget {budget})"
+        ]
+        lines += [f"  {count}x {sql[:200]}" for sql, count in repeated[:5]]
+        report = "\n".join(lines)
+        if getattr(settings, 'QUERY_BUDGET_RAISE', False) and getattr(request, 'query_budget_declared', False):
+            raise QueryBudgetExceeded(report)
+        logger.warning(report)
+
+_current_view = ContextVar('slow_query_view', default=None)
+
+slow_queries = deque(maxlen=getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 500))
+
+def _origin():
+    """The innermost stack frame in app code, skipping the project-wide middleware in config/."""
+    base_dir, config_dir = str(settings.BASE_DIR), str(settings.BASE_DIR / 'config')
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = frame.filename
+        if filename.startswith(base_dir) and not filename.startswith(config_dir) and 'site-packages' not in filename:
+            return f"{filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+    return None
+
+def _explain(connection, sql, params):
+    options = {'analyze': True} if getattr(settings, 'SLOW_QUERY_EXPLAIN_ANALYZE', False) else {}
+    # Run without any execute wrappers so the EXPLAIN is neither recorded nor budgeted.
+    wrappers, connection.execute_wrappers = connection.execute_wrappers, []
+    try:
+        # In a savepoint, so a failing EXPLAIN cannot abort the caller's transaction.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix(**options)} {sql}", params)
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as exc:
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        connection.execute_wrappers = wrappers
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` recording queries slower than SLOW_QUERY_THRESHOLD_MS
+    with their parameters, originating view and frame, and for SELECTs the
+    EXPLAIN plan, into the ``slow_queries`` ring buffer and the log.
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        if duration >= getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200):
+            connection = context['connection']
+            entry = {
+                'at': timezone.now(),
+                'duration_ms': round(duration, 2),
+                'sql': sql,
+                'params': repr(params)[:1000],
+                'view': _current_view.get(),
+                'origin': _origin(),
+                'explain': None,
+            }
+            if not many and sql.lstrip()[:6].upper() == 'SELECT' and connection.features.supports_explaining_query_execution:
+                entry['explain'] = _explain(connection, sql, params)
+            slow_queries.append(entry)
+            slow_query_logger.warning(
+                "%.1f ms %s params=%s view=%s origin=%s\n%s",
+                duration, sql, entry['params'], entry['view'], entry['origin'], entry['explain'] or '',
+            )
+
+def worst_slow_queries(limit=50):
+    """Group the buffered slow queries by SQL text, slowest total time first."""
+    groups = {}
+    for entry in list(slow_queries):
+        group = groups.setdefault(entry['sql'], {**entry, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': set()})
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        if entry['duration_ms'] >= group['max_ms']:
+            group.update(max_ms=entry['duration_ms'], params=entry['params'], origin=entry['origin'], explain=entry['explain'] or group['explain'])
+        if entry['view']:
+            group['views'].add(entry['view'])
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
+
+class SlowQueryMiddleware:
+    """Install ``slow_query_wrapper`` for the duration of each request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_view.set(request.path)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(slow_query_wrapper))
+                return self.get_response(request)
+        finally:
+            _current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current_view.set(request.resolver_match.view_name)
@@ -0,0 +1,240 @@
+''' In-process metrics registry with a Prometheus text-format endpoint '''
+
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db.models.signals import pre_save, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'salon_request_duration_seconds': ('histogram', "Request latency by URL name."),
+    'salon_model_save_seconds': ('histogram', "Time between pre_save and post_save by model."),
+    'salon_signal_handler_seconds': ('histogram', "Time spent in instrumented signal handlers."),
+    'salon_cache_requests_total': ('counter', "Cache lookups by cache and result."),
+    'salon_cache_hit_ratio': ('gauge', "Share of cache lookups that were hits."),
+}
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+class Registry:
+    """
+    Thread-safe counters and histograms for one process.
+
+    With METRICS_DIR set, every process periodically writes a JSON snapshot
+    there and the scrape endpoint sums the snapshots of all live workers,
+    plus the final totals of exited ones.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self.counters[(name, _key(labels))] += amount
+
+    def observe(self, name, labels, seconds):
+        with self.lock:
+            histogram = self.histograms.setdefault((name, _key(labels)), [0] * len(BUCKETS) + [0, 0.0])
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[index] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    def snapshot(self):
+        with self.lock:
+            return _to_snapshot(self.counters, self.histograms)
+
+    def flush(self, force=False):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        now = time.monotonic()
+        if not directory or (not force and now - self.last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)):
+            return
+        self.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(path + '.tmp', path)
+
+registry = Registry()
+
+RETIRED_SNAPSHOT = 'retired.json'
+
+def _to_snapshot(counters, histograms):
+    return {
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, list(values)] for (name, labels), values in histograms.items()],
+    }
+
+def _merge(counters, histograms, snapshot):
+    for name, labels, value in snapshot['counters']:
+        counters[(name, _key(dict(labels)))] += value
+    for name, labels, values in snapshot['histograms']:
+        merged = histograms.setdefault((name, _key(dict(labels))), [0] * len(values))
+        for index, value in enumerate(values):
+            merged[index] += value
+
+def _read_snapshot(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+def directory_snapshots(directory):
+    """
+    The snapshots of the live workers in ``directory`` plus RETIRED_SNAPSHOT.
+    Snapshots of exited workers are folded into the latter and deleted, so
+    their final totals stay in every later sum and counters never go
+    backwards when workers are recycled.
+    """
+    import fcntl
+
+    with open(os.path.join(directory, 'metrics.lock'), 'w') as lock:
+        # One scrape at a time, so no snapshot is counted both on its own and as retired.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = os.path.join(directory, RETIRED_SNAPSHOT)
+        retired = _read_snapshot(retired_path) if os.path.exists(retired_path) else _to_snapshot({}, {})
+        live, dead = [], []
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            if path == retired_path:
+                continue
+            try:
+                os.kill(int(os.path.basename(path).split('.')[0]), 0)
+            except ProcessLookupError:
+                dead.append(path)
+                continue
+            except PermissionError:
+                pass
+            live.append(_read_snapshot(path))
+        if dead:
+            counters, histograms = defaultdict(float), {}
+            for snapshot in [retired] + [_read_snapshot(path) for path in dead]:
+                _merge(counters, histograms, snapshot)
+            retired = _to_snapshot(counters, histograms)
+            with open(retired_path + '.tmp', 'w') as handle:
+                json.dump(retired, handle)
+            os.replace(retired_path + '.tmp', retired_path)
+            for path in dead:
+                os.remove(path)
+        return live + [retired]
+
+def collect():
+    """Merge the snapshots of every worker, live or exited (or just this process)."""
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        snapshots = [registry.snapshot()]
+    else:
+        registry.flush(force=True)
+        snapshots = directory_snapshots(directory)
+
+    counters, histograms = defaultdict(float), {}
+    for snapshot in snapshots:
+        _merge(counters, histograms, snapshot)
+    return counters, histograms
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}' if pairs else ''
+
+def render_metrics():
+    counters, histograms = collect()
+
+    # Hit ratio gauges are derived from the hit/miss counters at scrape time.
+    lookups = defaultdict(lambda: [0, 0])
+    for (name, labels), value in counters.items():
+        if name == 'salon_cache_requests_total':
+            labels = dict(labels)
+            lookups[labels['cache']][labels['result'] == 'hit'] += value
+    gauges = {
+        ('salon_cache_hit_ratio', (('cache', cache),)): hits / (hits + misses)
+        for cache, (misses, hits) in lookups.items() if hits + misses
+    }
+
+    lines, described = [], set()
+    def describe(name):
+        if name not in described:
+            described.add(name)
+            kind, text = HELP.get(name, ('untyped', ''))
+            lines.extend([f'# HELP {name} {text}', f'# TYPE {name} {kind}'])
+
+    for (name, labels), value in sorted({**counters, **gauges}.items()):
+        describe(name)
+        lines.append(f'{name}{_labels(labels)} {value:g}')
+    for (name, labels), values in sorted(histograms.items()):
+        describe(name)
+        for bound, count in zip(BUCKETS, values):
+            lines.append(f'{name}_bucket{_labels(labels, le=bound)} {count:g}')
+        lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {values[-2]:g}')
+        lines.append(f'{name}_count{_labels(labels)} {values[-2]:g}')
+        lines.append(f'{name}_sum{_labels(labels)} {values[-1]:.6f}')
+    return '\n'.join(lines) + '\n'
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint for superusers and scrapers sending
+    ``Authorization: Bearer <METRICS_TOKEN>``. Client addresses are not
+    trusted: behind a local reverse proxy every request comes from 127.0.0.1.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    allowed = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (allowed or request.user.is_superuser):
+        raise PermissionDenied
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def record_cache_lookup(cache, hit):
+    registry.inc('salon_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+def timed_handler(func):
+    """Record the run time of a signal handler under its dotted name."""
+    name = f'{func.__module__}.{func.__name__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            registry.observe('salon_signal_handler_seconds', {'handler': name}, time.perf_counter() - start)
+    return wrapper
+
+class MetricsMiddleware:
+    """Observe request latency per URL name and flush this worker's snapshot."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        registry.observe(
+            'salon_request_duration_seconds',
+            {'view': match.view_name if match else 'unresolved', 'method': request.method},
+            time.perf_counter() - start,
+        )
+        registry.flush()
+        return response
+
+@receiver(pre_save, dispatch_uid='metrics_save_started')
+def save_started(sender, instance, **kwargs):
+    instance._metrics_save_started = time.perf_counter()
+
+@receiver(post_save, dispatch_uid='metrics_save_finished')
+def save_finished(sender, instance, **kwargs):
+    started = instance.__dict__.pop('_metrics_save_started', None)
+    if started is not None:
+        registry.observe('salon_model_save_seconds', {'model': sender._meta.label}, time.perf_counter() - started)
@@ -0,0 +1,29 @@
+''' Run independent database work concurrently from async views '''
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+def _isolated(function):
+    def run(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            # Worker threads are pooled; don't leave their connections open between requests.
+            for connection in connections.all(initialized_only=True):
+                connection.close()
+    return run
+
+async def gather_queries(*calls):
+    """
+    Run each ``(function, *args)`` in its own worker thread, and so on its own
+    database connection, and return their results in order. The total time
+    approaches that of the slowest call instead of the sum.
+
+    Each call sees its own snapshot, so only combine independent reads; the
+    queries are not counted by the request's query budget.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_isolated(function), thread_sensitive=False)(*args) for function, *args in calls
+    ))
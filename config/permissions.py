@@ -60,12 +60,14 @@ class CanManageBarbersMixin(SalonSpecificPermissionMixin):
     permission_type = 'can_manage_barbers'
 
 def is_salon_owner(user, salon_id):
+    # A loaded Salon already knows its owner, so no query is needed.
+    if isinstance(salon_id, Salon):
+        return salon_id.owner_id is not None and salon_id.owner_id == user.pk
     return user.is_salon_owner and Salon.objects.filter(id=salon_id, owner=user).exists()
 
 def is_assigned_barber(user, salon_id):
-    return user.is_barber and Salon.objects.filter(
-        barber=user, salon_id=salon_id, is_active=True
-    ).exists()
+    salon_id = salon_id.pk if isinstance(salon_id, Salon) else salon_id
+    return user.is_barber and user.barber.is_active and str(user.barber.salon_id) == str(salon_id)
 
 def assign_salon_permission(user, salon, permission_type):
     SalonPermission.objects.get_or_create(
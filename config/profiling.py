@@ -0,0 +1,135 @@
+''' Opt-in per-request profiling: cProfile dumps or sampled collapsed stacks '''
+
+import cProfile
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+
+PROFILE_MODES = {'cprofile': 'prof', 'sample': 'folded'}
+PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+def profiling_allowed(request):
+    """Superusers, and callers presenting PROFILING_TOKEN in ``X-Profile-Token``."""
+    token = getattr(settings, 'PROFILING_TOKEN', None)
+    if token and constant_time_compare(request.headers.get('X-Profile-Token', ''), token):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_superuser)
+
+def profiles_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', None) or Path(settings.BASE_DIR) / 'profiles')
+
+class StackSampler(threading.Thread):
+    """Sample one thread's Python stack at a fixed interval and count collapsed stacks."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+    def dump(self, path):
+        with open(path, 'w') as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f'{stack} {count}\n')
+
+class ProfilingMiddleware:
+    """
+    Profile a single request when it carries ``X-Profile: cprofile|sample`` or
+    ``?_profile=cprofile|sample``, and the caller is a superuser or presents
+    PROFILING_TOKEN in ``X-Profile-Token``.
+
+    ``cprofile`` stores a pstats dump (snakeviz, flameprof); ``sample`` stores
+    collapsed stacks ready for flamegraph.pl or speedscope. The download URL is
+    returned in the ``X-Profile-Url`` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.headers.get('X-Profile') or request.GET.get('_profile')
+        if mode not in PROFILE_MODES or not self.authorized(request):
+            return self.get_response(request)
+
+        profile_id = uuid.uuid4().hex
+        directory = profiles_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{profile_id}.{PROFILE_MODES[mode]}'
+
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+                profiler.dump_stats(path)
+        else:
+            sampler = StackSampler(threading.get_ident(), getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.005))
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+                sampler.dump(path)
+
+        self.prune(directory)
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Url'] = reverse('profile_download', args=[profile_id])
+        return response
+
+    def authorized(self, request):
+        return profiling_allowed(request)
+
+    def prune(self, directory):
+        keep = getattr(settings, 'PROFILING_MAX_FILES', 100)
+        # Other workers prune the same directory, so any file may vanish under us.
+        files = []
+        for path in directory.iterdir():
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        files.sort(key=lambda entry: entry[0], reverse=True)
+        for _mtime, path in files[keep:]:
+            path.unlink(missing_ok=True)
+
+def profile_download(request, profile_id):
+    if not profiling_allowed(request):
+        raise PermissionDenied
+    if not PROFILE_ID.match(profile_id):
+        raise Http404
+    for extension in PROFILE_MODES.values():
+        path = profiles_dir() / f'{profile_id}.{extension}'
+        try:
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+        except FileNotFoundError:
+            continue
+    raise Http404
@@ -0,0 +1,78 @@
+''' In-process publish/subscribe for live events streamed to browsers '''
+
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+class Broker:
+    """
+    Fan events out to the asyncio queues of the subscribers of a channel.
+
+    ``publish`` may be called from any thread (signal handlers run in sync
+    code); events reach each queue on its own event loop. Everything lives in
+    this process, so subscribers only see events published by the same worker:
+    run a single ASGI worker for live streams, or replace this with a shared
+    broker. A subscriber that falls SSE_QUEUE_SIZE events behind misses the
+    newer ones and gets a ``lost`` flag instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(maxsize=getattr(settings, 'SSE_QUEUE_SIZE', 100))
+        queue.lost = False
+        with self._lock:
+            self._subscribers.setdefault(channel, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, {})
+            subscribers.pop(queue, None)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+    def has_subscribers(self, channel):
+        return bool(self._subscribers.get(channel))
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, {}).items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it unsubscribes on its way out.
+                pass
+
+def _put(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        queue.lost = True
+
+broker = Broker()
+
+def salon_channel(salon_id):
+    return f'salon:{salon_id}'
+
+def publish_on_commit(salon_id, build_event):
+    """
+    Publish ``build_event()`` to the salon's channel once the current
+    transaction commits, so rolled back changes are never announced. Nothing is
+    built (or queried) when nobody is listening.
+    """
+    channel = salon_channel(salon_id)
+    if not broker.has_subscribers(channel):
+        return
+
+    def publish():
+        event = build_event()
+        if event is not None:
+            broker.publish(channel, event)
+
+    transaction.on_commit(publish)
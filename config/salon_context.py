@@ -0,0 +1,59 @@
+''' Shared salon context: resolve the salon of a request once for every app '''
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import Http404
+
+from config.metrics import record_cache_lookup
+from saloon.models import Salon
+
+SALON_CACHE_KEY = 'salon-context:{}'
+
+def get_salon(salon_id):
+    """
+    Fetch a salon together with its owner, or None when it does not exist.
+
+    When SALON_CONTEXT_CACHE_TIMEOUT is set, rows are kept in the cache for
+    that many seconds and dropped as soon as the salon is saved or deleted.
+    """
+    timeout = getattr(settings, 'SALON_CONTEXT_CACHE_TIMEOUT', 0)
+    key = SALON_CACHE_KEY.format(salon_id)
+    if timeout:
+        salon = cache.get(key)
+        record_cache_lookup('salon_context', salon is not None)
+        if salon is not None:
+            return salon
+    salon = Salon.objects.select_related('owner').filter(pk=salon_id).first()
+    if salon is not None and timeout:
+        cache.set(key, salon, timeout)
+    return salon
+
+def get_request_salon(request, salon_id):
+    """Return the salon attached to the request, loading it if the middleware did not."""
+    salon = getattr(request, 'salon', None)
+    if salon is None or str(salon.pk) != str(salon_id):
+        salon = get_salon(salon_id)
+        request.salon = salon
+    if salon is None:
+        raise Http404(Salon._meta.object_name + " matching query does not exist.")
+    return salon
+
+class SalonContextMiddleware:
+    """Attach ``request.salon`` for every view routed with a ``salon_id`` URL kwarg."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        salon_id = view_kwargs.get('salon_id')
+        request.salon = get_salon(salon_id) if salon_id is not None else None
+
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def invalidate_cached_salon(sender, instance, **kwargs):
+    cache.delete(SALON_CACHE_KEY.format(instance.pk))
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'crispy_forms',
     'crispy_bootstrap5',
+    'django_htmx',
     'mptt',
     'accounts',
     'commonapp',
@@ -46,17 +49,25 @@ INSTALLED_APPS = [
     'saloonfinance',
     'saloonservices',
     'salooninventory',
+    'saloonapi',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.metrics.MetricsMiddleware',
+    'config.telemetry.ServerTimingMiddleware',
+    'config.instrumentation.QueryBudgetMiddleware',
+    'config.instrumentation.SlowQueryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.salon_context.SalonContextMiddleware',
+    'config.profiling.ProfilingMiddleware',
     #'django.contrib.auth.middleware.LoginRequiredMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'django_htmx.middleware.HtmxMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -95,6 +106,29 @@ DATABASES = {
 }
 
 
+# Cache
+# The salon version counters and the caches keyed on them must be shared by
+# every worker: with a per-process LocMemCache, a write only invalidates the
+# entries of the process that handled it. Set REDIS_URL in production.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# A system check rejects process-local cache backends unless DEBUG is on or
+# tests are running; set to False for a deliberate single-process deployment.
+CACHE_REQUIRE_SHARED = not (DEBUG or sys.argv[1:2] == ['test'])
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -148,3 +182,106 @@ LOGOUT_REDIRECT_URL = 'commonapp:home'
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
+
+# Seconds a Salon row (with its owner) stays cached for the salon context
+# middleware; 0 disables the cache.
+SALON_CONTEXT_CACHE_TIMEOUT = 0
+
+# Seconds a rendered HTMX list fragment stays cached; keys include a data
+# version, so writes never serve stale rows.
+FRAGMENT_CACHE_TIMEOUT = 300
+
+# Seconds the cached choice lists of small select fields (currencies, payment
+# types, cash registers, ...) are kept; they are also keyed on the data version.
+CHOICES_CACHE_TIMEOUT = 3600
+
+# Seconds the primary keys of the default currency and payment type (used as
+# field defaults on every new row) stay cached; edits drop them at once.
+DEFAULT_LOOKUP_CACHE_TIMEOUT = 300
+
+# Seconds the rendered HTML of empty create forms stays cached, per form class,
+# salon, user and data version of the models behind their selects.
+FORM_CACHE_TIMEOUT = 300
+
+# Offline sync feed (/api/salons/<id>/sync/): rows per stream and response,
+# seconds rows must have settled before they are sent, days deletions are kept
+# (older tokens must resync from scratch) and days an uploaded batch id is
+# remembered so retries are not applied twice; prune both with ``prune_tombstones``.
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 2
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+SYNC_BATCH_RETENTION_DAYS = 7
+
+# Live register streams: seconds between keepalive comments and events buffered
+# per open stream before it is told to resync.
+SSE_KEEPALIVE_SECONDS = 15
+SSE_QUEUE_SIZE = 100
+
+# Seconds the anonymous home page, and the home page fragments shown to
+# logged-in users, are cached; the hairstyle ranking may lag by this much.
+HOME_PAGE_CACHE_TIMEOUT = 60
+
+# Salon and cash register deletions run as DeletionJobs, this many rows per
+# transaction. They start in a thread of the web process unless
+# DELETION_JOBS_IN_PROCESS is off; ``manage.py run_deletion_jobs`` runs them
+# otherwise and resumes running jobs idle for DELETION_JOB_STALE_SECONDS.
+DELETION_CHUNK_SIZE = 500
+DELETION_JOBS_IN_PROCESS = True
+DELETION_JOB_STALE_SECONDS = 600
+
+# Query budgets: views declare ``query_budget``; this applies to views that don't.
+# Identical SQL repeated this many times in one request is reported as an N+1.
+# Offending requests of views that declare a budget or threshold raise in
+# development and tests; everything else is logged.
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_REPEAT_THRESHOLD = 5
+QUERY_BUDGET_RAISE = DEBUG or sys.argv[1:2] == ['test']
+
+# Per-request db/template/form/app timing, sent as a Server-Timing header and
+# logged as JSON lines on the ``config.telemetry`` logger (to stderr, except
+# under ``manage.py test`` where they would bury the test output).
+SERVER_TIMING_ENABLED = True
+TELEMETRY_LOG_ENABLED = sys.argv[1:2] != ['test']
+
+# Metrics registry served at /metrics/. With several workers, set METRICS_DIR to
+# a directory shared by them; each writes a snapshot there every
+# METRICS_FLUSH_INTERVAL seconds and scrapes sum the snapshots. Scrapers
+# authenticate with ``Authorization: Bearer <METRICS_TOKEN>``.
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Per-request profiling (X-Profile: cprofile|sample) for superusers or callers
+# sending PROFILING_TOKEN; the newest PROFILING_MAX_FILES results are kept.
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+PROFILING_SAMPLE_INTERVAL = 0.005
+PROFILING_MAX_FILES = 100
+
+# Queries slower than this are kept (with EXPLAIN output for SELECTs) in an
+# in-memory ring buffer shown at /slow-queries/ and written to slow_queries.log.
+# EXPLAIN ANALYZE runs the statement a second time; enable it with care.
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_EXPLAIN_ANALYZE = False
+SLOW_QUERY_BUFFER_SIZE = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'telemetry': (
+            {'class': 'logging.StreamHandler', 'formatter': 'message'} if TELEMETRY_LOG_ENABLED
+            else {'class': 'logging.NullHandler'}
+        ),
+        'slow_queries': {'class': 'logging.FileHandler', 'filename': BASE_DIR / 'slow_queries.log', 'delay': True},
+    },
+    'loggers': {
+        'config.telemetry': {'handlers': ['telemetry'], 'level': 'INFO', 'propagate': False},
+        'config.instrumentation': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+        'config.slow_queries': {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False},
+    },
+}
@@ -0,0 +1,100 @@
+''' Per-request timing breakdown: Server-Timing header and structured log lines '''
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from config.instrumentation import record_queries
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timings', default=None)
+
+class RequestTimings:
+    """Wall time spent in named phases of one request, with database time split out."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.phases = {'template': 0.0, 'form': 0.0}
+
+    def add(self, phase, elapsed, db_elapsed):
+        # Queries issued while rendering or validating are reported as db time only.
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed - db_elapsed
+
+@contextmanager
+def timed(phase):
+    """Charge the time spent inside the block to ``phase`` of the current request, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start, db_start = time.perf_counter(), timings.recorder.duration
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start, timings.recorder.duration - db_start)
+
+class ServerTimingMiddleware:
+    """
+    Split each request into db, template, form and remaining Python time.
+
+    The breakdown is sent back as a ``Server-Timing`` header, readable from
+    HTMX event handlers, and logged as one JSON line on ``config.telemetry``
+    with the view name, salon id, query count and response size.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'SERVER_TIMING_ENABLED', True):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            timings = RequestTimings(recorder)
+            token = _current.set(timings)
+            try:
+                response = self.get_response(request)
+            finally:
+                _current.reset(token)
+        total = time.perf_counter() - start
+
+        durations = {'db': recorder.duration, **timings.phases}
+        durations['app'] = max(total - sum(durations.values()), 0.0)
+        durations['total'] = total
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{recorder.count} queries"' if name == 'db' else '')
+            for name, seconds in durations.items()
+        )
+        self.log(request, response, recorder, durations)
+        return response
+
+    def process_template_response(self, request, response):
+        # Template responses are rendered right after this hook returns.
+        timings = _current.get()
+        if timings is not None:
+            started, db_started = time.perf_counter(), timings.recorder.duration
+            response.add_post_render_callback(
+                lambda rendered: timings.add('template', time.perf_counter() - started, timings.recorder.duration - db_started)
+            )
+        return response
+
+    def log(self, request, response, recorder, durations):
+        match = request.resolver_match
+        salon = getattr(request, 'salon', None)
+        logger.info(json.dumps({
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'salon_id': salon.pk if salon is not None else None,
+            'htmx': request.headers.get('HX-Request') == 'true',
+            'queries': recorder.count,
+            'response_bytes': None if response.streaming else len(response.content),
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in durations.items()},
+        }))
@@ -18,12 +18,20 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
 
+from config.metrics import metrics_view
+from config.profiling import profile_download
+from config.autocomplete import autocomplete_view
+
 urlpatterns = [
     path('', include('commonapp.urls', namespace='commonapp')),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
+    path('profiles/<str:profile_id>/', profile_download, name='profile_download'),
+    path('autocomplete/<str:kind>/', autocomplete_view, name='autocomplete'),
     path('accounts/', include('accounts.urls', namespace='accounts')),
     path('saloon/', include('saloon.urls', namespace='saloon')), 
     path('finance/', include('saloonfinance.urls', namespace='saloonfinance')),
     path('services/', include('saloonservices.urls', namespace='saloonservices')),
     path('inventory/', include('salooninventory.urls', namespace='salooninventory')),
+    path('api/', include('saloonapi.urls', namespace='saloonapi')),
 ]
@@ -0,0 +1,134 @@
+''' Per-field validation for the validate_field endpoints, without building whole forms '''
+
+import hashlib
+
+from django import forms
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.utils.translation import gettext as _
+
+from commonapp.models import SalonQuerySet
+from config.metrics import record_cache_lookup
+from config.permissions import is_salon_owner, is_assigned_barber
+from config.salon_context import get_salon
+from config.versions import salon_version
+
+CONTROL_FIELDS = {'form_class', 'field_name', 'field_value', 'salon_id', 'csrfmiddlewaretoken'}
+
+class FieldValidator:
+    """
+    Validate individual fields of the registered form classes.
+
+    Only the form field's own ``clean`` runs; model choice fields check the
+    submitted ids against the salon (or the user's salons) with one EXISTS
+    query. Results are memoized in the cache: plain fields by value, choice
+    fields also by the salon version of the related model, so a deleted
+    barber or item is never reported valid from a stale entry.
+    """
+
+    timeout = 300
+
+    def __init__(self, *form_classes):
+        self.form_classes = {form_class.__name__: form_class for form_class in form_classes}
+
+    def respond(self, request):
+        """
+        Legacy requests send ``field_name``/``field_value``. Batch requests post
+        the fields themselves (e.g. via ``hx-include``) and get
+        ``{'errors': {...}, 'valid': [...]}`` back.
+        """
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': _("Authentication required")}, status=403)
+        form_class = self.form_classes.get(request.POST.get('form_class'))
+        if not form_class:
+            return JsonResponse({'error': _("Invalid form class")}, status=400)
+
+        salon = None
+        salon_id = request.POST.get('salon_id')
+        if salon_id:
+            salon = get_salon(salon_id) if salon_id.isdigit() else None
+            if salon is None or not (is_salon_owner(request.user, salon) or is_assigned_barber(request.user, salon.pk)):
+                return JsonResponse({'error': _("Invalid salon")}, status=403)
+
+        if 'field_name' in request.POST:
+            field_name = request.POST['field_name']
+            errors = self.validate(form_class, {field_name: request.POST.get('field_value')}, request.user, salon)
+            if errors.get(field_name):
+                return JsonResponse({'error': errors[field_name]}, status=400)
+            return JsonResponse({'success': _("Field is valid")})
+
+        values = {
+            name: request.POST.getlist(name) if isinstance(form_class.base_fields[name], forms.ModelMultipleChoiceField) else request.POST.get(name)
+            for name in request.POST if name not in CONTROL_FIELDS and name in form_class.base_fields
+        }
+        errors = self.validate(form_class, values, request.user, salon)
+        failed = {name: error for name, error in errors.items() if error}
+        return JsonResponse(
+            {'errors': failed, 'valid': [name for name, error in errors.items() if not error]},
+            status=400 if failed else 200,
+        )
+
+    def validate(self, form_class, values, user, salon=None):
+        """Return ``{field_name: first error message or None}``; unknown fields are skipped."""
+        keys = {}
+        for name, value in values.items():
+            field = form_class.base_fields.get(name)
+            if field is None:
+                continue
+            keys[name] = self.cache_key(form_class, name, field, value, salon)
+        cached = cache.get_many([key for key in keys.values() if key])
+
+        results = {}
+        for name, key in keys.items():
+            if key:
+                record_cache_lookup('field_validation', key in cached)
+            if key in cached:
+                results[name] = cached[key]
+                continue
+            results[name] = self.validate_field(form_class.base_fields[name], values[name], user, salon)
+            if key:
+                cache.set(key, results[name], self.timeout)
+        return results
+
+    def cache_key(self, form_class, name, field, value, salon):
+        scope = ''
+        if isinstance(field, forms.ModelChoiceField):
+            if self.is_salon_owned(field) and salon is None:
+                return None
+            scope = f"{salon.pk}:{salon_version(salon, field.queryset.model)}" if self.is_salon_owned(field) else ''
+        digest = hashlib.md5(repr(value).encode(), usedforsecurity=False).hexdigest()
+        return f"validate-field:{form_class.__module__}.{form_class.__name__}:{name}:{scope}:{digest}"
+
+    def is_salon_owned(self, field):
+        return issubclass(getattr(field.queryset.model._default_manager, '_queryset_class', object), SalonQuerySet)
+
+    def validate_field(self, field, value, user, salon):
+        try:
+            if isinstance(field, forms.ModelChoiceField):
+                self.clean_choice(field, value, user, salon)
+            else:
+                field.clean(value)
+        except ValidationError as error:
+            return str(error.messages[0])
+        return None
+
+    def clean_choice(self, field, value, user, salon):
+        values = [item for item in (value if isinstance(value, list) else [value]) if item not in field.empty_values]
+        if not values:
+            if field.required:
+                raise ValidationError(field.error_messages['required'], code='required')
+            return
+        queryset = field.queryset
+        if self.is_salon_owned(field):
+            queryset = queryset.model.objects.for_salon(salon, profile=None) if salon else queryset.model.objects.for_owner(user, profile=None)
+        key = field.to_field_name or 'pk'
+        try:
+            found = queryset.filter(**{f'{key}__in': values}).count()
+        except (ValueError, TypeError, ValidationError):
+            found = -1
+        if found != len(set(values)):
+            message = field.error_messages['invalid_choice']
+            if isinstance(field, forms.ModelMultipleChoiceField):
+                raise ValidationError(message, code='invalid_choice', params={'value': values[0]})
+            raise ValidationError(message, code='invalid_choice')
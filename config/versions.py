@@ -0,0 +1,134 @@
+''' Per-salon version counters for cache invalidation '''
+
+import hashlib
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from commonapp.models import SalonQuerySet
+from saloon.models import Salon
+
+VERSION_KEY = 'salon-version:{}:{}'
+
+# Lookup tables (and users, whose names the lists show) shared by every salon;
+# their counters live under the SHARED scope.
+SHARED = 'shared'
+SHARED_MODELS = {'commonapp.currency', 'saloonfinance.paymenttype', 'saloon.barbertype', 'accounts.customuser'}
+
+# Saves touching only these fields change nothing a salon shows: every login
+# saves ``last_login``.
+UNVERSIONED_FIELDS = {'accounts.customuser': {'last_login'}}
+
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+def get_versions(salon_id, models):
+    """
+    Return ``{label: version}`` for the given models (or ``app_label.model``
+    labels) of one salon; SHARED_MODELS are read from the SHARED scope.
+    Counters missing from the cache start at the current time in nanoseconds,
+    so an evicted counter never comes back at a value that was already used.
+    """
+    keys = {
+        VERSION_KEY.format(SHARED if _label(model) in SHARED_MODELS else salon_id, _label(model)): _label(model)
+        for model in models
+    }
+    found = cache.get_many(list(keys))
+    for key in keys.keys() - found.keys():
+        cache.add(key, time.time_ns(), None)
+        found[key] = cache.get(key)
+    return {label: found[key] for key, label in keys.items()}
+
+def salon_version(salon, *models):
+    """A short token that changes whenever any of ``models`` changes for ``salon``."""
+    salon_id = getattr(salon, 'pk', salon)
+    versions = get_versions(salon_id, models)
+    token = ':'.join(f'{label}={versions[label]}' for label in sorted(versions))
+    return hashlib.md5(token.encode(), usedforsecurity=False).hexdigest()[:16]
+
+def salon_cache_key(prefix, salon, *models, extra=''):
+    """Cache key for data of ``models`` in ``salon``; stale as soon as one of them is written."""
+    return f"{prefix}:{getattr(salon, 'pk', salon)}:{salon_version(salon, *models)}:{extra}"
+
+class SalonVersionMixin:
+    """
+    For views with ``self.salon``: the salon version of ``model`` plus
+    ``version_dependencies``, the other models whose data the view shows.
+    """
+    version_dependencies = ()
+
+    def get_salon_version(self):
+        return salon_version(self.salon, self.model, *self.version_dependencies)
+
+def bump_versions(salon_ids, *models):
+    """Invalidate every cache key built from ``models`` for these salons once the transaction commits."""
+    keys = [VERSION_KEY.format(salon_id, _label(model)) for salon_id in set(salon_ids) if salon_id for model in models]
+
+    def bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+    if keys:
+        transaction.on_commit(bump)
+
+def salon_id_for(instance):
+    """
+    The salon id of a salon-owned instance, following ``salon_field`` when it
+    spans relations, or SHARED for the shared lookup tables.
+    """
+    if isinstance(instance, Salon):
+        return instance.pk
+    if _label(instance.__class__) in SHARED_MODELS:
+        return SHARED
+    *path, field = instance.__class__._default_manager._queryset_class.salon_field.split('__')
+    for name in path:
+        try:
+            instance = getattr(instance, name)
+        except ObjectDoesNotExist:
+            return None
+        if instance is None:
+            return None
+    return getattr(instance, f'{field}_id', None)
+
+def is_versioned(model):
+    if _label(model) in SHARED_MODELS:
+        return True
+    return model is Salon or issubclass(getattr(model._default_manager, '_queryset_class', object), SalonQuerySet)
+
+def bump_salon_version(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= UNVERSIONED_FIELDS.get(_label(sender), set())):
+        return
+    bump_versions([salon_id_for(instance)], sender)
+
+def connect_version_signals():
+    """
+    Connect the counters to the versioned models only: a post_delete receiver
+    for every sender would turn off Django's fast delete for all models.
+    """
+    for model in apps.get_models():
+        if is_versioned(model):
+            post_save.connect(bump_salon_version, sender=model, dispatch_uid=f'bump_salon_version_on_save:{_label(model)}')
+            post_delete.connect(bump_salon_version, sender=model, dispatch_uid=f'bump_salon_version_on_delete:{_label(model)}')
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """The counters only invalidate other workers' cache entries through a cache they all share."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if not getattr(settings, 'CACHE_REQUIRE_SHARED', False) or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [checks.Error(
+        f"The default cache ({backend}) is local to each process, so salon version counters are not shared between workers.",
+        hint="Set REDIS_URL (or configure another shared cache), or set CACHE_REQUIRE_SHARED = False for a single process.",
+        id='saloon.E001',
+    )]
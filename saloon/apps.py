@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SaloonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'saloon'
+
+    def ready(self):
+        import config.salon_context  # noqa: F401 (connects the salon cache signals)
+        from config.versions import connect_version_signals
+        connect_version_signals()
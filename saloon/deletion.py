@@ -0,0 +1,189 @@
+''' Background deletion of salons and cash registers in bounded chunks '''
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models import F, Q
+from django.http import HttpResponse, HttpResponseRedirect
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from config.deletion import skip_balance_reversal, skip_sync_tombstones
+from config.versions import bump_versions, salon_id_for
+from .models import DeletionJob, Salon
+
+logger = logging.getLogger(__name__)
+
+def _references(model, other):
+    return any(field.related_model is other for field in model._meta.concrete_fields if field.is_relation)
+
+def deletion_order(candidates):
+    """
+    ``candidates`` sorted so that every model comes before the models it
+    references: deleting a chunk then only cascades to rows that are already
+    gone, and the per-chunk work stays bounded.
+    """
+    ordered, seen = [], set()
+
+    def visit(model):
+        if model in seen:
+            return
+        seen.add(model)
+        for other in candidates:
+            if other is not model and _references(other, model):
+                visit(other)
+        ordered.append(model)
+
+    for model in candidates:
+        visit(model)
+    return ordered
+
+def cascade_steps(root):
+    """
+    Querysets of the rows that deleting ``root`` cascades to, one per model
+    with an ``on_delete=CASCADE`` foreign key to it, in deletion order.
+    SET_NULL and other relations are left to Django's collector.
+    """
+    model = type(root)
+    cascades = {}
+    for relation in model._meta.related_objects:
+        # A salon's children are deleted as salons of their own.
+        if relation.on_delete is models.CASCADE and not relation.many_to_many and relation.related_model is not model:
+            cascades.setdefault(relation.related_model, []).append(relation.field.name)
+    steps = []
+    for related in deletion_order(list(cascades)):
+        condition = Q()
+        for name in cascades[related]:
+            condition |= Q(**{name: root})
+        steps.append(related._default_manager.filter(condition))
+    return steps
+
+def deletion_plan(job):
+    """
+    The steps of a job, in order: querysets deleted chunk by chunk, then the
+    objects themselves. Objects that are already gone (a resumed job) yield
+    nothing.
+    """
+    model = apps.get_model(job.target)
+    root = model._default_manager.filter(pk=job.object_id).first()
+    if root is None:
+        return []
+    if isinstance(root, Salon):
+        # Branches first, deepest level first, so no salon's delete cascades into a whole subtree.
+        salons = list(root.get_descendants(include_self=True).order_by('-level', 'pk'))
+        return [step for salon in salons for step in cascade_steps(salon)] + salons
+    return cascade_steps(root) + [root]
+
+@contextmanager
+def bulk_deletion(job):
+    """Registers go with the job's rows, and a deleted salon has nobody left to sync."""
+    with skip_balance_reversal():
+        if job.target == Salon._meta.label_lower:
+            with skip_sync_tombstones():
+                yield
+        else:
+            yield
+
+def _delete_chunks(job, queryset, chunk_size):
+    while True:
+        with transaction.atomic(), bulk_deletion(job):
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return
+            deleted, _per_model = queryset.model._default_manager.filter(pk__in=pks).delete()
+            DeletionJob.objects.filter(pk=job.pk).update(deleted_count=F('deleted_count') + deleted, modified_at=timezone.now())
+
+def execute(job):
+    """Run ``job`` to the end; each chunk commits on its own, so an interrupted job resumes where it stopped."""
+    chunk_size = getattr(settings, 'DELETION_CHUNK_SIZE', 500)
+    try:
+        plan = deletion_plan(job)
+        if not job.total_count:
+            job.total_count = sum(step.count() if isinstance(step, models.QuerySet) else 1 for step in plan)
+            DeletionJob.objects.filter(pk=job.pk).update(total_count=job.total_count)
+        for step in plan:
+            if isinstance(step, models.QuerySet):
+                _delete_chunks(job, step, chunk_size)
+            else:
+                with transaction.atomic(), bulk_deletion(job):
+                    deleted, _per_model = step.delete()
+                    DeletionJob.objects.filter(pk=job.pk).update(deleted_count=F('deleted_count') + deleted, modified_at=timezone.now())
+    except Exception as e:
+        logger.exception("Deletion job %s failed", job.pk)
+        DeletionJob.objects.filter(pk=job.pk).update(status=DeletionJob.FAILED, error=str(e), finished_at=timezone.now())
+        return False
+    DeletionJob.objects.filter(pk=job.pk).update(status=DeletionJob.DONE, finished_at=timezone.now())
+    return True
+
+def runnable_jobs():
+    """Pending jobs, and running ones that have not moved for DELETION_JOB_STALE_SECONDS."""
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'DELETION_JOB_STALE_SECONDS', 600))
+    return DeletionJob.objects.filter(
+        Q(status=DeletionJob.PENDING) | Q(status=DeletionJob.RUNNING, modified_at__lt=stale)
+    )
+
+def run_job(job_id):
+    """Claim and run one job; returns False when another worker has it."""
+    claimed = runnable_jobs().filter(pk=job_id).update(status=DeletionJob.RUNNING, modified_at=timezone.now())
+    if not claimed:
+        return False
+    execute(DeletionJob.objects.get(pk=job_id))
+    return True
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        for connection in connections.all(initialized_only=True):
+            connection.close()
+
+def queue_deletion(obj, user):
+    """
+    Create the DeletionJob for ``obj`` (a Salon or CashRegister), or return
+    the one already pending or running for it. Salons are deactivated at once
+    so they disappear from listings; registers drop out of their salon's
+    querysets (see ``CashRegisterQuerySet``). With DELETION_JOBS_IN_PROCESS the
+    job starts in a thread after commit; ``manage.py run_deletion_jobs`` runs
+    (and resumes) jobs otherwise.
+    """
+    model = type(obj)
+    with transaction.atomic():
+        # Locking the object makes a concurrent request for it wait, then find this job.
+        model._default_manager.select_for_update().filter(pk=obj.pk).exists()
+        job = DeletionJob.active_for(model).filter(object_id=obj.pk).first()
+        if job is not None:
+            return job
+        job = DeletionJob.objects.create(
+            target=model._meta.label_lower, object_id=obj.pk, description=str(obj), requested_by=user,
+        )
+        if isinstance(obj, Salon):
+            for salon in obj.get_descendants(include_self=True).filter(is_active=True):
+                salon.is_active = False
+                salon.save(update_fields=['is_active', 'modified_at'])
+        else:
+            bump_versions([salon_id_for(obj)], model)
+    if getattr(settings, 'DELETION_JOBS_IN_PROCESS', True):
+        transaction.on_commit(lambda: threading.Thread(target=_run_in_thread, args=(job.pk,), daemon=True).start())
+    return job
+
+class DeletionJobMixin:
+    """For DeleteViews: queue a DeletionJob instead of deleting in the request, and show its progress."""
+
+    def form_valid(self, form):
+        return self.queue_deletion()
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return self.queue_deletion()
+
+    def queue_deletion(self):
+        job = queue_deletion(self.object, self.request.user)
+        if self.request.htmx:
+            return HttpResponse(render_to_string('saloon/partials/deletion_progress.html', {'job': job}, self.request))
+        return HttpResponseRedirect(reverse('saloon:deletion_job', kwargs={'pk': job.pk}))
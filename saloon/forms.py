@@ -2,21 +2,8 @@ from django import forms
 from django.utils.translation import gettext_lazy as _
 from .models import Salon, Barber, Client, SalonPermission
 from accounts.models import CustomUser
-
-class BootstrapFormMixin:
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        for field_name, field in self.fields.items():
-            if isinstance(field.widget, (forms.TextInput, forms.EmailInput, forms.DateInput, forms.NumberInput, forms.URLInput)):
-                field.widget.attrs.update({'class': 'form-control'})
-            elif isinstance(field.widget, forms.Select):
-                field.widget.attrs.update({'class': 'form-select'})
-            elif isinstance(field.widget, forms.Textarea):
-                field.widget.attrs.update({'class': 'form-control', 'rows': 3})
-            elif isinstance(field.widget, forms.CheckboxInput):
-                field.widget.attrs.update({'class': 'form-check-input'})
-            elif isinstance(field.widget, forms.FileInput):
-                field.widget.attrs.update({'class': 'form-control'})
+from commonapp.forms import BootstrapFormMixin
+from config.choices import use_cached_choices
 
 class SalonSearchForm(BootstrapFormMixin, forms.Form):
     name = forms.CharField(max_length=255, required=False, label=_("Salon Name"))
@@ -47,6 +34,9 @@ class SalonForm(BootstrapFormMixin, forms.ModelForm):
             pass
 
 class BarberForm(BootstrapFormMixin, forms.ModelForm):
+    # The user choices leave out users who already have a row, in any salon.
+    render_cache = False
+
     class Meta:
         model = Barber
         fields = ['user', 'barber_type', 'contract', 'phone', 'address', 'start_date', 'end_date', 'is_active']
@@ -63,8 +53,12 @@ class BarberForm(BootstrapFormMixin, forms.ModelForm):
         self.fields['user'].queryset = CustomUser.objects.exclude(
             id__in=existing_barbers
         ).exclude(is_staff=True)
+        use_cached_choices(self.fields['barber_type'])
 
 class ClientForm(BootstrapFormMixin, forms.ModelForm):
+    # The user choices leave out users who already have a row, in any salon.
+    render_cache = False
+
     class Meta:
         model = Client
         fields = ['user', 'address', 'phone']
@@ -78,6 +72,9 @@ class ClientForm(BootstrapFormMixin, forms.ModelForm):
         ).exclude(is_staff=True)
 
 class SalonPermissionForm(BootstrapFormMixin, forms.Form):
+    # The user choices depend on the salon's permission rows.
+    render_cache = False
+
     user = forms.ModelChoiceField(queryset=None, label=_("User"))
     permission_type = forms.ChoiceField(choices=SalonPermission.PERMISSION_CHOICES, label=_("Permission Type"))
     action = forms.ChoiceField(choices=[('add', _('Add')), ('remove', _('Remove'))], label=_("Action"))
@@ -0,0 +1,25 @@
+''' Run queued salon and cash register deletions '''
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from saloon.deletion import run_job, runnable_jobs
+
+class Command(BaseCommand):
+    help = "Run pending deletion jobs, and resume abandoned ones, in bounded chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when no job is left instead of polling.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls for new jobs.")
+
+    def handle(self, *args, **options):
+        while True:
+            job_ids = list(runnable_jobs().order_by('created_at').values_list('pk', flat=True))
+            for job_id in job_ids:
+                if run_job(job_id):
+                    self.stdout.write(f"Finished deletion job {job_id}.")
+            if options['once']:
+                return
+            if not job_ids:
+                time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('saloon', '0002_remove_barber_can_manage_barbers_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='barber',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='saloon_barb_salon_i_bc8b40_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='saloon_clie_salon_i_27869d_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('saloon', '0003_barber_saloon_barb_salon_i_bc8b40_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='Modified at')),
+                ('target', models.CharField(max_length=100, verbose_name='Target')),
+                ('object_id', models.BigIntegerField(verbose_name='Object ID')),
+                ('description', models.CharField(max_length=255, verbose_name='Description')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10, verbose_name='Status')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Rows to delete')),
+                ('deleted_count', models.PositiveIntegerField(default=0, verbose_name='Rows deleted')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished at')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deletion_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Requested by')),
+            ],
+            options={
+                'verbose_name': 'Deletion Job',
+                'verbose_name_plural': 'Deletion Jobs',
+                'indexes': [models.Index(fields=['status', 'modified_at'], name='saloon_dele_status_4474bb_idx')],
+            },
+        ),
+    ]
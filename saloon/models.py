@@ -3,7 +3,7 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from mptt.models import MPTTModel, TreeForeignKey
-from commonapp.models import TimestampMixin
+from commonapp.models import TimestampMixin, SalonQuerySet
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -31,6 +31,13 @@ class Salon(MPTTModel, TimestampMixin):
     def get_active_barbers(self):
         return self.barbers.filter(is_active=True)
 
+class SalonPermissionQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('user', 'salon')},
+        'detail': {'select_related': ('user', 'salon')},
+        'export': {'select_related': ('user', 'salon')},
+    }
+
 class SalonPermission(TimestampMixin):
     PERMISSION_CHOICES = [
         ('can_manage', _('Can manage salon')),
@@ -46,6 +53,8 @@ class SalonPermission(TimestampMixin):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='salon_permissions')
     permission_type = models.CharField(_('permission type'), max_length=50, choices=PERMISSION_CHOICES)
 
+    objects = SalonPermissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('salon', 'user', 'permission_type')
         verbose_name = _("Salon Permission")
@@ -61,6 +70,14 @@ class BarberType(TimestampMixin):
     def __str__(self):
         return self.name
 
+class BarberQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('user', 'barber_type')},
+        'detail': {'select_related': ('user', 'barber_type', 'salon')},
+        'export': {'select_related': ('user', 'barber_type', 'salon')},
+        'choices': {'select_related': ('user',)},
+    }
+
 class Barber(TimestampMixin):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_("user"))
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='barbers', verbose_name=_("Salon"))
@@ -72,6 +89,8 @@ class Barber(TimestampMixin):
     end_date = models.DateField(_("End date"), null=True, blank=True)
     is_active = models.BooleanField(_("Is active"), default=True)
 
+    objects = BarberQuerySet.as_manager()
+
     def __str__(self):
         return self.user.get_full_name()
 
@@ -79,6 +98,7 @@ class Barber(TimestampMixin):
         ordering = ['user__last_name', 'user__first_name']
         verbose_name = _('Barber')
         verbose_name_plural = _('Barbers')
+        indexes = [models.Index(fields=['salon', 'modified_at', 'id'])]
 
     def clean(self):
         if self.start_date and self.end_date and self.start_date > self.end_date:
@@ -102,15 +122,81 @@ class Barber(TimestampMixin):
         today = timezone.now().date()
         return self.is_active and self.start_date <= today and (not self.end_date or self.end_date >= today)
 
+class ClientQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('user',)},
+        'detail': {'select_related': ('user', 'salon')},
+        'export': {'select_related': ('user', 'salon')},
+        'choices': {'select_related': ('user',)},
+    }
+
 class Client(TimestampMixin):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_("user"))
     salon = models.ForeignKey(Salon, on_delete=models.SET_NULL, null=True, blank=True, related_name='clients', verbose_name=_("Preferred Salon"))
     address = models.CharField(_("Address"), max_length=255, null=True, blank=True)
     phone = models.CharField(_("Phone"), max_length=255, null=True, blank=True)
 
+    objects = ClientQuerySet.as_manager()
+
     def __str__(self):
         return self.user.get_full_name()
 
     class Meta:
         verbose_name = _("Client")
-        verbose_name_plural = _("Clients")
\ No newline at end of file
+        verbose_name_plural = _("Clients")
+        indexes = [models.Index(fields=['salon', 'modified_at', 'id'])]
+
+class DeletionJob(TimestampMixin):
+    """
+    A salon or cash register being deleted in the background, in chunks (see
+    ``saloon.deletion``). ``deleted_count`` out of ``total_count`` rows is the
+    progress; ``modified_at`` moves with every chunk, so a job that stops
+    moving while RUNNING was abandoned and can be resumed.
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    ]
+    ACTIVE = (PENDING, RUNNING)
+
+    target = models.CharField(_("Target"), max_length=100)
+    object_id = models.BigIntegerField(_("Object ID"))
+    description = models.CharField(_("Description"), max_length=255)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='deletion_jobs', verbose_name=_("Requested by"))
+    status = models.CharField(_("Status"), max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total_count = models.PositiveIntegerField(_("Rows to delete"), default=0)
+    deleted_count = models.PositiveIntegerField(_("Rows deleted"), default=0)
+    error = models.TextField(_("Error"), blank=True)
+    finished_at = models.DateTimeField(_("Finished at"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Deletion Job")
+        verbose_name_plural = _("Deletion Jobs")
+        indexes = [models.Index(fields=['status', 'modified_at'])]
+
+    def __str__(self):
+        return f"{self.description} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """Percentage of rows deleted so far."""
+        if self.status == self.DONE:
+            return 100
+        if not self.total_count:
+            return 0
+        return min(99, self.deleted_count * 100 // self.total_count)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @classmethod
+    def active_for(cls, model):
+        """Pending or running jobs deleting rows of ``model``."""
+        return cls.objects.filter(target=model._meta.label_lower, status__in=cls.ACTIVE)
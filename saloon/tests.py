@@ -1,3 +1,157 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from commonapp.models import Currency
+from config.salon_context import get_request_salon, get_salon
+from config.versions import check_shared_cache, salon_version
+from saloonfinance.forms import PaymentForm
+from .forms import BarberForm
+from saloonfinance.models import CashRegister
+from saloonservices.models import Hairstyle, Shave
+from .deletion import queue_deletion, run_job
+from .models import Salon, Barber, BarberType, Client, DeletionJob
+
+class SalonTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.owner = CustomUser.objects.create_user('owner@example.com', 'password', first_name='Olivia', last_name='Owner')
+        cls.salon = Salon.objects.create(name='Main', owner=cls.owner)
+        barber_user = CustomUser.objects.create_user('barber@example.com', 'password', first_name='Bob', last_name='Barber')
+        cls.barber = Barber.objects.create(
+            user=barber_user, salon=cls.salon, barber_type=BarberType.objects.create(name='Senior'),
+            start_date=datetime.date(2024, 1, 1),
+        )
+        cls.register = CashRegister.objects.create(name='Front desk', salon=cls.salon, currency=Currency.get_default())
+
+    def setUp(self):
+        # The default currency is only cached once committed, which test transactions never are.
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.get_default()
+
+class SalonContextTests(SalonTestCase):
+    def test_middleware_loads_the_salon_once(self):
+        self.client.force_login(self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('salooninventory:available_to_promise', kwargs={'salon_id': self.salon.pk}))
+        self.assertEqual(response.status_code, 200)
+        salon_queries = [query['sql'] for query in queries if 'FROM "saloon_salon"' in query['sql']]
+        self.assertEqual(len(salon_queries), 1, salon_queries)
+
+    def test_get_request_salon_reuses_the_request_salon(self):
+        request = RequestFactory().get('/')
+        request.salon = self.salon
+        with self.assertNumQueries(0):
+            self.assertIs(get_request_salon(request, str(self.salon.pk)), self.salon)
+
+    def test_get_request_salon_loads_another_salon(self):
+        other = Salon.objects.create(name='Other', owner=self.owner)
+        request = RequestFactory().get('/')
+        request.salon = self.salon
+        self.assertEqual(get_request_salon(request, other.pk), other)
+        self.assertEqual(request.salon, other)
+        with self.assertRaises(Http404):
+            get_request_salon(request, other.pk + 1)
+
+    @override_settings(SALON_CONTEXT_CACHE_TIMEOUT=60)
+    def test_cached_salons_are_dropped_on_save(self):
+        get_salon(self.salon.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_salon(self.salon.pk).owner, self.owner)
+        self.salon.name = 'Renamed'
+        self.salon.save()
+        self.assertEqual(get_salon(self.salon.pk).name, 'Renamed')
+
+class SalonVersionTests(SalonTestCase):
+    def test_writes_change_the_version_once_committed(self):
+        other = Salon.objects.create(name='Other', owner=self.owner)
+        before, other_before = salon_version(self.salon, Hairstyle), salon_version(other, Hairstyle)
+        with self.captureOnCommitCallbacks(execute=True):
+            fade = Hairstyle.objects.create(name='Fade', salon=self.salon, current_tariff=10)
+            self.assertEqual(salon_version(self.salon, Hairstyle), before)
+        after = salon_version(self.salon, Hairstyle)
+        self.assertNotEqual(after, before)
+        self.assertEqual(salon_version(other, Hairstyle), other_before)
+        with self.captureOnCommitCallbacks(execute=True):
+            fade.delete()
+        self.assertNotEqual(salon_version(self.salon, Hairstyle), after)
+
+    def test_logins_leave_the_shared_versions_alone(self):
+        before = salon_version(self.salon, CustomUser)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(email='owner@example.com', password='password')
+        self.assertEqual(salon_version(self.salon, CustomUser), before)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.first_name = 'Liv'
+            self.owner.save()
+        self.assertNotEqual(salon_version(self.salon, CustomUser), before)
+
+    def test_other_models_are_not_versioned(self):
+        job = DeletionJob.objects.create(target='saloon.salon', object_id=0, description='-', requested_by=self.owner)
+        with self.captureOnCommitCallbacks() as callbacks:
+            job.save()
+        self.assertEqual(callbacks, [])
+
+    def test_process_local_caches_fail_the_checks_when_shared_is_required(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379'}}
+        with override_settings(CACHE_REQUIRE_SHARED=True, CACHES=local):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['saloon.E001'])
+        with override_settings(CACHE_REQUIRE_SHARED=True, CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(CACHE_REQUIRE_SHARED=False, CACHES=local):
+            self.assertEqual(check_shared_cache(None), [])
+
+class BarberFormTests(SalonTestCase):
+    def test_users_who_became_barbers_are_no_longer_offered(self):
+        user = CustomUser.objects.create_user('new@example.com', 'password', first_name='Nina', last_name='New')
+        self.assertIn(f'value="{user.pk}"', str(BarberForm(salon=self.salon)))
+        with self.captureOnCommitCallbacks(execute=True):
+            Barber.objects.create(user=user, salon=self.salon, barber_type=self.barber.barber_type, start_date=datetime.date(2024, 1, 1))
+        self.assertNotIn(f'value="{user.pk}"', str(BarberForm(salon=self.salon)))
+
+@override_settings(DELETION_JOBS_IN_PROCESS=False)
+class DeletionJobTests(SalonTestCase):
+    def test_salon_deletion_follows_the_cascades(self):
+        branch = Salon.objects.create(name='Branch', owner=self.owner, parent=self.salon)
+        client = Client.objects.create(user=CustomUser.objects.create_user('client@example.com', 'password'), salon=self.salon)
+        Shave.objects.create(
+            barber=self.barber, hairstyle=Hairstyle.objects.create(name='Fade', salon=self.salon, current_tariff=10),
+            cashregister=self.register, salon=self.salon, amount=10, status='COMPLETED',
+        )
+        job = queue_deletion(self.salon, self.owner)
+        self.assertTrue(run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertFalse(Salon.objects.filter(pk__in=[self.salon.pk, branch.pk]).exists())
+        self.assertFalse(Shave.objects.exists() or Barber.objects.exists() or CashRegister.objects.exists())
+        client.refresh_from_db()
+        self.assertIsNone(client.salon)
+
+    def test_registers_queued_for_deletion_cannot_be_used(self):
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                PaymentForm(user=self.owner, salon=self.salon)
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_deletion(self.register, self.owner)
+        self.assertFalse(CashRegister.objects.for_salon(self.salon).exists())
+        self.assertFalse(CashRegister.objects.for_owner(self.owner).exists())
+        self.assertEqual(list(PaymentForm(user=self.owner, salon=self.salon).fields['cashregister'].widget.choices)[1:], [])
+        form = PaymentForm({'cashregister': self.register.pk, 'amount': '5'}, user=self.owner, salon=self.salon)
+        self.assertIn('cashregister', form.errors)
+
+    def test_an_object_has_one_active_job(self):
+        job = queue_deletion(self.register, self.owner)
+        self.assertEqual(queue_deletion(self.register, self.owner), job)
+        DeletionJob.objects.filter(pk=job.pk).update(status=DeletionJob.FAILED)
+        retry = queue_deletion(self.register, self.owner)
+        self.assertNotEqual(retry, job)
+        self.assertEqual(DeletionJob.objects.filter(status=DeletionJob.PENDING).get(), retry)
@@ -9,6 +9,7 @@ urlpatterns = [
     path('create/', views.SalonCreateView.as_view(), name='salon_create'),
     path('<int:pk>/update/', views.SalonUpdateView.as_view(), name='salon_update'),
     path('<int:pk>/delete/', views.SalonDeleteView.as_view(), name='salon_delete'),
+    path('deletions/<int:pk>/', views.DeletionJobView.as_view(), name='deletion_job'),
 
     # Barber URLs
     path('<int:salon_id>/barbers/', views.BarberListView.as_view(), name='barber_list'),
@@ -1,21 +1,34 @@
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.urls import reverse_lazy
 from django.db.models import Q
-from .models import Salon, Barber, Client
+from .models import Salon, Barber, Client, DeletionJob
+from .deletion import DeletionJobMixin
 from .forms import SalonForm, BarberForm, ClientForm, SalonSearchForm
+from config.conditional import ConditionalGetMixin
+from config.salon_context import get_request_salon
 
 class SalonOwnerMixin(UserPassesTestMixin):
     def test_func(self):
         salon = self.get_object()
         return self.request.user == salon.owner
 
+class OwnedSalonMixin:
+    """Resolve ``self.salon`` from the URL once, limited to salons owned by the user."""
+
+    def dispatch(self, request, *args, **kwargs):
+        self.salon = get_request_salon(request, self.kwargs['salon_id'])
+        if self.salon.owner_id != request.user.pk:
+            raise Http404
+        return super().dispatch(request, *args, **kwargs)
+
 class SalonListView(LoginRequiredMixin, ListView):
     model = Salon
     template_name = 'saloon/salon_list.html'
     context_object_name = 'salons'
     paginate_by = 10
+    query_budget = 6
 
     def get_queryset(self):
         queryset = Salon.objects.filter(owner=self.request.user)
@@ -47,38 +60,52 @@ class SalonUpdateView(SalonOwnerMixin, UpdateView):
     template_name = 'saloon/salon_form.html'
     success_url = reverse_lazy('saloon:salon_list')
 
-class SalonDeleteView(SalonOwnerMixin, DeleteView):
+class SalonDeleteView(SalonOwnerMixin, DeletionJobMixin, DeleteView):
     model = Salon
     template_name = 'saloon/salon_confirm_delete.html'
     success_url = reverse_lazy('saloon:salon_list')
 
-class BarberListView(LoginRequiredMixin, ListView):
+class DeletionJobView(LoginRequiredMixin, DetailView):
+    model = DeletionJob
+    template_name = 'saloon/deletion_job.html'
+    context_object_name = 'job'
+
+    def get_queryset(self):
+        return DeletionJob.objects.filter(requested_by=self.request.user)
+
+    def get_template_names(self):
+        if self.request.htmx:
+            return ['saloon/partials/deletion_progress.html']
+        return super().get_template_names()
+
+class BarberListView(LoginRequiredMixin, OwnedSalonMixin, ConditionalGetMixin, ListView):
     model = Barber
     template_name = 'saloon/barber_list.html'
     context_object_name = 'barbers'
+    version_dependencies = ('accounts.customuser', 'saloon.barbertype')
     paginate_by = 10
+    query_budget = 8
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
-        return Barber.objects.filter(salon=salon)
+        return Barber.objects.for_salon(self.salon)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['salon'] = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
+        context['salon'] = self.salon
         return context
 
-class BarberCreateView(LoginRequiredMixin, CreateView):
+class BarberCreateView(LoginRequiredMixin, OwnedSalonMixin, CreateView):
     model = Barber
     form_class = BarberForm
     template_name = 'saloon/barber_form.html'
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['salon'] = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
+        kwargs['salon'] = self.salon
         return kwargs
 
     def form_valid(self, form):
-        form.instance.salon = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
+        form.instance.salon = self.salon
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -90,7 +117,7 @@ class BarberUpdateView(LoginRequiredMixin, UpdateView):
     template_name = 'saloon/barber_form.html'
 
     def get_queryset(self):
-        return Barber.objects.filter(salon__owner=self.request.user)
+        return Barber.objects.for_owner(self.request.user, profile='detail')
 
     def get_success_url(self):
         return reverse_lazy('saloon:barber_list', kwargs={'salon_id': self.object.salon.id})
@@ -100,38 +127,38 @@ class BarberDeleteView(LoginRequiredMixin, DeleteView):
     template_name = 'saloon/barber_confirm_delete.html'
 
     def get_queryset(self):
-        return Barber.objects.filter(salon__owner=self.request.user)
+        return Barber.objects.for_owner(self.request.user, profile='detail')
 
     def get_success_url(self):
         return reverse_lazy('saloon:barber_list', kwargs={'salon_id': self.object.salon.id})
 
-class ClientListView(LoginRequiredMixin, ListView):
+class ClientListView(LoginRequiredMixin, OwnedSalonMixin, ConditionalGetMixin, ListView):
     model = Client
     template_name = 'saloon/client_list.html'
     context_object_name = 'clients'
     paginate_by = 10
+    query_budget = 8
 
     def get_queryset(self):
-        salon = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
-        return Client.objects.filter(salon=salon)
+        return Client.objects.for_salon(self.salon)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['salon'] = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
+        context['salon'] = self.salon
         return context
 
-class ClientCreateView(LoginRequiredMixin, CreateView):
+class ClientCreateView(LoginRequiredMixin, OwnedSalonMixin, CreateView):
     model = Client
     form_class = ClientForm
     template_name = 'saloon/client_form.html'
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['salon'] = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
+        kwargs['salon'] = self.salon
         return kwargs
 
     def form_valid(self, form):
-        form.instance.salon = get_object_or_404(Salon, pk=self.kwargs['salon_id'], owner=self.request.user)
+        form.instance.salon = self.salon
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -143,7 +170,7 @@ class ClientUpdateView(LoginRequiredMixin, UpdateView):
     template_name = 'saloon/client_form.html'
 
     def get_queryset(self):
-        return Client.objects.filter(salon__owner=self.request.user)
+        return Client.objects.for_owner(self.request.user, profile='detail')
 
     def get_success_url(self):
         return reverse_lazy('saloon:client_list', kwargs={'salon_id': self.object.salon.id})
@@ -153,7 +180,7 @@ class ClientDeleteView(LoginRequiredMixin, DeleteView):
     template_name = 'saloon/client_confirm_delete.html'
 
     def get_queryset(self):
-        return Client.objects.filter(salon__owner=self.request.user)
+        return Client.objects.for_owner(self.request.user, profile='detail')
 
     def get_success_url(self):
         return reverse_lazy('saloon:client_list', kwargs={'salon_id': self.object.salon.id})
\ No newline at end of file
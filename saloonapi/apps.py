@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SaloonapiConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'saloonapi'
+
+    def ready(self):
+        from .models import connect_tombstones
+        connect_tombstones()
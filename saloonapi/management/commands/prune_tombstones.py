@@ -0,0 +1,13 @@
+''' Drop sync tombstones and upload batch records past their retention period '''
+
+from django.core.management.base import BaseCommand
+
+from saloonapi.models import SyncBatch, Tombstone
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones and upload batch records past their retention periods."
+
+    def handle(self, *args, **options):
+        deleted = Tombstone.prune()
+        batches = SyncBatch.prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones and {batches} batch records."))
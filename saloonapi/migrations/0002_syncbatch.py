@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('saloon', '0004_deletionjob'),
+        ('saloonapi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='Modified at')),
+                ('batch', models.CharField(max_length=100, verbose_name='Batch')),
+                ('created', models.JSONField(default=dict, verbose_name='Created rows')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saloon.salon', verbose_name='Salon')),
+            ],
+            options={
+                'verbose_name': 'Sync batch',
+                'verbose_name_plural': 'Sync batches',
+                'unique_together': {('salon', 'batch')},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+''' Models for the saloonapi app '''
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from commonapp.models import TimestampMixin
+from saloon.models import Salon
+from config.deletion import sync_tombstones_skipped
+from config.versions import salon_id_for
+
+# Models whose rows are sent to offline clients by the sync feed.
+SYNCED_MODELS = {
+    'saloon.barber', 'saloon.client', 'saloonservices.hairstyle', 'saloonservices.shave',
+    'salooninventory.item', 'salooninventory.itemused', 'saloonfinance.payment', 'saloonfinance.transalon',
+}
+
+class Tombstone(TimestampMixin):
+    """
+    Record of a deleted row, so the sync feed can tell clients to drop it.
+    ``created_at`` is the deletion time. The salon is not a real foreign key:
+    deleting a salon leaves its children's tombstones behind until pruned.
+    """
+    salon = models.ForeignKey(Salon, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', verbose_name=_("Salon"))
+    model = models.CharField(_("Model"), max_length=100)
+    object_id = models.BigIntegerField(_("Object ID"))
+
+    class Meta:
+        verbose_name = _("Tombstone")
+        verbose_name_plural = _("Tombstones")
+        indexes = [models.Index(fields=['salon', 'created_at', 'id'])]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+    @classmethod
+    def prune(cls):
+        """Delete tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS; older sync tokens must resync."""
+        cutoff = timezone.now() - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+        return cls.objects.filter(created_at__lt=cutoff).delete()[0]
+
+class SyncBatch(TimestampMixin):
+    """
+    An applied offline upload, saved in the same transaction as its rows. The
+    unique ``(salon, batch)`` pair makes a retried or concurrent upload of the
+    same batch wait for the first and then answer with its ``created`` map.
+    """
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='+', verbose_name=_("Salon"))
+    batch = models.CharField(_("Batch"), max_length=100)
+    created = models.JSONField(_("Created rows"), default=dict)
+
+    class Meta:
+        verbose_name = _("Sync batch")
+        verbose_name_plural = _("Sync batches")
+        unique_together = ['salon', 'batch']
+
+    def __str__(self):
+        return self.batch
+
+    @classmethod
+    def prune(cls):
+        """Forget batches older than SYNC_BATCH_RETENTION_DAYS; uploading one again applies it again."""
+        cutoff = timezone.now() - timedelta(days=getattr(settings, 'SYNC_BATCH_RETENTION_DAYS', 7))
+        return cls.objects.filter(created_at__lt=cutoff).delete()[0]
+
+def record_tombstone(sender, instance, **kwargs):
+    if sync_tombstones_skipped():
+        return
+    salon_id = salon_id_for(instance)
+    if salon_id:
+        Tombstone.objects.create(salon_id=salon_id, model=sender._meta.label_lower, object_id=instance.pk)
+
+def connect_tombstones():
+    """Connect record_tombstone to the synced models only, so the others keep Django's fast delete."""
+    for label in SYNCED_MODELS:
+        post_delete.connect(record_tombstone, sender=apps.get_model(label), dispatch_uid=f'record_sync_tombstone:{label}')
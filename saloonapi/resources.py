@@ -0,0 +1,168 @@
+''' Resources exposed by the JSON API: fields, filters and the forms used for writes '''
+
+from saloon.forms import SalonForm, BarberForm, ClientForm, SalonSearchForm
+from saloon.models import Salon, Barber, Client
+from saloonfinance.forms import PaymentForm, TransalonForm, PaymentSearchForm, TransalonSearchForm
+from saloonfinance.models import Payment, Transalon
+from saloonservices.forms import HairstyleForm, ShaveForm, HairstyleSearchForm, ShaveSearchForm
+from saloonservices.models import Hairstyle, Shave
+from salooninventory.forms import ItemForm, ItemSearchForm, ItemUsedForm, ItemUsedSearchForm
+from salooninventory.models import Item, ItemUsed
+
+def model_fields(model):
+    """Public name to ``values()`` path for the concrete fields; foreign keys are exposed as ids."""
+    return {field.name: field.attname for field in model._meta.concrete_fields}
+
+class Resource:
+    """
+    One model of the API.
+
+    ``fields`` maps public names to ``values()`` paths (related names are
+    reached with ``__``), ``default_fields`` is what a request without
+    ``?fields=`` gets, and ``filters`` maps cleaned ``search_form`` fields to
+    lookups, mirroring the HTML list views. ``many_fields`` are many-to-many
+    fields returned as lists of ids. Writes go through ``form_class``; the
+    ``*_scope`` tuples name the ``user``/``salon`` kwargs the forms expect.
+    """
+    model = None
+    fields = {}
+    default_fields = ()
+    many_fields = ()
+    search_form = None
+    search_form_scope = ()
+    filters = {}
+    form_class = None
+    form_scope = ()
+    owner_only = False
+
+    def get_queryset(self, user, salon):
+        return self.model.objects.for_salon(salon, profile=None)
+
+    def scope_kwargs(self, names, user, salon):
+        return {name: {'user': user, 'salon': salon}[name] for name in names}
+
+    def prepare_instance(self, instance, user, salon):
+        """Called before validating a write, e.g. to pin the instance to the URL's salon."""
+        instance.salon = salon
+
+class SalonResource(Resource):
+    model = Salon
+    fields = {**model_fields(Salon), 'owner_email': 'owner__email'}
+    default_fields = ('id', 'name', 'description', 'address', 'phone', 'email', 'parent', 'is_active')
+    search_form = SalonSearchForm
+    filters = {'name': 'name__icontains'}
+    form_class = SalonForm
+    form_scope = ('user',)
+    owner_only = True
+
+    def get_queryset(self, user, salon):
+        return Salon.objects.filter(owner=user)
+
+    def prepare_instance(self, instance, user, salon):
+        if instance.pk is None:
+            instance.owner = user
+
+class BarberResource(Resource):
+    model = Barber
+    fields = {
+        **model_fields(Barber),
+        'first_name': 'user__first_name', 'last_name': 'user__last_name', 'email': 'user__email',
+        'barber_type_name': 'barber_type__name',
+    }
+    default_fields = ('id', 'user', 'first_name', 'last_name', 'barber_type', 'phone', 'start_date', 'end_date', 'is_active')
+    form_class = BarberForm
+    form_scope = ('salon',)
+    owner_only = True
+
+class ClientResource(Resource):
+    model = Client
+    fields = {**model_fields(Client), 'first_name': 'user__first_name', 'last_name': 'user__last_name', 'email': 'user__email'}
+    default_fields = ('id', 'user', 'first_name', 'last_name', 'email', 'phone', 'address')
+    form_class = ClientForm
+    form_scope = ('salon',)
+    owner_only = True
+
+class HairstyleResource(Resource):
+    model = Hairstyle
+    fields = {**model_fields(Hairstyle), 'currency_code': 'currency__code'}
+    default_fields = ('id', 'name', 'current_tariff', 'currency', 'currency_code')
+    search_form = HairstyleSearchForm
+    search_form_scope = ('user',)
+    filters = {'name': 'name__icontains'}
+    form_class = HairstyleForm
+    form_scope = ('user',)
+
+class ShaveResource(Resource):
+    model = Shave
+    fields = {
+        **model_fields(Shave),
+        'barber_first_name': 'barber__user__first_name', 'barber_last_name': 'barber__user__last_name',
+        'client_first_name': 'client__user__first_name', 'client_last_name': 'client__user__last_name',
+        'hairstyle_name': 'hairstyle__name', 'currency_code': 'currency__code',
+    }
+    default_fields = ('id', 'barber', 'hairstyle', 'client', 'amount', 'currency', 'exchange_rate', 'cashregister', 'date_shave', 'status')
+    search_form = ShaveSearchForm
+    search_form_scope = ('user',)
+    filters = {
+        'barber': 'barber', 'hairstyle': 'hairstyle', 'client': 'client',
+        'start_date': 'date_shave__gte', 'end_date': 'date_shave__lte', 'status': 'status',
+    }
+    form_class = ShaveForm
+    form_scope = ('user',)
+
+class ItemResource(Resource):
+    model = Item
+    fields = {**model_fields(Item), 'currency_code': 'currency__code'}
+    default_fields = ('id', 'name', 'price', 'currency', 'current_stock', 'reserved_stock', 'item_purpose')
+    many_fields = ('item_purpose',)
+    search_form = ItemSearchForm
+    search_form_scope = ('user',)
+    filters = {'name': 'name__icontains', 'hairstyle': 'item_purpose'}
+    form_class = ItemForm
+    form_scope = ('user',)
+
+class ItemUsedResource(Resource):
+    model = ItemUsed
+    fields = {**model_fields(ItemUsed), 'item_name': 'item__name'}
+    default_fields = ('id', 'item', 'item_name', 'shave', 'barber', 'quantity', 'note', 'created_at')
+    search_form = ItemUsedSearchForm
+    search_form_scope = ('user',)
+    filters = {'item': 'item', 'barber': 'barber', 'start_date': 'created_at__gte', 'end_date': 'created_at__lte'}
+    form_class = ItemUsedForm
+    form_scope = ('user',)
+
+class PaymentResource(Resource):
+    model = Payment
+    fields = {
+        **model_fields(Payment),
+        'barber_first_name': 'barber__user__first_name', 'barber_last_name': 'barber__user__last_name',
+        'payment_type_name': 'payment_type__name', 'currency_code': 'currency__code',
+    }
+    default_fields = ('id', 'barber', 'amount', 'currency', 'exchange_rate', 'start_date', 'end_date', 'payment_type', 'cashregister', 'date_payment')
+    search_form = PaymentSearchForm
+    search_form_scope = ('salon',)
+    filters = {'barber': 'barber', 'payment_type': 'payment_type', 'start_date': 'date_payment__gte', 'end_date': 'date_payment__lte'}
+    form_class = PaymentForm
+    form_scope = ('user', 'salon')
+
+class TransactionResource(Resource):
+    model = Transalon
+    fields = {**model_fields(Transalon), 'currency_code': 'currency__code'}
+    default_fields = ('id', 'trans_name', 'amount', 'currency', 'exchange_rate', 'date_trans', 'trans_type', 'cashregister')
+    search_form = TransalonSearchForm
+    filters = {'trans_name': 'trans_name__icontains', 'trans_type': 'trans_type', 'start_date': 'date_trans__gte', 'end_date': 'date_trans__lte'}
+    form_class = TransalonForm
+    form_scope = ('user', 'salon')
+
+RESOURCES = {
+    'barbers': BarberResource(),
+    'clients': ClientResource(),
+    'hairstyles': HairstyleResource(),
+    'shaves': ShaveResource(),
+    'items': ItemResource(),
+    'items-used': ItemUsedResource(),
+    'payments': PaymentResource(),
+    'transactions': TransactionResource(),
+}
+
+SALONS = SalonResource()
@@ -0,0 +1,187 @@
+import datetime
+import json
+import threading
+
+from django.core.cache import cache
+from asgiref.sync import async_to_sync
+from django.db.models.deletion import Collector
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from commonapp.models import Currency
+from config.parallel import gather_queries
+from saloon.models import Salon, Barber, BarberType
+from saloonfinance.models import CashRegister
+from saloonservices.models import Hairstyle, Shave
+from saloon.deletion import queue_deletion, run_job
+from saloon.models import DeletionJob
+from .models import SyncBatch, Tombstone
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.owner = CustomUser.objects.create_user('owner@example.com', 'password')
+        cls.salon = Salon.objects.create(name='Main', owner=cls.owner)
+        barber_user = CustomUser.objects.create_user('barber@example.com', 'password', first_name='Bob', last_name='Barber')
+        cls.barber = Barber.objects.create(
+            user=barber_user, salon=cls.salon, barber_type=BarberType.objects.create(name='Senior'),
+            start_date=datetime.date(2024, 1, 1),
+        )
+        cls.register = CashRegister.objects.create(name='Front desk', salon=cls.salon, currency=Currency.get_default())
+        cls.fade = Hairstyle.objects.create(name='Fade', salon=cls.salon, current_tariff=10)
+
+    def setUp(self):
+        # The default currency is only cached once committed, which test transactions never are.
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.get_default()
+        self.client.force_login(self.owner)
+
+    def create_shave(self, **kwargs):
+        fields = {
+            'barber': self.barber, 'hairstyle': self.fade, 'cashregister': self.register,
+            'salon': self.salon, 'amount': 10, 'date_shave': datetime.date(2024, 6, 1),
+        }
+        fields.update(kwargs)
+        return Shave.objects.create(**fields)
+
+    def shave_data(self, **kwargs):
+        data = {
+            'barber': self.barber.pk, 'hairstyle': self.fade.pk, 'amount': '10.00', 'currency': self.register.currency_id,
+            'exchange_rate': '1', 'cashregister': self.register.pk, 'date_shave': '2024-06-01', 'status': 'SCHEDULED',
+        }
+        data.update(kwargs)
+        return data
+
+    def url(self, name='resource_list', **kwargs):
+        return reverse(f'saloonapi:{name}', kwargs={'salon_id': self.salon.pk, 'resource': 'shaves', **kwargs})
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+
+class ResourceTests(ApiTestCase):
+    def test_list_returns_the_requested_fields(self):
+        shave = self.create_shave()
+        response = self.client.get(self.url(), {'fields': 'id,hairstyle_name'})
+        self.assertEqual(response.json(), {'results': [{'id': shave.pk, 'hairstyle_name': 'Fade'}], 'next': None})
+
+    def test_unknown_fields_are_rejected_before_writing(self):
+        response = self.send('post', self.url() + '?fields=bogus', self.shave_data())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Shave.objects.exists())
+
+    def test_create_validates_with_the_form(self):
+        response = self.send('post', self.url(), self.shave_data(amount='x'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.json()['errors'])
+        response = self.send('post', self.url() + '?fields=id,amount', self.shave_data())
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json(), {'id': Shave.objects.get().pk, 'amount': '10.00'})
+
+    def test_patch_and_delete_stay_within_the_write_budget(self):
+        shave = self.create_shave()
+        response = self.send('patch', self.url('resource_detail', pk=shave.pk), {'status': 'COMPLETED'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['status'], 'COMPLETED')
+        shave.refresh_from_db()
+        self.assertEqual(shave.status, 'COMPLETED')
+        self.assertEqual(self.client.delete(self.url('resource_detail', pk=shave.pk)).status_code, 204)
+        self.assertFalse(Shave.objects.exists())
+
+class SyncTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sync_url = reverse('saloonapi:sync', kwargs={'salon_id': self.salon.pk})
+
+    def upload(self, batch, **row):
+        return self.send('post', self.sync_url, {'shaves': [{'ref': 'a', **self.shave_data(**row)}], 'batch': batch})
+
+    def test_a_batch_is_applied_once(self):
+        first = self.upload('b1')
+        self.assertEqual(first.status_code, 200, first.content)
+        shave = Shave.objects.get()
+        self.assertEqual(first.json()['created'], {'shaves': {'a': shave.pk}, 'items-used': {}})
+        self.assertEqual(self.upload('b1').json()['created'], first.json()['created'])
+        self.assertEqual(Shave.objects.count(), 1)
+        self.assertEqual(SyncBatch.objects.get().batch, 'b1')
+
+    def test_a_rejected_batch_can_be_sent_again(self):
+        response = self.upload('b1', amount='x')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('a', response.json()['errors']['shaves'])
+        self.assertFalse(SyncBatch.objects.exists())
+        self.assertEqual(self.upload('b1').status_code, 200)
+        self.assertEqual(Shave.objects.count(), 1)
+
+    @override_settings(SYNC_SETTLE_SECONDS=0)
+    def test_feed_sends_changes_then_deletions(self):
+        shave = self.create_shave()
+        first = self.client.get(self.sync_url).json()
+        self.assertEqual([row['id'] for row in first['changes']['shaves']], [shave.pk])
+        self.assertFalse(first['more'])
+        pk = shave.pk
+        shave.delete()
+        second = self.client.get(self.sync_url, {'token': first['token']}).json()
+        self.assertEqual(second['changes']['shaves'], [])
+        self.assertEqual(second['deleted'], {'shaves': [pk]})
+
+@override_settings(DELETION_JOBS_IN_PROCESS=False)
+class TombstoneTests(ApiTestCase):
+    def test_only_synced_models_leave_tombstones(self):
+        self.assertTrue(Collector(using='default').can_fast_delete(DeletionJob.objects.all()))
+        self.assertFalse(Collector(using='default').can_fast_delete(Shave.objects.all()))
+
+    def test_register_deletions_leave_tombstones(self):
+        shave = self.create_shave()
+        run_job(queue_deletion(self.register, self.owner).pk)
+        self.assertEqual(list(Tombstone.objects.values_list('model', 'object_id')), [('saloonservices.shave', shave.pk)])
+
+    def test_salon_deletions_leave_none(self):
+        self.create_shave()
+        run_job(queue_deletion(self.salon, self.owner).pk)
+        self.assertFalse(Salon.objects.exists())
+        self.assertFalse(Tombstone.objects.exists())
+
+class DashboardTests(TransactionTestCase):
+    # The aggregates run on their own connections, which only see committed rows.
+
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user('owner@example.com', 'password')
+        self.salon = Salon.objects.create(name='Main', owner=self.owner)
+        barber_user = CustomUser.objects.create_user('barber@example.com', 'password')
+        self.barber = Barber.objects.create(
+            user=barber_user, salon=self.salon, barber_type=BarberType.objects.create(name='Senior'),
+            start_date=datetime.date(2024, 1, 1),
+        )
+        self.register = CashRegister.objects.create(name='Front desk', salon=self.salon, currency=Currency.get_default())
+        self.url = reverse('saloonapi:dashboard', kwargs={'salon_id': self.salon.pk})
+
+    def test_gather_queries_keeps_the_order_and_uses_worker_threads(self):
+        caller = threading.get_ident()
+        results = async_to_sync(gather_queries)((lambda n: (n, threading.get_ident()), 1), (lambda n: (n, threading.get_ident()), 2))
+        self.assertEqual([n for n, _thread in results], [1, 2])
+        self.assertNotIn(caller, [thread for _n, thread in results])
+
+    def test_owner_gets_the_aggregates(self):
+        Shave.objects.create(
+            barber=self.barber, hairstyle=Hairstyle.objects.create(name='Fade', salon=self.salon, current_tariff=10),
+            cashregister=self.register, salon=self.salon, amount=10, status='COMPLETED',
+        )
+        self.client.force_login(self.owner)
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['salon'], self.salon.pk)
+        self.assertEqual([register['name'] for register in data['cash_registers']], ['Front desk'])
+        self.assertEqual(data['active_barbers'], 1)
+        self.assertEqual(float(data['revenue_today']), 10)
+        self.assertEqual(data['payroll_this_month'], {'total': None, 'count': 0})
+
+    def test_other_users_are_refused(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.client.force_login(CustomUser.objects.create_user('other@example.com', 'password'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+        missing = reverse('saloonapi:dashboard', kwargs={'salon_id': self.salon.pk + 1})
+        self.assertEqual(self.client.get(missing).status_code, 404)
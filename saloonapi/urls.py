@@ -0,0 +1,13 @@
+from django.urls import path
+from .views import ResourceListView, ResourceDetailView, SyncView, dashboard_view
+
+app_name = 'saloonapi'
+
+urlpatterns = [
+    path('salons/', ResourceListView.as_view(), name='salon_list'),
+    path('salons/<int:pk>/', ResourceDetailView.as_view(), name='salon_detail'),
+    path('salons/<int:salon_id>/dashboard/', dashboard_view, name='dashboard'),
+    path('salons/<int:salon_id>/sync/', SyncView.as_view(), name='sync'),
+    path('salons/<int:salon_id>/<str:resource>/', ResourceListView.as_view(), name='resource_list'),
+    path('salons/<int:salon_id>/<str:resource>/<int:pk>/', ResourceDetailView.as_view(), name='resource_detail'),
+]
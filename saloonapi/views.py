@@ -0,0 +1,439 @@
+''' JSON API views: list/create and retrieve/update/delete for each resource '''
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, ValidationError
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.forms.models import model_to_dict
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+
+from config.parallel import gather_queries
+from config.permissions import is_salon_owner, is_assigned_barber
+from config.salon_context import get_request_salon, get_salon
+from saloon.models import Barber
+from saloonfinance.models import CashRegister, Payment
+from saloonservices.models import Shave
+from salooninventory.models import get_total_inventory_value
+from .models import SyncBatch, Tombstone
+from .resources import RESOURCES, SALONS
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+def error_response(message, status, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(_("Invalid cursor"))
+
+class SyncTokenExpired(Exception):
+    pass
+
+class UploadRejected(Exception):
+    pass
+
+def encode_sync_token(cursors):
+    data = {name: [moment.isoformat(), pk] for name, (moment, pk) in cursors.items()}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_sync_token(token):
+    """``{stream: (datetime, pk)}`` from a token, or ``{}`` for a first sync."""
+    if not token:
+        return {}
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return {name: (datetime.fromisoformat(moment), int(pk)) for name, (moment, pk) in data.items()}
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError(_("Invalid sync token"))
+
+def read_stream(queryset, field, cursor, horizon, limit):
+    """Rows with ``(field, pk)`` after ``cursor`` and ``field`` before ``horizon``, oldest first."""
+    queryset = queryset.filter(**{f'{field}__lt': horizon})
+    if cursor:
+        moment, pk = cursor
+        queryset = queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk}))
+    return queryset.order_by(field, 'pk')[:limit + 1]
+
+class ApiView(View):
+    """
+    Base view for the API. Reads go through ``values()`` with only the
+    requested ``?fields=``, so no model instances are built; writes reuse the
+    resource's ModelForm, so validation matches the HTML views.
+
+    Authentication is the session, and CSRF protection stays on for unsafe
+    methods like for every other view.
+    """
+    http_method_names = ['get', 'post', 'put', 'patch', 'delete']
+    # Reads take a handful of queries; writes add form validation, history rows and signal handlers.
+    query_budget = 20
+    write_query_budget = 60
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response(_("Authentication required"), 401)
+        if request.method not in ('GET', 'HEAD'):
+            request.query_budget = self.write_query_budget
+        try:
+            self.resource = self.get_resource()
+            self.salon = self.get_salon()
+            return super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return error_response(_("Not found"), 404)
+        except PermissionDenied as e:
+            return error_response(str(e) or _("Permission denied"), 403)
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+    def get_resource(self):
+        if 'resource' not in self.kwargs:
+            return SALONS
+        if self.kwargs['resource'] not in RESOURCES:
+            raise Http404
+        return RESOURCES[self.kwargs['resource']]
+
+    def get_salon(self):
+        if 'salon_id' not in self.kwargs:
+            return None
+        salon = get_request_salon(self.request, self.kwargs['salon_id'])
+        user = self.request.user
+        owner_only = getattr(self.resource, 'owner_only', False)
+        if not (is_salon_owner(user, salon) or (not owner_only and is_assigned_barber(user, salon))):
+            raise PermissionDenied(_("You don't have permission to access this salon."))
+        return salon
+
+    def get_queryset(self):
+        return self.resource.get_queryset(self.request.user, self.salon)
+
+    def get_fields(self):
+        """The public field names asked for with ``?fields=a,b``, or the resource defaults."""
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return list(self.resource.default_fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        known = set(self.resource.fields) | set(self.resource.many_fields)
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(_("Unknown fields: %(fields)s") % {'fields': ', '.join(unknown)})
+        return names
+
+    def serialize(self, queryset, names, resource=None):
+        """Rows of ``names`` read with ``values()``, many-to-many ids added with one query per field."""
+        resource = resource or self.resource
+        fields = resource.fields
+        paths = [fields[name] for name in names if name in fields]
+        if 'pk' not in paths:
+            paths.append('pk')
+        rows = list(queryset.values(*paths))
+        results = [{name: row[fields[name]] for name in names if name in fields} for row in rows]
+        for name in names:
+            if name not in resource.many_fields:
+                continue
+            field = resource.model._meta.get_field(name)
+            source, target = field.m2m_field_name() + '_id', field.m2m_reverse_field_name() + '_id'
+            related = {row['pk']: [] for row in rows}
+            links = field.remote_field.through.objects.filter(**{source + '__in': related}).values_list(source, target)
+            for owner_id, target_id in links:
+                related[owner_id].append(target_id)
+            for result, row in zip(results, rows):
+                result[name] = related[row['pk']]
+        return rows, results
+
+    def get_object(self):
+        try:
+            return self.get_queryset().get(pk=self.kwargs['pk'])
+        except self.resource.model.DoesNotExist:
+            raise Http404
+
+    def parse_body(self):
+        if self.request.content_type == 'application/json':
+            try:
+                data = json.loads(self.request.body or b'{}')
+            except json.JSONDecodeError:
+                raise ValueError(_("Invalid JSON body"))
+            if not isinstance(data, dict):
+                raise ValueError(_("Expected a JSON object"))
+            return data
+        if self.request.method == 'POST':
+            return self.request.POST
+        raise ValueError(_("Expected a JSON body"))
+
+    def save_instance(self, resource, data, instance=None):
+        """Validate ``data`` with the resource's form and save it; returns the form and the object, or None."""
+        if self.salon is not None and 'salon' in resource.form_class.base_fields:
+            # Forms that let the user pick a salon are pinned to the one in the URL.
+            data = data.copy()
+            data['salon'] = self.salon.pk
+        form = resource.form_class(data, instance=instance, **resource.scope_kwargs(resource.form_scope, self.request.user, self.salon))
+        resource.prepare_instance(form.instance, self.request.user, self.salon)
+        if form.is_valid():
+            try:
+                return form, form.save()
+            except ValidationError as e:
+                form.add_error(None, e)
+        return form, None
+
+    def save_form(self, data, instance=None, status=200):
+        # Unknown ?fields= are rejected before anything is written.
+        names = self.get_fields()
+        with transaction.atomic():
+            form, obj = self.save_instance(self.resource, data, instance)
+            if obj is None:
+                return error_response(_("Invalid data"), 400, errors=form.errors.get_json_data())
+            _rows, results = self.serialize(self.get_queryset().filter(pk=obj.pk), names)
+        return JsonResponse(results[0], status=status)
+
+class ResourceListView(ApiView):
+    """
+    ``GET`` lists rows newest first as ``{'results': [...], 'next': cursor}``;
+    pass ``next`` back as ``?cursor=`` for the following page, whose size is
+    ``?limit=``. Filters are the fields of the HTML search form. ``POST``
+    creates a row.
+    """
+
+    def get(self, request, *args, **kwargs):
+        search = self.get_search_form()
+        if search is not None and not search.is_valid():
+            return error_response(_("Invalid filters"), 400, errors=search.errors.get_json_data())
+        queryset = self.filter_queryset(self.get_queryset(), search)
+        try:
+            limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            raise ValueError(_("Invalid limit"))
+        if request.GET.get('cursor'):
+            queryset = queryset.filter(pk__lt=decode_cursor(request.GET['cursor']))
+        # Keyset pagination: the page is found with the primary key index, however deep it is.
+        rows, results = self.serialize(queryset.order_by('-pk')[:limit + 1], self.get_fields())
+        next_cursor = encode_cursor(rows[limit - 1]['pk']) if len(rows) > limit else None
+        return JsonResponse({'results': results[:limit], 'next': next_cursor})
+
+    def post(self, request, *args, **kwargs):
+        return self.save_form(self.parse_body(), status=201)
+
+    def get_search_form(self):
+        resource = self.resource
+        if resource.search_form is None:
+            return None
+        return resource.search_form(self.request.GET, **resource.scope_kwargs(resource.search_form_scope, self.request.user, self.salon))
+
+    def filter_queryset(self, queryset, form):
+        if form is None:
+            return queryset
+        for name, lookup in self.resource.filters.items():
+            value = form.cleaned_data.get(name)
+            if value:
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+class ResourceDetailView(ApiView):
+    """``GET``, ``PATCH`` (partial), ``PUT`` (full) and ``DELETE`` one row."""
+
+    def get(self, request, *args, **kwargs):
+        _rows, results = self.serialize(self.get_queryset().filter(pk=self.kwargs['pk']), self.get_fields())
+        if not results:
+            raise Http404
+        return JsonResponse(results[0])
+
+    def put(self, request, *args, **kwargs):
+        return self.save_form(self.parse_body(), instance=self.get_object())
+
+    def patch(self, request, *args, **kwargs):
+        instance = self.get_object()
+        data = {
+            name: [obj.pk for obj in value] if isinstance(value, list) else value
+            for name, value in model_to_dict(instance, fields=self.resource.form_class._meta.fields).items()
+        }
+        data.update(self.parse_body())
+        return self.save_form(data, instance=instance)
+
+    def delete(self, request, *args, **kwargs):
+        self.get_object().delete()
+        return HttpResponse(status=204)
+
+class SyncView(ApiView):
+    """
+    Delta sync for offline clients.
+
+    ``GET ?token=`` returns ``{'changes': {resource: [rows]}, 'deleted':
+    {resource: [ids]}, 'token', 'more'}``: every row created or modified, and
+    every row deleted, since the token was issued (everything on a first
+    sync). Each stream is read with a ``(modified_at, id)`` keyset on the
+    ``(salon, modified_at, id)`` index. Rows newer than SYNC_SETTLE_SECONDS
+    are left for the next sync, so a transaction still committing with an
+    older ``modified_at`` is not skipped. When ``more`` is true, call again
+    with the new token.
+
+    ``POST`` uploads rows created offline, ``{'shaves': [...], 'items-used':
+    [...], 'token', 'batch'}``, and answers with the changes since ``token``
+    plus ``'created': {resource: {ref: id}}``. All rows are saved in one
+    transaction, or none are. Rows may carry a client-side ``ref``; an item
+    usage can name an uploaded shave by its ``ref``. A batch sent again with
+    the same ``batch`` id is not applied twice.
+    """
+    uploads = ('shaves', 'items-used')
+    query_budget = 30
+
+    def get_resource(self):
+        return None
+
+    def get_streams(self):
+        """The resources this user may read, by name."""
+        owner = is_salon_owner(self.request.user, self.salon)
+        return {name: resource for name, resource in RESOURCES.items() if owner or not resource.owner_only}
+
+    def get(self, request, *args, **kwargs):
+        return self.sync_response(request.GET.get('token'))
+
+    def post(self, request, *args, **kwargs):
+        data = self.parse_body()
+        # Uploads are validated and saved row by row so the balance and stock
+        # signals run, so their query count grows with the batch.
+        request.query_budget = None
+        request.query_repeat_threshold = None
+        try:
+            created = self.apply_uploads(data)
+        except UploadRejected as e:
+            return error_response(_("Invalid data"), 400, errors=e.args[0])
+        return self.sync_response(data.get('token'), created=created)
+
+    def sync_response(self, token, **extra):
+        try:
+            return JsonResponse({**self.get_changes(decode_sync_token(token)), **extra})
+        except SyncTokenExpired:
+            return error_response(_("Sync token expired; sync again without a token."), 410)
+
+    def get_changes(self, cursors):
+        now = timezone.now()
+        horizon = now - timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 2))
+        limit = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+        streams = self.get_streams()
+
+        if cursors and cursors.get('deleted', (now, 0))[0] < now - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30)):
+            raise SyncTokenExpired
+        changes, deleted, next_cursors, more = {}, {}, {}, False
+
+        for name, resource in streams.items():
+            names = list(resource.fields) + list(resource.many_fields)
+            queryset = read_stream(resource.get_queryset(self.request.user, self.salon), 'modified_at', cursors.get(name), horizon, limit)
+            rows, results = self.serialize(queryset, names, resource)
+            changes[name] = results[:limit]
+            next_cursors[name] = (rows[limit - 1]['modified_at'], rows[limit - 1]['pk']) if len(rows) > limit else (horizon, 0)
+            more = more or len(rows) > limit
+
+        # A first sync has nothing to delete, so its tombstone stream starts now.
+        labels = {resource.model._meta.label_lower: name for name, resource in streams.items()}
+        tombstones = Tombstone.objects.filter(salon=self.salon, model__in=labels).values_list('pk', 'model', 'object_id', 'created_at')
+        rows = list(read_stream(tombstones, 'created_at', cursors.get('deleted', (horizon, 0)), horizon, limit)) if cursors else []
+        for _pk, label, object_id, _created_at in rows[:limit]:
+            deleted.setdefault(labels[label], []).append(object_id)
+        next_cursors['deleted'] = (rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else (horizon, 0)
+        more = more or len(rows) > limit
+
+        return {'changes': changes, 'deleted': deleted, 'token': encode_sync_token(next_cursors), 'more': more}
+
+    def apply_uploads(self, data):
+        """Save the uploaded rows in one transaction; returns ``{resource: {ref: id}}`` or raises UploadRejected."""
+        batch = data.get('batch')
+        if batch is not None and not (isinstance(batch, str) and 0 < len(batch) <= 100):
+            raise UploadRejected({'batch': _("Expected a string of at most 100 characters")})
+
+        created = {name: {} for name in self.uploads}
+        errors = {}
+        with transaction.atomic():
+            if batch:
+                # A concurrent upload of the same batch blocks on the unique
+                # index until this transaction ends, then finds the stored row.
+                record, new = SyncBatch.objects.get_or_create(salon=self.salon, batch=batch)
+                if not new:
+                    return record.created
+            for name in self.uploads:
+                rows = data.get(name) or []
+                if not isinstance(rows, list):
+                    raise UploadRejected({name: _("Expected a list")})
+                for index, row in enumerate(rows):
+                    if not isinstance(row, dict):
+                        errors.setdefault(name, {})[str(index)] = _("Expected an object")
+                        continue
+                    row = dict(row)
+                    ref = str(row.pop('ref', index))
+                    if name == 'items-used' and isinstance(row.get('shave'), str) and row['shave'] in created['shaves']:
+                        row['shave'] = created['shaves'][row['shave']]
+                    form, obj = self.save_instance(RESOURCES[name], row)
+                    if obj is None:
+                        errors.setdefault(name, {})[ref] = form.errors.get_json_data()
+                    else:
+                        created[name][ref] = obj.pk
+            if errors:
+                # Raising rolls back the rows saved before the first error, and the batch record.
+                raise UploadRejected(errors)
+            if batch:
+                record.created = created
+                record.save(update_fields=['created', 'modified_at'])
+        return created
+
+def register_balances(salon):
+    return list(CashRegister.objects.for_salon(salon, profile=None).order_by('name').values('id', 'name', 'balance', 'currency__code'))
+
+def revenue_today(salon):
+    today = timezone.localdate()
+    return Shave.get_total_revenue(salon, start_date=today, end_date=today)
+
+def payroll_this_month(salon):
+    today = timezone.localdate()
+    return Payment.objects.for_salon(salon, profile=None).filter(
+        date_payment__gte=today.replace(day=1), date_payment__lte=today,
+    ).aggregate(total=Sum('amount_in_default_currency'), count=Count('id'))
+
+def active_barbers(salon):
+    return Barber.objects.for_salon(salon, profile=None).filter(is_active=True).count()
+
+DASHBOARD_AGGREGATES = {
+    'cash_registers': register_balances,
+    'revenue_today': revenue_today,
+    'payroll_this_month': payroll_this_month,
+    'inventory_value': get_total_inventory_value,
+    'active_barbers': active_barbers,
+}
+
+def load_dashboard_salon(request, salon_id):
+    """The salon when the request's user owns it; raises Http404 or PermissionDenied otherwise."""
+    if not request.user.is_authenticated:
+        return None
+    salon = get_salon(salon_id)
+    if salon is None:
+        raise Http404
+    if not is_salon_owner(request.user, salon):
+        raise PermissionDenied(_("You don't have permission to access this salon."))
+    return salon
+
+async def dashboard_view(request, salon_id):
+    """
+    Owner overview of one salon. The aggregates are independent, so they run
+    concurrently on separate connections and the response takes about as long
+    as the slowest one. Served natively under ASGI (``config/asgi.py``).
+    """
+    if request.method != 'GET':
+        return error_response(_("Method not allowed"), 405)
+    try:
+        salon = await sync_to_async(load_dashboard_salon)(request, salon_id)
+    except Http404:
+        return error_response(_("Not found"), 404)
+    except PermissionDenied as e:
+        return error_response(str(e), 403)
+    if salon is None:
+        return error_response(_("Authentication required"), 401)
+    results = await gather_queries(*((aggregate, salon) for aggregate in DASHBOARD_AGGREGATES.values()))
+    return JsonResponse({'salon': salon.pk, **dict(zip(DASHBOARD_AGGREGATES, results))})
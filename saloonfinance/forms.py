@@ -4,26 +4,12 @@ from .models import CashRegister, Payment, Transalon, PaymentType
 from commonapp.models import Currency
 from saloon.models import Salon, Barber
 from config.permissions import is_salon_owner, is_assigned_barber
+from commonapp.forms import BootstrapFormMixin as BaseBootstrapFormMixin
+from config.choices import use_cached_choices
+from config.autocomplete import AutocompleteSelect
 
-class BootstrapFormMixin:
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        for field_name, field in self.fields.items():
-            if isinstance(field.widget, (forms.TextInput, forms.EmailInput, forms.DateInput, forms.NumberInput, forms.URLInput)):
-                field.widget.attrs.update({'class': 'form-control'})
-            elif isinstance(field.widget, forms.Select):
-                field.widget.attrs.update({'class': 'form-select'})
-            elif isinstance(field.widget, forms.Textarea):
-                field.widget.attrs.update({'class': 'form-control', 'rows': 3})
-            elif isinstance(field.widget, forms.CheckboxInput):
-                field.widget.attrs.update({'class': 'form-check-input'})
-            
-            # Add HTMX attributes for real-time validation
-            field.widget.attrs.update({
-                'hx-post': 'validate-field',
-                'hx-trigger': 'blur',
-                'hx-target': f'#{ field_name }-errors',
-            })
+class BootstrapFormMixin(BaseBootstrapFormMixin):
+    validate_fields = True
 
 class CashRegisterForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
@@ -39,6 +25,7 @@ class CashRegisterForm(BootstrapFormMixin, forms.ModelForm):
         self.user = kwargs.pop('user', None)
         self.salon = kwargs.pop('salon', None)
         super().__init__(*args, **kwargs)
+        use_cached_choices(self.fields['currency'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -59,7 +46,7 @@ class PaymentForm(BootstrapFormMixin, forms.ModelForm):
         model = Payment
         fields = ['barber', 'amount', 'currency', 'exchange_rate', 'start_date', 'end_date', 'payment_type', 'cashregister', 'date_payment']
         widgets = {
-            'barber': forms.Select(attrs={'hx-get': '/barbers/', 'hx-target': '#id_barber'}),
+            'barber': AutocompleteSelect('barber'),
             'amount': forms.NumberInput(attrs={'step': '0.01'}),
             'currency': forms.Select(attrs={'hx-get': '/currencies/', 'hx-target': '#id_currency'}),
             'exchange_rate': forms.NumberInput(attrs={'step': '0.000001'}),
@@ -75,8 +62,12 @@ class PaymentForm(BootstrapFormMixin, forms.ModelForm):
         self.salon = kwargs.pop('salon', None)
         super().__init__(*args, **kwargs)
         if self.salon:
-            self.fields['barber'].queryset = Barber.objects.filter(salon=self.salon)
-            self.fields['cashregister'].queryset = CashRegister.objects.filter(salon=self.salon)
+            self.fields['barber'].queryset = Barber.objects.for_salon(self.salon)
+            self.fields['barber'].widget.salon = self.salon
+            self.fields['cashregister'].queryset = CashRegister.objects.for_salon(self.salon)
+            use_cached_choices(self.fields['cashregister'], self.salon)
+        use_cached_choices(self.fields['currency'])
+        use_cached_choices(self.fields['payment_type'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -111,7 +102,9 @@ class TransalonForm(BootstrapFormMixin, forms.ModelForm):
         self.salon = kwargs.pop('salon', None)
         super().__init__(*args, **kwargs)
         if self.salon:
-            self.fields['cashregister'].queryset = CashRegister.objects.filter(salon=self.salon)
+            self.fields['cashregister'].queryset = CashRegister.objects.for_salon(self.salon)
+            use_cached_choices(self.fields['cashregister'], self.salon)
+        use_cached_choices(self.fields['currency'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -140,7 +133,7 @@ class PaymentSearchForm(BootstrapFormMixin, forms.Form):
         label=_("Barber"),
         queryset=Barber.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/payments/', 'hx-trigger': 'change', 'hx-target': '#payment-list'})
+        widget=AutocompleteSelect('barber', attrs={'hx-get': '/payments/', 'hx-trigger': 'change', 'hx-target': '#payment-list'})
     )
     payment_type = forms.ModelChoiceField(
         label=_("Payment Type"),
@@ -163,7 +156,9 @@ class PaymentSearchForm(BootstrapFormMixin, forms.Form):
         self.salon = kwargs.pop('salon', None)
         super().__init__(*args, **kwargs)
         if self.salon:
-            self.fields['barber'].queryset = Barber.objects.filter(salon=self.salon)
+            self.fields['barber'].queryset = Barber.objects.for_salon(self.salon)
+            self.fields['barber'].widget.salon = self.salon
+        use_cached_choices(self.fields['payment_type'])
 
 class TransalonSearchForm(BootstrapFormMixin, forms.Form):
     trans_name = forms.CharField(
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloon', '0003_barber_saloon_barb_salon_i_bc8b40_idx_and_more'),
+        ('saloonfinance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='saloonfinan_salon_i_106c41_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transalon',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='saloonfinan_salon_i_ad8a1b_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:25
+
+import commonapp.models
+import django.db.models.deletion
+import saloonfinance.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloonfinance', '0002_payment_saloonfinan_salon_i_106c41_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='currency',
+            field=models.ForeignKey(default=commonapp.models.Currency.get_default_pk, on_delete=django.db.models.deletion.SET_DEFAULT, to='commonapp.currency', verbose_name='Currency'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_type',
+            field=models.ForeignKey(default=saloonfinance.models.PaymentType.get_default_pk, on_delete=django.db.models.deletion.PROTECT, to='saloonfinance.paymenttype', verbose_name='Payment type'),
+        ),
+        migrations.AlterField(
+            model_name='transalon',
+            name='currency',
+            field=models.ForeignKey(default=commonapp.models.Currency.get_default_pk, on_delete=django.db.models.deletion.SET_DEFAULT, to='commonapp.currency', verbose_name='Currency'),
+        ),
+    ]
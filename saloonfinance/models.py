@@ -1,23 +1,48 @@
 ''' Models for the saloonfinance app '''
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models, transaction
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.db.models import F, Sum
 from django.utils import timezone
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.utils.translation import gettext_lazy as _
-from commonapp.models import TimestampMixin, Currency
-from saloon.models import Salon, Barber
+from commonapp.models import TimestampMixin, Currency, SalonQuerySet
+from saloon.models import Salon, Barber, DeletionJob
 from decimal import Decimal
 from config.permissions import is_salon_owner, is_assigned_barber
+from config.metrics import timed_handler
+from config.pubsub import publish_on_commit
+from config.deletion import balance_reversal_skipped
+
+class CashRegisterQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('currency',)},
+        'detail': {'select_related': ('currency', 'salon')},
+        'export': {'select_related': ('currency', 'salon')},
+    }
+
+    # A register queued for deletion is gone for lists, pickers and forms,
+    # so nothing new is booked into it before its job runs.
+    def for_salon(self, salon, profile='list'):
+        return super().for_salon(salon, profile).exclude_pending_deletion()
+
+    def for_owner(self, user, profile='list'):
+        return super().for_owner(user, profile).exclude_pending_deletion()
+
+    def exclude_pending_deletion(self):
+        return self.exclude(pk__in=DeletionJob.active_for(self.model).values('object_id'))
 
 class CashRegister(TimestampMixin):
     name = models.CharField(_("Name"), max_length=255)
     balance = models.DecimalField(_("Balance"), max_digits=10, decimal_places=2, default=0)
     currency = models.ForeignKey(Currency, on_delete=models.PROTECT, related_name='cash_registers')
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='cash_registers', verbose_name=_("Salon"))
-        
+
+    objects = CashRegisterQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -45,6 +70,19 @@ class CashRegister(TimestampMixin):
         verbose_name_plural = _("Cash Registers")
         unique_together = ['name', 'salon']
 
+def balance_event(cashregister_id):
+    """Live event with a register's committed balance."""
+    row = CashRegister.objects.filter(pk=cashregister_id).values('id', 'name', 'balance').first()
+    return row and {'type': 'balance', **row}
+
+@receiver(post_save, sender=CashRegister)
+def publish_balance(sender, instance, raw=False, **kwargs):
+    # ``update_balance`` saves an F() expression, so the new balance is read back after commit.
+    if not raw:
+        publish_on_commit(instance.salon_id, lambda: balance_event(instance.pk))
+
+DEFAULT_PAYMENT_TYPE_KEY = 'payment-type:default'
+
 class PaymentType(TimestampMixin):
     name = models.CharField(_("Name"), max_length=50, unique=True)
     description = models.TextField(_("Description"), blank=True)
@@ -59,25 +97,48 @@ class PaymentType(TimestampMixin):
             name='SALARY',
             defaults={'description': 'Regular salary payment'}
         )
+        # Only cache rows that are committed, so a rolled back insert is never served.
+        timeout = getattr(settings, 'DEFAULT_LOOKUP_CACHE_TIMEOUT', 300)
+        transaction.on_commit(lambda: cache.set(DEFAULT_PAYMENT_TYPE_KEY, salary_type.pk, timeout))
         return salary_type
 
+    @classmethod
+    def get_default_pk(cls):
+        """The default payment type's pk, cached; used as the payment type field default."""
+        pk = cache.get(DEFAULT_PAYMENT_TYPE_KEY)
+        return cls.get_default().pk if pk is None else pk
+
     class Meta:
         verbose_name = _("Payment Type")
         verbose_name_plural = _("Payment Types")
 
+@receiver(post_save, sender=PaymentType)
+@receiver(post_delete, sender=PaymentType)
+def forget_default_payment_type(sender, **kwargs):
+    cache.delete(DEFAULT_PAYMENT_TYPE_KEY)
+
+class PaymentQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('barber__user', 'currency', 'payment_type', 'cashregister')},
+        'detail': {'select_related': ('barber__user', 'currency', 'payment_type', 'cashregister', 'salon')},
+        'export': {'select_related': ('barber__user', 'currency', 'payment_type', 'cashregister', 'salon')},
+    }
+
 class Payment(TimestampMixin):
     barber = models.ForeignKey(Barber, on_delete=models.CASCADE, verbose_name=_("Barber"))
     amount = models.DecimalField(_("Amount"), max_digits=19, decimal_places=2)
-    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default, verbose_name=_("Currency"))
+    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default_pk, verbose_name=_("Currency"))
     exchange_rate = models.DecimalField(_("Exchange rate"), max_digits=10, decimal_places=6, default=1.000000)
     amount_in_default_currency = models.DecimalField(_("Amount in default currency"), max_digits=19, decimal_places=2, default=0)
     start_date = models.DateField(_("Start date"))
     end_date = models.DateField(_("End date"))
-    payment_type = models.ForeignKey(PaymentType, on_delete=models.PROTECT, verbose_name=_("Payment type"), default=PaymentType.get_default)
+    payment_type = models.ForeignKey(PaymentType, on_delete=models.PROTECT, verbose_name=_("Payment type"), default=PaymentType.get_default_pk)
     cashregister = models.ForeignKey(CashRegister, on_delete=models.CASCADE, related_name='payments', verbose_name=_("Cash Register"))
     date_payment = models.DateField(_("Payment date"), default=timezone.now)
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='payments', verbose_name=_("Salon"))
 
+    objects = PaymentQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.barber} - {self.amount} - {self.payment_type}"
     
@@ -86,7 +147,7 @@ class Payment(TimestampMixin):
         if user:
             if not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
                 raise PermissionDenied(_("You don't have permission to manage payments for this salon."))
-        if self.currency != Currency.get_default():
+        if self.currency_id != Currency.get_default_pk():
             self.amount_in_default_currency = self.amount / self.exchange_rate
         else:
             self.amount_in_default_currency = self.amount
@@ -102,6 +163,14 @@ class Payment(TimestampMixin):
     class Meta:
         verbose_name = _("Payment")
         verbose_name_plural = _("Payments")
+        indexes = [models.Index(fields=['salon', 'modified_at', 'id'])]
+
+class TransalonQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('currency', 'cashregister')},
+        'detail': {'select_related': ('currency', 'cashregister', 'salon')},
+        'export': {'select_related': ('currency', 'cashregister', 'salon')},
+    }
 
 class Transalon(TimestampMixin):
     class TransactionType(models.TextChoices):
@@ -110,7 +179,7 @@ class Transalon(TimestampMixin):
 
     trans_name = models.CharField(_("Description of Transaction"), max_length=255)
     amount = models.DecimalField(_("Amount"), max_digits=19, decimal_places=2)
-    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default, verbose_name=_("Currency"))
+    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default_pk, verbose_name=_("Currency"))
     exchange_rate = models.DecimalField(_("Exchange rate"), max_digits=10, decimal_places=6, default=1.000000)
     amount_in_default_currency = models.DecimalField(_("Amount in default currency"), max_digits=19, decimal_places=2, default=0)
     date_trans = models.DateField(_("Transaction date"), default=timezone.now)
@@ -118,11 +187,13 @@ class Transalon(TimestampMixin):
     cashregister = models.ForeignKey(CashRegister, on_delete=models.CASCADE, related_name='transactions', verbose_name=_("Cash Register"))
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='transactions', verbose_name=_("Salon"))
 
+    objects = TransalonQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         user = kwargs.pop('user', None)
         if user and not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
             raise PermissionDenied(_("You don't have permission to manage transactions for this salon."))
-        if self.currency != Currency.get_default():
+        if self.currency_id != Currency.get_default_pk():
             self.amount_in_default_currency = self.amount / self.exchange_rate
         else:
             self.amount_in_default_currency = self.amount
@@ -140,10 +211,12 @@ class Transalon(TimestampMixin):
         verbose_name = _("Transaction")
         verbose_name_plural = _("Transactions")
         unique_together = ['trans_name', 'salon']
+        indexes = [models.Index(fields=['salon', 'modified_at', 'id'])]
 
 # Signals to update CashRegister balance
 @receiver(post_save, sender=Payment)
 @receiver(post_save, sender=Transalon)
+@timed_handler
 def update_cashregister_balance(sender, instance, created, **kwargs):
     with transaction.atomic():
         if created:
@@ -154,7 +227,10 @@ def update_cashregister_balance(sender, instance, created, **kwargs):
 
 @receiver(pre_delete, sender=Payment)
 @receiver(pre_delete, sender=Transalon)
+@timed_handler
 def revert_cashregister_balance(sender, instance, **kwargs):
+    if balance_reversal_skipped():
+        return
     with transaction.atomic():
         if (sender == Transalon and instance.trans_type == 'INCOME'):
             instance.cashregister.update_balance(instance.amount, 'EXPENSE')
@@ -1,3 +1,179 @@
-from django.test import TestCase
+import asyncio
+import datetime
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from commonapp.models import DEFAULT_CURRENCY_KEY, Currency
+from saloon.models import Salon, Barber, BarberType
+from config.metrics import registry
+from config.pubsub import broker, salon_channel
+from saloonservices.models import Hairstyle, Shave
+from .forms import CashRegisterForm, PaymentForm
+from .models import CashRegister, Payment, PaymentType
+from .views import cashregister_stream
+
+class FinanceTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.owner = CustomUser.objects.create_user('owner@example.com', 'password')
+        cls.salon = Salon.objects.create(name='Main', owner=cls.owner)
+        cls.other_salon = Salon.objects.create(name='Other', owner=CustomUser.objects.create_user('other@example.com', 'password'))
+        barber_user = CustomUser.objects.create_user('barber@example.com', 'password', first_name='Bob', last_name='Barber')
+        cls.barber = Barber.objects.create(
+            user=barber_user, salon=cls.salon, barber_type=BarberType.objects.create(name='Senior'),
+            start_date=datetime.date(2024, 1, 1),
+        )
+        cls.register = CashRegister.objects.create(name='Front desk', salon=cls.salon, currency=Currency.get_default())
+        cls.other_register = CashRegister.objects.create(name='Other desk', salon=cls.other_salon, currency=Currency.get_default())
+
+    def setUp(self):
+        # The default currency is only cached once committed, which test transactions never are.
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.get_default()
+
+class ValidateFieldTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.owner)
+        self.url = reverse('saloonfinance:validate_field')
+
+    def validate(self, **data):
+        return self.client.post(self.url, {'form_class': 'PaymentForm', 'salon_id': self.salon.pk, **data})
+
+    def test_single_field(self):
+        self.assertEqual(self.validate(field_name='amount', field_value='12.50').status_code, 200)
+        response = self.validate(field_name='amount', field_value='lots')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_choices_are_limited_to_the_salon(self):
+        response = self.validate(cashregister=self.other_register.pk, amount='5')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['errors']), ['cashregister'])
+        self.assertEqual(response.json()['valid'], ['amount'])
+        self.assertEqual(self.validate(cashregister=self.register.pk).json()['valid'], ['cashregister'])
+
+    def test_rejects_foreign_and_malformed_salons(self):
+        for salon_id in (self.other_salon.pk, 'abc', '1 OR 1=1'):
+            with self.subTest(salon_id=salon_id):
+                self.assertEqual(self.validate(salon_id=salon_id, field_name='amount', field_value='1').status_code, 403)
+        response = self.client.post(self.url, {'form_class': 'Nope', 'field_name': 'amount', 'field_value': '1'})
+        self.assertEqual(response.status_code, 400)
+
+class DefaultLookupTests(FinanceTestCase):
+    def test_defaults_cache_only_the_primary_key(self):
+        self.assertEqual(cache.get(DEFAULT_CURRENCY_KEY), Currency.get_default().pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            salary = PaymentType.get_default()
+        with self.assertNumQueries(0):
+            payment = Payment(barber=self.barber, cashregister=self.register, salon=self.salon, amount=1)
+        self.assertEqual((payment.currency_id, payment.payment_type_id), (Currency.get_default().pk, salary.pk))
+
+    @override_settings(DEFAULT_LOOKUP_CACHE_TIMEOUT=0)
+    def test_default_pks_fall_back_to_the_database(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Currency.get_default_pk(), self.register.currency_id)
+        self.assertIsNone(cache.get(DEFAULT_CURRENCY_KEY))
+
+    def test_edits_drop_the_cached_default(self):
+        currency = Currency.get_default()
+        currency.name = 'Dollar'
+        currency.save()
+        self.assertIsNone(cache.get(DEFAULT_CURRENCY_KEY))
+
+class CachedChoicesTests(FinanceTestCase):
+    def test_selects_render_from_the_cache_and_still_validate(self):
+        # The first render creates the default payment type, which bumps its version.
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                PaymentForm(user=self.owner, salon=self.salon)
+        with self.assertNumQueries(0):
+            form = PaymentForm(user=self.owner, salon=self.salon)
+            self.assertEqual(len(form.fields['cashregister'].widget.choices), 2)
+        form = PaymentForm({'cashregister': self.other_register.pk, 'amount': '5'}, user=self.owner, salon=self.salon)
+        self.assertIn('cashregister', form.errors)
+
+class FormHtmlCacheTests(FinanceTestCase):
+    def render(self, *args):
+        return str(CashRegisterForm(*args, user=self.owner, salon=self.salon))
+
+    def test_empty_create_forms_are_served_from_the_cache(self):
+        hits = ('salon_cache_requests_total', (('cache', 'form_html'), ('result', 'hit')))
+        before = registry.counters[hits]
+        html = self.render()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(), html)
+        self.assertEqual(registry.counters[hits], before + 1)
+
+    def test_choice_edits_invalidate_the_html(self):
+        self.render()
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.objects.create(code='EUR', name='Euro')
+        self.assertIn('Euro', self.render())
+
+    def test_bound_forms_are_not_cached(self):
+        form = CashRegisterForm({'name': 'Back'}, user=self.owner, salon=self.salon)
+        self.assertIsNone(form.get_render_cache_key(form.template_name))
+
+class LiveEventTests(FinanceTestCase):
+    def complete_shave_and_save_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            shave = Shave.objects.create(
+                barber=self.barber, hairstyle=Hairstyle.objects.create(name='Fade', salon=self.salon, current_tariff=10),
+                cashregister=self.register, salon=self.salon, amount=10,
+            )
+        for status in ('COMPLETED', 'COMPLETED'):
+            with self.captureOnCommitCallbacks(execute=True):
+                shave.status = status
+                shave.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Shave.objects.get(pk=shave.pk).save()
+        return shave.pk
+
+    async def test_completed_shaves_are_announced_once(self):
+        queue = broker.subscribe(salon_channel(self.salon.pk))
+        try:
+            pk = await sync_to_async(self.complete_shave_and_save_again)()
+            events = []
+            while True:
+                try:
+                    events.append(await asyncio.wait_for(queue.get(), timeout=0.1))
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            broker.unsubscribe(salon_channel(self.salon.pk), queue)
+        self.assertEqual([event['id'] for event in events if event['type'] == 'shave_completed'], [pk])
+
+    async def test_stream_subscribes_before_reading_the_balances(self):
+        request = AsyncRequestFactory().get(f'/finance/{self.salon.pk}/cashregisters/stream/')
+        request.user = self.owner
+        response = await cashregister_stream(request, self.salon.pk)
+        # A change made before the stream starts is in the snapshot.
+        await CashRegister.objects.filter(pk=self.register.pk).aupdate(balance=5)
+        stream = aiter(response.streaming_content)
+        channel = salon_channel(self.salon.pk)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        # Anything committed from here on is queued, even before the snapshot is read.
+        self.assertTrue(broker.has_subscribers(channel))
+        broker.publish(channel, {'type': 'balance', 'id': self.register.pk, 'name': 'Front desk', 'balance': '7.00'})
+        self.assertIn(b'"balance": "5.00"', await anext(stream))
+        self.assertIn(b'"balance": "7.00"', await anext(stream))
+        # Django does not close the view's generator itself; it is finalized once dropped.
+        await stream.aclose()
+        del stream, response
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.assertFalse(broker.has_subscribers(channel))
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('saloonfinance:cashregister_stream', kwargs={'salon_id': self.salon.pk}))
+        self.assertEqual(response.status_code, 501)
@@ -6,6 +6,7 @@ app_name = 'saloonfinance'
 urlpatterns = [
     # Cash Register URLs
     path('<int:salon_id>/cashregisters/', views.CashRegisterListView.as_view(), name='cashregister_list'),
+    path('<int:salon_id>/cashregisters/stream/', views.cashregister_stream, name='cashregister_stream'),
     path('<int:salon_id>/cashregisters/create/', views.CashRegisterCreateView.as_view(), name='cashregister_create'),
     path('<int:salon_id>/cashregisters/<int:pk>/update/', views.CashRegisterUpdateView.as_view(), name='cashregister_update'),
     path('<int:salon_id>/cashregisters/<int:pk>/delete/', views.CashRegisterDeleteView.as_view(), name='cashregister_delete'),
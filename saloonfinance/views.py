@@ -1,19 +1,31 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.db.models import Q
-from .models import CashRegister, Payment, Transalon
+from .models import CashRegister, Payment, Transalon, balance_event
 from .forms import (
     CashRegisterForm, PaymentForm, TransalonForm,
     CashRegisterSearchForm, PaymentSearchForm, TransalonSearchForm
 )
-from saloon.models import Salon
 from config.permissions import is_salon_owner, is_assigned_barber
+from config.conditional import ConditionalGetMixin
+from config.fragments import HtmxFragmentMixin
+from config.salon_context import get_request_salon
+from config.validation import FieldValidator
+from config.pubsub import broker, salon_channel
+from saloon.deletion import DeletionJobMixin
 
 class HtmxResponseMixin:
     def form_valid(self, form):
@@ -25,21 +37,29 @@ class HtmxResponseMixin:
     def get_htmx_response(self):
         return ""
 
+    def get_template_names(self):
+        # Modal dialogs only need the form itself, not the full page.
+        if self.request.htmx and not self.request.htmx.boosted:
+            return ['form_fragment.html']
+        return super().get_template_names()
+
 class SalonPermissionMixin:
     def dispatch(self, request, *args, **kwargs):
-        self.salon = get_object_or_404(Salon, pk=self.kwargs['salon_id'])
+        self.salon = get_request_salon(request, self.kwargs['salon_id'])
         if not (is_salon_owner(request.user, self.salon) or is_assigned_barber(request.user, self.salon)):
             raise PermissionDenied(_("You don't have permission to access this salon's finances."))
         return super().dispatch(request, *args, **kwargs)
 
-class CashRegisterListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class CashRegisterListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
     model = CashRegister
     template_name = 'saloonfinance/cashregister_list.html'
     context_object_name = 'cashregisters'
+    version_dependencies = ('commonapp.currency',)
     paginate_by = 10
+    query_budget = 8
 
     def get_queryset(self):
-        queryset = CashRegister.objects.filter(salon=self.salon)
+        queryset = CashRegister.objects.for_salon(self.salon)
         form = CashRegisterSearchForm(self.request.GET)
         if form.is_valid():
             name = form.cleaned_data.get('name')
@@ -87,29 +107,24 @@ class CashRegisterUpdateView(LoginRequiredMixin, SalonPermissionMixin, HtmxRespo
     def get_htmx_response(self):
         return f"<div class='alert alert-success'>{_('Cash register updated successfully.')}</div>"
 
-class CashRegisterDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeleteView):
+class CashRegisterDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeletionJobMixin, DeleteView):
     model = CashRegister
     template_name = 'saloonfinance/cashregister_confirm_delete.html'
 
     def get_success_url(self):
         return reverse_lazy('saloonfinance:cashregister_list', kwargs={'salon_id': self.salon.id})
 
-    def delete(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        success_url = self.get_success_url()
-        self.object.delete()
-        if request.htmx:
-            return HttpResponse(f"<div class='alert alert-success'>{_('Cash register deleted successfully.')}</div>")
-        return super().delete(request, *args, **kwargs)
-
-class PaymentListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class PaymentListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, HtmxFragmentMixin, ListView):
     model = Payment
     template_name = 'saloonfinance/payment_list.html'
     context_object_name = 'payments'
+    fragment_template_name = 'saloonfinance/partials/payment_rows.html'
+    version_dependencies = ('saloon.barber', 'saloonfinance.cashregister', 'accounts.customuser', 'saloonfinance.paymenttype', 'commonapp.currency')
     paginate_by = 10
+    query_budget = 10
 
     def get_queryset(self):
-        queryset = Payment.objects.filter(salon=self.salon)
+        queryset = Payment.objects.for_salon(self.salon)
         form = PaymentSearchForm(self.request.GET, salon=self.salon)
         if form.is_valid():
             barber = form.cleaned_data.get('barber')
@@ -128,7 +143,8 @@ class PaymentListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = PaymentSearchForm(self.request.GET, salon=self.salon)
+        if not self.is_fragment_request():
+            context['search_form'] = PaymentSearchForm(self.request.GET, salon=self.salon)
         context['salon'] = self.salon
         return context
 
@@ -181,14 +197,16 @@ class PaymentDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeleteView):
             return HttpResponse(f"<div class='alert alert-success'>{_('Payment deleted successfully.')}</div>")
         return super().delete(request, *args, **kwargs)
 
-class TransalonListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class TransalonListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
     model = Transalon
     template_name = 'saloonfinance/transalon_list.html'
     context_object_name = 'transalons'
+    version_dependencies = ('saloonfinance.cashregister', 'commonapp.currency')
     paginate_by = 10
+    query_budget = 8
 
     def get_queryset(self):
-        queryset = Transalon.objects.filter(salon=self.salon)
+        queryset = Transalon.objects.for_salon(self.salon)
         form = TransalonSearchForm(self.request.GET)
         if form.is_valid():
             trans_name = form.cleaned_data.get('trans_name')
@@ -260,24 +278,66 @@ class TransalonDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeleteView):
             return HttpResponse(f"<div class='alert alert-success'>{_('Transaction deleted successfully.')}</div>")
         return super().delete(request, *args, **kwargs)
 
+field_validator = FieldValidator(CashRegisterForm, PaymentForm, TransalonForm)
+
 def validate_field(request):
-    field_name = request.POST.get('field_name')
-    field_value = request.POST.get('field_value')
-    form_class = request.POST.get('form_class')
-
-    form_classes = {
-        'CashRegisterForm': CashRegisterForm,
-        'PaymentForm': PaymentForm,
-        'TransalonForm': TransalonForm,
-    }
-
-    FormClass = form_classes.get(form_class)
-    if not FormClass:
-        return JsonResponse({'error': _("Invalid form class")}, status=400)
-
-    form = FormClass({field_name: field_value}, user=request.user, salon=request.user.salon)
-    form.is_valid()
-    
-    if field_name in form.errors:
-        return JsonResponse({'error': form.errors[field_name][0]}, status=400)
-    return JsonResponse({'success': _("Field is valid")})
+    return field_validator.respond(request)
+
+def sse_message(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+def check_stream_access(request, salon_id):
+    if not request.user.is_authenticated:
+        raise PermissionDenied
+    salon = get_request_salon(request, salon_id)
+    if not (is_salon_owner(request.user, salon) or is_assigned_barber(request.user, salon)):
+        raise PermissionDenied(_("You don't have permission to access this salon's finances."))
+    return salon
+
+def balance_snapshot(salon):
+    return [balance_event(pk) for pk in CashRegister.objects.for_salon(salon, profile=None).values_list('pk', flat=True)]
+
+async def cashregister_stream(request, salon_id):
+    """
+    Server-sent events with the salon's register balances (``balance``) and
+    completed shaves (``shave_completed``) as they are committed. The current
+    balances are sent first; a ``resync`` event means events were dropped and
+    the page should reload.
+
+    Needs ASGI (``config/asgi.py``). Under WSGI, Django buffers an async
+    streaming body to completion before sending it, so this endless stream
+    would never reach the browser and would hold its worker forever; it is
+    refused with a 501 instead, which stops EventSource from reconnecting.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(_("Live updates need an ASGI server."), status=501, content_type='text/plain')
+    salon = await sync_to_async(check_stream_access)(request, salon_id)
+    channel = salon_channel(salon.pk)
+    keepalive = getattr(settings, 'SSE_KEEPALIVE_SECONDS', 15)
+
+    async def events():
+        # Subscribe before reading the balances, so a change committed in
+        # between is queued rather than lost; balances are absolute, so a
+        # queued repeat of the snapshot is harmless.
+        queue = broker.subscribe(channel)
+        try:
+            yield "retry: 5000\n\n"
+            for event in await sync_to_async(balance_snapshot)(salon):
+                yield sse_message(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if queue.lost:
+                    queue.lost = False
+                    yield sse_message({'type': 'resync'})
+                yield sse_message(event)
+        finally:
+            broker.unsubscribe(channel, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
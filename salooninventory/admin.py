@@ -1,17 +1,20 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import Item, ItemUsed, ItemPurchase
+from .models import (
+    Item, ItemUsed, ItemPurchase, ItemReceipt, Stocktake, StockAdjustment,
+    StockReservation, HairstyleRecipe
+)
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'currency', 'current_stock', 'salon')
+    list_display = ('name', 'price', 'currency', 'current_stock', 'reserved_stock', 'salon')
     list_filter = ('salon', 'currency')
     search_fields = ('name', 'salon__name')
     ordering = ('name',)
 
     fieldsets = (
         (None, {
-            'fields': ('name', 'item_purpose', 'price', 'currency', 'salon', 'current_stock')
+            'fields': ('name', 'item_purpose', 'price', 'currency', 'salon', 'current_stock', 'reserved_stock')
         }),
         (_('Advanced options'), {
             'classes': ('collapse',),
@@ -19,7 +22,7 @@ class ItemAdmin(admin.ModelAdmin):
         }),
     )
 
-    readonly_fields = ('amount_in_default_currency',)
+    readonly_fields = ('amount_in_default_currency', 'reserved_stock')
 
     def get_readonly_fields(self, request, obj=None):
         if obj:  # editing an existing object
@@ -73,6 +76,71 @@ class ItemPurchaseAdmin(admin.ModelAdmin):
             return self.readonly_fields + ('salon', 'cashregister')
         return self.readonly_fields
 
+class ItemPurchaseInline(admin.TabularInline):
+    model = ItemPurchase
+    fields = ('item', 'quantity', 'purchase_price', 'purchase_price_in_default_currency')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(ItemReceipt)
+class ItemReceiptAdmin(admin.ModelAdmin):
+    list_display = ('supplier', 'purchase_date', 'total_cost', 'currency', 'cashregister', 'salon')
+    list_filter = ('salon', 'currency', 'purchase_date')
+    search_fields = ('supplier', 'salon__name')
+    date_hierarchy = 'purchase_date'
+    ordering = ('-purchase_date',)
+    inlines = [ItemPurchaseInline]
+
+    readonly_fields = ('supplier', 'purchase_date', 'currency', 'exchange_rate', 'cashregister', 'total_cost', 'salon')
+
+    def has_add_permission(self, request):
+        return False
+
+class StockAdjustmentInline(admin.TabularInline):
+    model = StockAdjustment
+    fields = ('item', 'expected_quantity', 'counted_quantity', 'difference')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(Stocktake)
+class StocktakeAdmin(admin.ModelAdmin):
+    list_display = ('salon', 'counted_at', 'note')
+    list_filter = ('salon', 'counted_at')
+    search_fields = ('note', 'salon__name')
+    date_hierarchy = 'counted_at'
+    ordering = ('-counted_at',)
+    inlines = [StockAdjustmentInline]
+
+    readonly_fields = ('counted_at', 'salon')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('item', 'shave', 'quantity', 'salon')
+    list_filter = ('salon', 'item')
+    search_fields = ('item__name', 'salon__name')
+    readonly_fields = ('shave', 'item', 'quantity', 'salon')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(HairstyleRecipe)
+class HairstyleRecipeAdmin(admin.ModelAdmin):
+    list_display = ('hairstyle', 'item', 'quantity', 'salon')
+    list_filter = ('salon', 'hairstyle')
+    search_fields = ('hairstyle__name', 'item__name', 'salon__name')
+    ordering = ('hairstyle__name', 'item__name')
+
+    fieldsets = (
+        (None, {
+            'fields': ('hairstyle', 'item', 'quantity', 'salon')
+        }),
+    )
+
 # Optionally, you can customize the admin site header and title
 admin.site.site_header = _("Saloon Inventory Administration")
 admin.site.site_title = _("Saloon Inventory Admin Portal")
@@ -1,38 +1,28 @@
+import csv
+import io
+
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
-from .models import Item, ItemUsed, ItemPurchase
-from saloonservices.models import Hairstyle
+from django.utils.functional import cached_property
+from .models import Item, ItemUsed, ItemPurchase, ItemReceipt, Stocktake, HairstyleRecipe
+from saloonservices.models import Hairstyle, Shave
 from saloon.models import Salon, Barber
 from saloonfinance.models import CashRegister
 from config.permissions import is_salon_owner, is_assigned_barber
+from commonapp.forms import BootstrapFormMixin as BaseBootstrapFormMixin
+from config.choices import use_cached_choices
+from config.autocomplete import AutocompleteSelect, AutocompleteSelectMultiple
 
-class BootstrapFormMixin:
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        for field_name, field in self.fields.items():
-            if isinstance(field.widget, (forms.TextInput, forms.NumberInput, forms.EmailInput, forms.URLInput, forms.DateInput)):
-                field.widget.attrs.update({'class': 'form-control'})
-            elif isinstance(field.widget, forms.Select):
-                field.widget.attrs.update({'class': 'form-select'})
-            elif isinstance(field.widget, forms.Textarea):
-                field.widget.attrs.update({'class': 'form-control', 'rows': 3})
-            elif isinstance(field.widget, forms.CheckboxInput):
-                field.widget.attrs.update({'class': 'form-check-input'})
-            
-            # Add HTMX attributes for real-time validation
-            field.widget.attrs.update({
-                'hx-post': 'validate-field',
-                'hx-trigger': 'blur',
-                'hx-target': f'#{field_name}-errors',
-            })
+class BootstrapFormMixin(BaseBootstrapFormMixin):
+    validate_fields = True
 
 class ItemForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
         model = Item
         fields = ['name', 'item_purpose', 'price', 'currency', 'salon', 'current_stock']
         widgets = {
-            'item_purpose': forms.SelectMultiple(attrs={'class': 'form-select'}),
+            'item_purpose': AutocompleteSelectMultiple('hairstyle', attrs={'class': 'form-select'}),
         }
 
     def __init__(self, *args, **kwargs):
@@ -40,7 +30,8 @@ class ItemForm(BootstrapFormMixin, forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['item_purpose'].queryset = Hairstyle.objects.filter(salon__owner=self.user)
+            self.fields['item_purpose'].queryset = Hairstyle.objects.for_owner(self.user)
+        use_cached_choices(self.fields['currency'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -54,14 +45,20 @@ class ItemUsedForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
         model = ItemUsed
         fields = ['item', 'shave', 'barber', 'quantity', 'note', 'salon']
+        widgets = {
+            'item': AutocompleteSelect('item'),
+            'shave': AutocompleteSelect('shave'),
+            'barber': AutocompleteSelect('barber'),
+        }
 
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['item'].queryset = Item.objects.filter(salon__owner=self.user)
-            self.fields['barber'].queryset = Barber.objects.filter(salon__owner=self.user)
+            self.fields['item'].queryset = Item.objects.for_owner(self.user)
+            self.fields['shave'].queryset = Shave.objects.for_owner(self.user)
+            self.fields['barber'].queryset = Barber.objects.for_owner(self.user)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -76,6 +73,7 @@ class ItemPurchaseForm(BootstrapFormMixin, forms.ModelForm):
         model = ItemPurchase
         fields = ['item', 'quantity', 'purchase_price', 'currency', 'purchase_date', 'supplier', 'cashregister', 'salon']
         widgets = {
+            'item': AutocompleteSelect('item'),
             'purchase_date': forms.DateInput(attrs={'type': 'date'}),
         }
 
@@ -84,8 +82,9 @@ class ItemPurchaseForm(BootstrapFormMixin, forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['item'].queryset = Item.objects.filter(salon__owner=self.user)
-            self.fields['cashregister'].queryset = CashRegister.objects.filter(salon__owner=self.user)
+            self.fields['item'].queryset = Item.objects.for_owner(self.user)
+            self.fields['cashregister'].queryset = CashRegister.objects.for_owner(self.user)
+        use_cached_choices(self.fields['currency'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -95,6 +94,208 @@ class ItemPurchaseForm(BootstrapFormMixin, forms.ModelForm):
                 raise ValidationError(_("You don't have permission to purchase inventory items for this salon."))
         return cleaned_data
 
+class ItemReceiptForm(BootstrapFormMixin, forms.ModelForm):
+    class Meta:
+        model = ItemReceipt
+        fields = ['supplier', 'purchase_date', 'currency', 'exchange_rate', 'cashregister']
+        widgets = {
+            'purchase_date': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        self.salon = kwargs.pop('salon', None)
+        super().__init__(*args, **kwargs)
+        if self.salon:
+            self.instance.salon = self.salon
+            self.fields['cashregister'].queryset = CashRegister.objects.for_salon(self.salon)
+            use_cached_choices(self.fields['cashregister'], self.salon)
+        use_cached_choices(self.fields['currency'])
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.user and self.salon:
+            if not (is_salon_owner(self.user, self.salon) or is_assigned_barber(self.user, self.salon)):
+                raise ValidationError(_("You don't have permission to purchase inventory items for this salon."))
+        return cleaned_data
+
+class ItemReceiptLineForm(BootstrapFormMixin, forms.Form):
+    item = forms.TypedChoiceField(label=_("Item"), coerce=int, widget=AutocompleteSelect('item'))
+    quantity = forms.IntegerField(label=_("Quantity"), min_value=1)
+    purchase_price = forms.DecimalField(label=_("Purchase price"), max_digits=19, decimal_places=2)
+
+    def __init__(self, *args, **kwargs):
+        self.items = kwargs.pop('items', {})
+        salon = kwargs.pop('salon', None)
+        super().__init__(*args, **kwargs)
+        # Only the submitted items are choices; the widget searches the rest on demand.
+        self.fields['item'].choices = [('', '---------')] + [(pk, item.name) for pk, item in self.items.items()]
+        self.fields['item'].widget.salon = salon
+
+    def clean_purchase_price(self):
+        purchase_price = self.cleaned_data.get('purchase_price')
+        if purchase_price is not None and purchase_price <= 0:
+            raise ValidationError(_("Purchase price must be positive."))
+        return purchase_price
+
+    def get_line(self):
+        return ItemPurchase(
+            item=self.items[self.cleaned_data['item']],
+            quantity=self.cleaned_data['quantity'],
+            purchase_price=self.cleaned_data['purchase_price'],
+        )
+
+class BaseItemReceiptLineFormSet(forms.BaseFormSet):
+    """
+    Line formset that loads the items submitted in any of its lines with one
+    query, so neither validation nor rendering depends on the salon's
+    catalogue size.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.salon = kwargs.pop('salon', None)
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def items(self):
+        submitted = {
+            value for key, value in self.data.items()
+            if key.startswith(f'{self.prefix}-') and key.endswith('-item') and str(value).isdigit()
+        }
+        if not submitted:
+            return {}
+        queryset = Item.objects.filter(salon=self.salon, pk__in=submitted).only('pk', 'name', 'salon_id').order_by('name')
+        return {item.pk: item for item in queryset}
+
+    def get_form_kwargs(self, index):
+        return {**super().get_form_kwargs(index), 'items': self.items, 'salon': self.salon}
+
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+        if not self.get_lines():
+            raise ValidationError(_("A receipt needs at least one line."))
+
+    def get_lines(self):
+        return [form.get_line() for form in self.forms if form.has_changed() and form.cleaned_data]
+
+ItemReceiptLineFormSet = forms.formset_factory(
+    ItemReceiptLineForm, formset=BaseItemReceiptLineFormSet, extra=5, max_num=500
+)
+
+class StocktakeForm(BootstrapFormMixin, forms.ModelForm):
+    """
+    Counted quantities come from a CSV upload with ``item`` (name or id) and
+    ``counted`` columns, from the per-item grid fields, or from both. Grid
+    values win over the CSV for the same item.
+    """
+    # One count field per item, labelled with its live stock.
+    render_cache = False
+    csv_file = forms.FileField(label=_("CSV file"), required=False)
+
+    class Meta:
+        model = Stocktake
+        fields = ['counted_at', 'note']
+        widgets = {
+            'counted_at': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        self.salon = kwargs.pop('salon', None)
+        super().__init__(*args, **kwargs)
+        self.items = list(Item.objects.filter(salon=self.salon).values_list('pk', 'name', 'current_stock').order_by('name'))
+        for pk, name, current_stock in self.items:
+            self.fields[f'count_{pk}'] = forms.IntegerField(
+                label=name,
+                min_value=0,
+                required=False,
+                help_text=_("In stock: %(stock)s") % {'stock': current_stock},
+                widget=forms.NumberInput(attrs={'class': 'form-control'}),
+            )
+        if self.salon:
+            self.instance.salon = self.salon
+
+    def clean_csv_file(self):
+        csv_file = self.cleaned_data.get('csv_file')
+        self.csv_counts = {}
+        if not csv_file:
+            return csv_file
+        by_name = {name.lower(): pk for pk, name, _stock in self.items}
+        by_pk = {str(pk): pk for pk, _name, _stock in self.items}
+        try:
+            reader = csv.DictReader(io.StringIO(csv_file.read().decode('utf-8-sig')))
+            for line_number, row in enumerate(reader, start=2):
+                key = (row.get('item') or '').strip()
+                item_id = by_pk.get(key) or by_name.get(key.lower())
+                if item_id is None:
+                    raise ValidationError(_("Line %(line)s: unknown item \"%(item)s\".") % {'line': line_number, 'item': key})
+                try:
+                    # Short rows give None for their missing columns.
+                    counted = int(row.get('counted') or '')
+                except ValueError:
+                    counted = -1
+                if counted < 0:
+                    raise ValidationError(_("Line %(line)s: counted quantity must be a whole number of zero or more.") % {'line': line_number})
+                self.csv_counts[item_id] = counted
+        except (UnicodeDecodeError, csv.Error):
+            raise ValidationError(_("The file is not a valid UTF-8 CSV file."))
+        return csv_file
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.user and self.salon:
+            if not (is_salon_owner(self.user, self.salon) or is_assigned_barber(self.user, self.salon)):
+                raise ValidationError(_("You don't have permission to manage inventory items for this salon."))
+        self.counts = dict(getattr(self, 'csv_counts', {}))
+        for pk, _name, _stock in self.items:
+            counted = cleaned_data.get(f'count_{pk}')
+            if counted is not None:
+                self.counts[pk] = counted
+        if not self.counts and 'csv_file' not in self.errors:
+            raise ValidationError(_("Enter at least one counted quantity or upload a CSV file."))
+        return cleaned_data
+
+class HairstyleRecipeForm(BootstrapFormMixin, forms.ModelForm):
+    class Meta:
+        model = HairstyleRecipe
+        fields = ['hairstyle', 'item', 'quantity']
+        widgets = {
+            'hairstyle': AutocompleteSelect('hairstyle'),
+            'item': AutocompleteSelect('item'),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        self.salon = kwargs.pop('salon', None)
+        super().__init__(*args, **kwargs)
+        if self.salon:
+            self.instance.salon = self.salon
+            self.fields['hairstyle'].queryset = Hairstyle.objects.for_salon(self.salon)
+            self.fields['item'].queryset = Item.objects.for_salon(self.salon)
+            self.fields['hairstyle'].widget.salon = self.fields['item'].widget.salon = self.salon
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.user and self.salon:
+            if not (is_salon_owner(self.user, self.salon) or is_assigned_barber(self.user, self.salon)):
+                raise ValidationError(_("You don't have permission to manage hairstyle recipes for this salon."))
+        return cleaned_data
+
+    def save(self, commit=True):
+        recipe = super().save(commit=False)
+        recipe.salon = self.salon
+        if commit:
+            recipe.save(user=self.user)
+        return recipe
+
+class ShaveCloseForm(BootstrapFormMixin, forms.Form):
+    date_shave = forms.DateField(
+        label=_("Shave date"),
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+
 class ItemSearchForm(BootstrapFormMixin, forms.Form):
     name = forms.CharField(
         label=_("Item Name"),
@@ -106,7 +307,7 @@ class ItemSearchForm(BootstrapFormMixin, forms.Form):
         label=_("Hairstyle"),
         queryset=Hairstyle.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/inventory/items/', 'hx-trigger': 'change', 'hx-target': '#item-list'})
+        widget=AutocompleteSelect('hairstyle', attrs={'hx-get': '/inventory/items/', 'hx-trigger': 'change', 'hx-target': '#item-list'})
     )
     salon = forms.ModelChoiceField(
         label=_("Salon"),
@@ -120,20 +321,20 @@ class ItemSearchForm(BootstrapFormMixin, forms.Form):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['hairstyle'].queryset = Hairstyle.objects.filter(salon__owner=self.user)
+            self.fields['hairstyle'].queryset = Hairstyle.objects.for_owner(self.user)
 
 class ItemUsedSearchForm(BootstrapFormMixin, forms.Form):
     item = forms.ModelChoiceField(
         label=_("Item"),
         queryset=Item.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/inventory/items-used/', 'hx-trigger': 'change', 'hx-target': '#item-used-list'})
+        widget=AutocompleteSelect('item', attrs={'hx-get': '/inventory/items-used/', 'hx-trigger': 'change', 'hx-target': '#item-used-list'})
     )
     barber = forms.ModelChoiceField(
         label=_("Barber"),
         queryset=Barber.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/inventory/items-used/', 'hx-trigger': 'change', 'hx-target': '#item-used-list'})
+        widget=AutocompleteSelect('barber', attrs={'hx-get': '/inventory/items-used/', 'hx-trigger': 'change', 'hx-target': '#item-used-list'})
     )
     start_date = forms.DateField(
         label=_("Start Date"),
@@ -157,15 +358,15 @@ class ItemUsedSearchForm(BootstrapFormMixin, forms.Form):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['item'].queryset = Item.objects.filter(salon__owner=self.user)
-            self.fields['barber'].queryset = Barber.objects.filter(salon__owner=self.user)
+            self.fields['item'].queryset = Item.objects.for_owner(self.user)
+            self.fields['barber'].queryset = Barber.objects.for_owner(self.user)
 
 class ItemPurchaseSearchForm(BootstrapFormMixin, forms.Form):
     item = forms.ModelChoiceField(
         label=_("Item"),
         queryset=Item.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/inventory/purchases/', 'hx-trigger': 'change', 'hx-target': '#purchase-list'})
+        widget=AutocompleteSelect('item', attrs={'hx-get': '/inventory/purchases/', 'hx-trigger': 'change', 'hx-target': '#purchase-list'})
     )
     supplier = forms.CharField(
         label=_("Supplier"),
@@ -195,4 +396,4 @@ class ItemPurchaseSearchForm(BootstrapFormMixin, forms.Form):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['item'].queryset = Item.objects.filter(salon__owner=self.user)
\ No newline at end of file
+            self.fields['item'].queryset = Item.objects.for_owner(self.user)
\ No newline at end of file
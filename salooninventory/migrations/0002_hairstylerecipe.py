@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('saloon', '0002_remove_barber_can_manage_barbers_and_more'),
+        ('salooninventory', '0001_initial'),
+        ('saloonservices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HairstyleRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='Modified at')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantity')),
+                ('hairstyle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_lines', to='saloonservices.hairstyle', verbose_name='Hairstyle')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_lines', to='salooninventory.item', verbose_name='Item')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hairstyle_recipes', to='saloon.salon', verbose_name='Salon')),
+            ],
+            options={
+                'verbose_name': 'Hairstyle Recipe',
+                'verbose_name_plural': 'Hairstyle Recipes',
+                'unique_together': {('hairstyle', 'item')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:18
+
+import commonapp.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloon', '0002_remove_barber_can_manage_barbers_and_more'),
+        ('saloonfinance', '0001_initial'),
+        ('salooninventory', '0002_hairstylerecipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='Modified at')),
+                ('supplier', models.CharField(max_length=255, verbose_name='Supplier')),
+                ('purchase_date', models.DateField(default=django.utils.timezone.now, verbose_name='Purchase date')),
+                ('exchange_rate', models.DecimalField(decimal_places=4, default=1.0, max_digits=10, verbose_name='Exchange rate')),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=19, verbose_name='Total cost')),
+                ('cashregister', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_receipts', to='saloonfinance.cashregister', verbose_name='Cash Register')),
+                ('currency', models.ForeignKey(default=commonapp.models.Currency.get_default, on_delete=django.db.models.deletion.SET_DEFAULT, related_name='item_receipts', to='commonapp.currency', verbose_name='Currency')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_receipts', to='saloon.salon', verbose_name='Salon')),
+            ],
+            options={
+                'verbose_name': 'Item Receipt',
+                'verbose_name_plural': 'Item Receipts',
+            },
+        ),
+        migrations.AddField(
+            model_name='itempurchase',
+            name='receipt',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='salooninventory.itemreceipt', verbose_name='Receipt'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('saloon', '0002_remove_barber_can_manage_barbers_and_more'),
+        ('salooninventory', '0003_itemreceipt_itempurchase_receipt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stocktake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='Modified at')),
+                ('counted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Counted at')),
+                ('note', models.TextField(blank=True, verbose_name='Note')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocktakes', to='saloon.salon', verbose_name='Salon')),
+            ],
+            options={
+                'verbose_name': 'Stocktake',
+                'verbose_name_plural': 'Stocktakes',
+                'ordering': ['-counted_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockAdjustment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='Modified at')),
+                ('expected_quantity', models.PositiveIntegerField(verbose_name='Expected quantity')),
+                ('counted_quantity', models.PositiveIntegerField(verbose_name='Counted quantity')),
+                ('difference', models.IntegerField(verbose_name='Difference')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adjustments', to='salooninventory.item', verbose_name='Item')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_adjustments', to='saloon.salon', verbose_name='Salon')),
+                ('stocktake', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adjustments', to='salooninventory.stocktake', verbose_name='Stocktake')),
+            ],
+            options={
+                'verbose_name': 'Stock Adjustment',
+                'verbose_name_plural': 'Stock Adjustments',
+                'unique_together': {('stocktake', 'item')},
+            },
+        ),
+    ]
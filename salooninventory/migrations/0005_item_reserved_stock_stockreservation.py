@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('saloon', '0002_remove_barber_can_manage_barbers_and_more'),
+        ('salooninventory', '0004_stocktake_stockadjustment'),
+        ('saloonservices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='reserved_stock',
+            field=models.PositiveIntegerField(default=0, verbose_name='Reserved stock'),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, verbose_name='Modified at')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantity')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='salooninventory.item', verbose_name='Item')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='saloon.salon', verbose_name='Salon')),
+                ('shave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='saloonservices.shave', verbose_name='Shave')),
+            ],
+            options={
+                'verbose_name': 'Stock Reservation',
+                'verbose_name_plural': 'Stock Reservations',
+                'unique_together': {('shave', 'item')},
+            },
+        ),
+    ]
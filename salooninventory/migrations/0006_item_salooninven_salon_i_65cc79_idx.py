@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloon', '0002_remove_barber_can_manage_barbers_and_more'),
+        ('salooninventory', '0005_item_reserved_stock_stockreservation'),
+        ('saloonservices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['salon', 'name'], name='salooninven_salon_i_65cc79_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloon', '0003_barber_saloon_barb_salon_i_bc8b40_idx_and_more'),
+        ('salooninventory', '0006_item_salooninven_salon_i_65cc79_idx'),
+        ('saloonservices', '0002_hairstyle_saloonservi_salon_i_dc80f9_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='salooninven_salon_i_dfe6db_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemused',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='salooninven_salon_i_ebc0ce_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:25
+
+import commonapp.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('salooninventory', '0008_item_item_name_prefix_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='currency',
+            field=models.ForeignKey(default=commonapp.models.Currency.get_default_pk, on_delete=django.db.models.deletion.SET_DEFAULT, related_name='items', to='commonapp.currency', verbose_name='Currency'),
+        ),
+        migrations.AlterField(
+            model_name='itempurchase',
+            name='currency',
+            field=models.ForeignKey(default=commonapp.models.Currency.get_default_pk, on_delete=django.db.models.deletion.SET_DEFAULT, to='commonapp.currency', verbose_name='Currency'),
+        ),
+        migrations.AlterField(
+            model_name='itemreceipt',
+            name='currency',
+            field=models.ForeignKey(default=commonapp.models.Currency.get_default_pk, on_delete=django.db.models.deletion.SET_DEFAULT, related_name='item_receipts', to='commonapp.currency', verbose_name='Currency'),
+        ),
+    ]
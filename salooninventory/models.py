@@ -1,28 +1,44 @@
 ''' Models for the salooninventory app '''
 
+from collections import Counter, defaultdict
+
 from django.db import models, transaction 
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError, PermissionDenied
-from django.db.models import Sum, F
+from django.db.models import Sum, F, Case, When, Value
 
-from commonapp.models import TimestampMixin, Currency
+from commonapp.models import TimestampMixin, Currency, SalonQuerySet, PrefixSearchIndex
 from saloon.models import Salon, Barber
 from saloonfinance.models import CashRegister
-from saloonservices.models import Shave, Hairstyle
+from saloonservices.models import Shave, Hairstyle, shave_completed_event
 from config.permissions import is_salon_owner, is_assigned_barber
+from config.metrics import timed_handler
+from config.versions import bump_versions
+from config.pubsub import publish_on_commit
+
+class ItemQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('salon', 'currency')},
+        'detail': {'select_related': ('salon', 'currency'), 'prefetch_related': ('item_purpose',)},
+        'export': {'select_related': ('salon', 'currency')},
+        'choices': {'select_related': ('salon',)},
+    }
 
 class Item(TimestampMixin):
     name = models.CharField(_("Name"), max_length=255)
     item_purpose = models.ManyToManyField(Hairstyle, related_name='items', verbose_name=_("Item purpose"))
     price = models.DecimalField(_("Price"), max_digits=19, decimal_places=2, default=0)
-    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default, related_name='items', verbose_name=_("Currency"))
+    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default_pk, related_name='items', verbose_name=_("Currency"))
     exchange_rate = models.DecimalField(_("Exchange rate"), max_digits=10, decimal_places=4, default=1.0)
     amount_in_default_currency = models.DecimalField(_("Amount in default currency"), max_digits=19, decimal_places=2, default=0)
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='items', verbose_name=_("Salon"))
     current_stock = models.PositiveIntegerField(_("Current stock"), default=0)
+    reserved_stock = models.PositiveIntegerField(_("Reserved stock"), default=0)
+
+    objects = ItemQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name} - {self.salon.name}"
@@ -32,7 +48,7 @@ class Item(TimestampMixin):
         if user and not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
             raise PermissionDenied(_("You don't have permission to manage inventory items for this salon."))
         
-        if self.currency != Currency.get_default():
+        if self.currency_id != Currency.get_default_pk():
             self.amount_in_default_currency = self.price / self.exchange_rate
         else:
             self.amount_in_default_currency = self.price
@@ -45,6 +61,10 @@ class Item(TimestampMixin):
     def get_total_value(self):
         return self.price * self.current_stock
 
+    @property
+    def available_stock(self):
+        return self.current_stock - self.reserved_stock
+
     def get_average_purchase_price(self):
         purchases = self.purchases.aggregate(
             total_cost=Sum(F('purchase_price') * F('quantity')),
@@ -58,6 +78,18 @@ class Item(TimestampMixin):
         verbose_name = _("Item")
         verbose_name_plural = _("Items")
         unique_together = ['name', 'salon']
+        indexes = [
+            models.Index(fields=['salon', 'name']),
+            PrefixSearchIndex('name', scope=['salon'], name='item_name_prefix_idx'),
+            models.Index(fields=['salon', 'modified_at', 'id']),
+        ]
+
+class ItemUsedQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('item__salon', 'shave__barber__user', 'shave__hairstyle', 'barber__user')},
+        'detail': {'select_related': ('item__salon', 'shave__barber__user', 'shave__hairstyle', 'barber__user', 'salon')},
+        'export': {'select_related': ('item__salon', 'shave__barber__user', 'shave__hairstyle', 'barber__user', 'salon')},
+    }
 
 class ItemUsed(TimestampMixin):
     item = models.ForeignKey(Item, on_delete=models.CASCADE, verbose_name=_("Item"))
@@ -67,6 +99,8 @@ class ItemUsed(TimestampMixin):
     note = models.TextField(_("Note"), blank=True)
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='items_used', verbose_name=_("Salon"))
 
+    objects = ItemUsedQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.item} - {self.quantity} - {self.shave}"
 
@@ -94,25 +128,36 @@ class ItemUsed(TimestampMixin):
         unique_together = ('item', 'shave', 'salon')
         verbose_name = _("Item Used")
         verbose_name_plural = _("Items Used")
+        indexes = [models.Index(fields=['salon', 'modified_at', 'id'])]
+
+class ItemPurchaseQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('item', 'currency', 'cashregister')},
+        'detail': {'select_related': ('item__salon', 'currency', 'cashregister', 'receipt', 'salon')},
+        'export': {'select_related': ('item', 'currency', 'cashregister', 'receipt', 'salon')},
+    }
 
 class ItemPurchase(TimestampMixin):
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='purchases', verbose_name=_("Item"))
     quantity = models.PositiveIntegerField(_("Quantity"))
     purchase_price = models.DecimalField(_("Purchase price"), max_digits=19, decimal_places=2)
-    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default, verbose_name=_("Currency"))
+    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default_pk, verbose_name=_("Currency"))
     exchange_rate = models.DecimalField(_("Exchange rate"), max_digits=10, decimal_places=4, default=1.0)
     purchase_price_in_default_currency = models.DecimalField(_("Purchase price in default currency"), max_digits=19, decimal_places=2)
     purchase_date = models.DateField(_("Purchase date"), default=timezone.now)
     supplier = models.CharField(_("Supplier"), max_length=255, blank=True)
     cashregister = models.ForeignKey(CashRegister, on_delete=models.CASCADE, related_name='purchases', verbose_name=_("Cash Register"))
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='item_purchases', verbose_name=_("Salon"))
+    receipt = models.ForeignKey('ItemReceipt', on_delete=models.CASCADE, null=True, blank=True, related_name='lines', verbose_name=_("Receipt"))
+
+    objects = ItemPurchaseQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         user = kwargs.pop('user', None)
         if user and not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
             raise PermissionDenied(_("You don't have permission to purchase inventory items for this salon."))
         
-        if self.currency != Currency.get_default():
+        if self.currency_id != Currency.get_default_pk():
             self.purchase_price_in_default_currency = self.purchase_price / self.exchange_rate
         else:
             self.purchase_price_in_default_currency = self.purchase_price
@@ -135,12 +180,405 @@ class ItemPurchase(TimestampMixin):
         verbose_name = _("Item Purchase")
         verbose_name_plural = _("Item Purchases")
 
+class ItemReceiptQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('currency', 'cashregister')},
+        'detail': {'select_related': ('currency', 'cashregister', 'salon'), 'prefetch_related': ('lines__item',)},
+        'export': {'select_related': ('currency', 'cashregister', 'salon')},
+    }
+
+class ItemReceipt(TimestampMixin):
+    supplier = models.CharField(_("Supplier"), max_length=255)
+    purchase_date = models.DateField(_("Purchase date"), default=timezone.now)
+    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default_pk, related_name='item_receipts', verbose_name=_("Currency"))
+    exchange_rate = models.DecimalField(_("Exchange rate"), max_digits=10, decimal_places=4, default=1.0)
+    cashregister = models.ForeignKey(CashRegister, on_delete=models.CASCADE, related_name='item_receipts', verbose_name=_("Cash Register"))
+    total_cost = models.DecimalField(_("Total cost"), max_digits=19, decimal_places=2, default=0)
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='item_receipts', verbose_name=_("Salon"))
+
+    objects = ItemReceiptQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.supplier} - {self.purchase_date}"
+
+    def clean(self):
+        if self.cashregister_id and self.salon_id and self.cashregister.salon_id != self.salon_id:
+            raise ValidationError(_("Cash Register must belong to the same salon as the receipt."))
+
+    def receive(self, lines, user=None):
+        """
+        Save the receipt together with its unsaved ItemPurchase lines.
+
+        Lines are inserted with one bulk_create, stock is raised with one UPDATE
+        and the cash register is debited once for the whole delivery.
+        """
+        if user and not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
+            raise PermissionDenied(_("You don't have permission to purchase inventory items for this salon."))
+
+        is_default_currency = self.currency_id == Currency.get_default_pk()
+        received = Counter()
+        total_cost = 0
+        with transaction.atomic():
+            self.save()
+            for line in lines:
+                line.receipt = self
+                line.salon = self.salon
+                line.cashregister = self.cashregister
+                line.supplier = self.supplier
+                line.purchase_date = self.purchase_date
+                line.currency = self.currency
+                line.exchange_rate = self.exchange_rate
+                if is_default_currency:
+                    line.purchase_price_in_default_currency = line.purchase_price
+                else:
+                    line.purchase_price_in_default_currency = line.purchase_price / self.exchange_rate
+                received[line.item_id] += line.quantity
+                total_cost += line.purchase_price * line.quantity
+            ItemPurchase.objects.bulk_create(lines)
+            adjust_stock(received)
+            bump_versions([self.salon_id], ItemPurchase, Item)
+            self.total_cost = total_cost
+            self.save(update_fields=['total_cost', 'modified_at'])
+            self.cashregister.update_balance(total_cost, 'EXPENSE')
+        return lines
+
+    class Meta:
+        verbose_name = _("Item Receipt")
+        verbose_name_plural = _("Item Receipts")
+
+class StocktakeQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('salon',)},
+        'detail': {'select_related': ('salon',), 'prefetch_related': ('adjustments__item',)},
+        'export': {'select_related': ('salon',)},
+    }
+
+class Stocktake(TimestampMixin):
+    counted_at = models.DateTimeField(_("Counted at"), default=timezone.now)
+    note = models.TextField(_("Note"), blank=True)
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='stocktakes', verbose_name=_("Salon"))
+
+    objects = StocktakeQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.salon.name} - {self.counted_at:%Y-%m-%d}"
+
+    def apply(self, counts, user=None):
+        """
+        Reconcile ``{item_id: counted_quantity}`` against the salon's stock.
+
+        Current stock is read in one query, a StockAdjustment is written in bulk
+        for every item whose count differs, and the new quantities are applied
+        with one UPDATE.
+        """
+        if user and not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
+            raise PermissionDenied(_("You don't have permission to manage inventory items for this salon."))
+
+        with transaction.atomic():
+            self.save()
+            expected = dict(
+                Item.objects.select_for_update()
+                .filter(salon=self.salon, pk__in=counts)
+                .values_list('pk', 'current_stock')
+            )
+            adjustments = [
+                StockAdjustment(
+                    stocktake=self,
+                    item_id=item_id,
+                    expected_quantity=expected[item_id],
+                    counted_quantity=counted,
+                    difference=counted - expected[item_id],
+                    salon=self.salon,
+                )
+                for item_id, counted in counts.items()
+                if item_id in expected and counted != expected[item_id]
+            ]
+            StockAdjustment.objects.bulk_create(adjustments)
+            adjust_stock({adjustment.item_id: adjustment.difference for adjustment in adjustments})
+            bump_versions([self.salon_id], StockAdjustment, Item)
+        return adjustments
+
+    class Meta:
+        verbose_name = _("Stocktake")
+        verbose_name_plural = _("Stocktakes")
+        ordering = ['-counted_at']
+
+class StockAdjustmentQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('item',)},
+        'detail': {'select_related': ('item', 'stocktake', 'salon')},
+        'export': {'select_related': ('item', 'stocktake', 'salon')},
+    }
+
+class StockAdjustment(TimestampMixin):
+    stocktake = models.ForeignKey(Stocktake, on_delete=models.CASCADE, related_name='adjustments', verbose_name=_("Stocktake"))
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='adjustments', verbose_name=_("Item"))
+    expected_quantity = models.PositiveIntegerField(_("Expected quantity"))
+    counted_quantity = models.PositiveIntegerField(_("Counted quantity"))
+    difference = models.IntegerField(_("Difference"))
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='stock_adjustments', verbose_name=_("Salon"))
+
+    objects = StockAdjustmentQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.item.name} - {self.difference:+d}"
+
+    class Meta:
+        unique_together = ('stocktake', 'item')
+        verbose_name = _("Stock Adjustment")
+        verbose_name_plural = _("Stock Adjustments")
+
+class StockReservationQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('item', 'shave__barber__user', 'shave__hairstyle')},
+        'detail': {'select_related': ('item', 'shave__barber__user', 'shave__hairstyle', 'salon')},
+        'export': {'select_related': ('item', 'shave__barber__user', 'shave__hairstyle', 'salon')},
+    }
+
+class StockReservation(TimestampMixin):
+    shave = models.ForeignKey(Shave, on_delete=models.CASCADE, related_name='reservations', verbose_name=_("Shave"))
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='reservations', verbose_name=_("Item"))
+    quantity = models.PositiveIntegerField(_("Quantity"))
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='stock_reservations', verbose_name=_("Salon"))
+
+    objects = StockReservationQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.item.name} - {self.quantity} - {self.shave}"
+
+    class Meta:
+        unique_together = ('shave', 'item')
+        verbose_name = _("Stock Reservation")
+        verbose_name_plural = _("Stock Reservations")
+
+class HairstyleRecipeQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('hairstyle', 'item')},
+        'detail': {'select_related': ('hairstyle', 'item', 'salon')},
+        'export': {'select_related': ('hairstyle', 'item', 'salon')},
+    }
+
+class HairstyleRecipe(TimestampMixin):
+    hairstyle = models.ForeignKey(Hairstyle, on_delete=models.CASCADE, related_name='recipe_lines', verbose_name=_("Hairstyle"))
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='recipe_lines', verbose_name=_("Item"))
+    quantity = models.PositiveIntegerField(_("Quantity"))
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='hairstyle_recipes', verbose_name=_("Salon"))
+
+    objects = HairstyleRecipeQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.hairstyle} - {self.item.name} x {self.quantity}"
+
+    def clean(self):
+        if self.quantity is not None and self.quantity <= 0:
+            raise ValidationError(_("Quantity must be positive."))
+        if not (self.item_id and self.hairstyle_id):
+            return
+        if self.item.salon_id != self.salon_id or self.hairstyle.salon_id != self.salon_id:
+            raise ValidationError(_("Hairstyle and Item must belong to the same salon as the recipe."))
+
+    def save(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        if user and not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
+            raise PermissionDenied(_("You don't have permission to manage hairstyle recipes for this salon."))
+        super().save(*args, **kwargs)
+
+    class Meta:
+        unique_together = ('hairstyle', 'item')
+        verbose_name = _("Hairstyle Recipe")
+        verbose_name_plural = _("Hairstyle Recipes")
+
 @receiver(post_save, sender=ItemPurchase)
+@timed_handler
 def update_cashregister_balance(sender, instance, created, **kwargs):
     with transaction.atomic():
         if created:
             total_cost = instance.purchase_price * instance.quantity
             instance.cashregister.update_balance(total_cost, 'EXPENSE')
 
+OPEN_SHAVE_STATUSES = ('SCHEDULED', 'IN_PROGRESS')
+
+@receiver(post_save, sender=Shave)
+@timed_handler
+def sync_shave_stock(sender, instance, created, raw=False, **kwargs):
+    state = (instance.status, instance.hairstyle_id, instance.salon_id)
+    if raw or (not created and getattr(instance, '_stock_state', None) == state):
+        # Only the status, hairstyle or salon decide what a shave holds or uses.
+        return
+    instance._stock_state = state
+    if instance.status in OPEN_SHAVE_STATUSES:
+        reserve_hairstyle_recipes([instance])
+    else:
+        release_reservations([instance])
+        if instance.status == 'COMPLETED':
+            consume_hairstyle_recipes([instance])
+
+@receiver(pre_delete, sender=Shave)
+@timed_handler
+def release_reservations_on_delete(sender, instance, **kwargs):
+    release_reservations([instance])
+
+@receiver(post_save, sender=HairstyleRecipe)
+@receiver(post_delete, sender=HairstyleRecipe)
+@timed_handler
+def rereserve_open_shaves(sender, instance, raw=False, **kwargs):
+    # Open shaves hold what the old recipe needed; bring them in line with the new one.
+    if not raw:
+        reserve_hairstyle_recipes(Shave.objects.filter(
+            hairstyle_id=instance.hairstyle_id, status__in=OPEN_SHAVE_STATUSES,
+        ).only('id', 'status', 'hairstyle_id', 'salon_id'))
+
+def adjust_stock(deltas, field='current_stock'):
+    """Apply ``{item_id: delta}`` to an Item stock column with a single UPDATE."""
+    deltas = {item_id: delta for item_id, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    return Item.objects.filter(pk__in=deltas).update(**{
+        field: F(field) + Case(
+            *[When(pk=item_id, then=Value(delta)) for item_id, delta in deltas.items()],
+            output_field=models.IntegerField(),
+        ),
+        'modified_at': timezone.now(),
+    })
+
+def _get_recipes(hairstyle_ids):
+    recipes = defaultdict(list)
+    lines = HairstyleRecipe.objects.filter(
+        hairstyle_id__in=hairstyle_ids
+    ).values_list('hairstyle_id', 'item_id', 'quantity')
+    for hairstyle_id, item_id, quantity in lines:
+        recipes[hairstyle_id].append((item_id, quantity))
+    return recipes
+
+def reserve_hairstyle_recipes(shaves):
+    """
+    Hold the recipe items of open shaves in ``Item.reserved_stock``.
+
+    Shaves whose reservations already match their recipe are left alone; the
+    others have their reservations replaced, so a changed hairstyle or recipe
+    is picked up on the next save.
+    """
+    shaves = [shave for shave in shaves if shave.status in OPEN_SHAVE_STATUSES]
+    if not shaves:
+        return []
+
+    with transaction.atomic():
+        existing = defaultdict(set)
+        for shave_id, item_id, quantity in StockReservation.objects.filter(
+            shave__in=shaves
+        ).values_list('shave_id', 'item_id', 'quantity'):
+            existing[shave_id].add((item_id, quantity))
+        recipes = _get_recipes({shave.hairstyle_id for shave in shaves})
+        stale = [shave for shave in shaves if existing[shave.pk] != set(recipes[shave.hairstyle_id])]
+        if not stale:
+            return []
+
+        release_reservations([shave for shave in stale if existing[shave.pk]])
+        reservations = []
+        reserved = Counter()
+        for shave in stale:
+            for item_id, quantity in recipes[shave.hairstyle_id]:
+                reservations.append(StockReservation(
+                    shave=shave, item_id=item_id, quantity=quantity, salon_id=shave.salon_id
+                ))
+                reserved[item_id] += quantity
+        StockReservation.objects.bulk_create(reservations)
+        adjust_stock(reserved, field='reserved_stock')
+        bump_versions([shave.salon_id for shave in stale], StockReservation, Item)
+    return reservations
+
+def release_reservations(shaves):
+    """Drop the reservations held by the given shaves and free the reserved stock."""
+    with transaction.atomic():
+        released = Counter()
+        reservations = StockReservation.objects.filter(shave__in=shaves)
+        for item_id, quantity in reservations.values_list('item_id', 'quantity'):
+            released[item_id] += quantity
+        if released:
+            reservations.delete()
+            adjust_stock({item_id: -quantity for item_id, quantity in released.items()}, field='reserved_stock')
+            bump_versions([shave.salon_id for shave in shaves], Item)
+    return released
+
+def get_available_to_promise(salon, hairstyle=None):
+    """
+    Return the salon's items annotated with ``available`` stock, i.e. current
+    stock minus what open shaves have reserved. With a hairstyle, only its
+    recipe items are returned, each annotated with the recipe ``quantity``
+    and the number of further shaves it can cover as ``shaves_available``.
+    """
+    items = Item.objects.filter(salon=salon).annotate(available=F('current_stock') - F('reserved_stock'))
+    if hairstyle is None:
+        return items
+    return items.filter(recipe_lines__hairstyle=hairstyle).annotate(
+        quantity=F('recipe_lines__quantity'),
+        shaves_available=F('available') / F('recipe_lines__quantity'),
+    )
+
+def consume_hairstyle_recipes(shaves):
+    """
+    Record the recipe items of completed shaves as ItemUsed rows.
+
+    Shaves that already have usage recorded are skipped, so calling this twice
+    for the same shave is harmless. All rows are written with one bulk_create
+    and the stock is decremented with one UPDATE.
+    """
+    shaves = [shave for shave in shaves if shave.status == 'COMPLETED']
+    if not shaves:
+        return []
+
+    with transaction.atomic():
+        recorded = set(
+            ItemUsed.objects.filter(shave__in=shaves).values_list('shave_id', flat=True).distinct()
+        )
+        shaves = [shave for shave in shaves if shave.pk not in recorded]
+
+        recipes = _get_recipes({shave.hairstyle_id for shave in shaves})
+
+        usages = []
+        needed = Counter()
+        for shave in shaves:
+            for item_id, quantity in recipes[shave.hairstyle_id]:
+                usages.append(ItemUsed(
+                    item_id=item_id,
+                    shave=shave,
+                    barber_id=shave.barber_id,
+                    quantity=quantity,
+                    salon_id=shave.salon_id,
+                ))
+                needed[item_id] += quantity
+        if not usages:
+            return []
+
+        stock = dict(
+            Item.objects.select_for_update().filter(pk__in=needed).values_list('pk', 'current_stock')
+        )
+        if any(stock.get(item_id, 0) < quantity for item_id, quantity in needed.items()):
+            raise ValidationError(_("Not enough items in stock."))
+
+        ItemUsed.objects.bulk_create(usages)
+        adjust_stock({item_id: -quantity for item_id, quantity in needed.items()})
+        bump_versions([shave.salon_id for shave in shaves], ItemUsed, Item)
+    return usages
+
+def complete_shaves(shaves):
+    """Mark open shaves as completed in bulk and consume their recipes."""
+    with transaction.atomic():
+        shaves = list(shaves.select_for_update().filter(status__in=['SCHEDULED', 'IN_PROGRESS']))
+        Shave.objects.filter(pk__in=[shave.pk for shave in shaves]).update(
+            status='COMPLETED', modified_at=timezone.now()
+        )
+        for shave in shaves:
+            shave.status = shave._saved_status = 'COMPLETED'
+            shave._counted_hairstyle_id = shave.hairstyle_id
+            shave._stock_state = ('COMPLETED', shave.hairstyle_id, shave.salon_id)
+            # The bulk update skips post_save, so announce the completions here.
+            publish_on_commit(shave.salon_id, lambda shave=shave: shave_completed_event(shave))
+        Hairstyle.adjust_completed_shaves(Counter(shave.hairstyle_id for shave in shaves))
+        bump_versions([shave.salon_id for shave in shaves], Shave)
+        release_reservations(shaves)
+        consume_hairstyle_recipes(shaves)
+    return shaves
+
 def get_total_inventory_value(salon):
-    return sum(item.get_total_value() for item in salon.items.all())
+    return Item.objects.filter(salon=salon).aggregate(total=Sum(F('price') * F('current_stock')))['total'] or 0
@@ -1,3 +1,403 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from commonapp.models import Currency
+from saloon.models import Salon, Barber, BarberType
+from saloonfinance.models import CashRegister
+from saloonservices.models import Hairstyle, Shave
+from .forms import ItemReceiptLineForm, ItemReceiptLineFormSet, ItemUsedForm, StocktakeForm
+from .models import Item, ItemUsed, ItemPurchase, ItemReceipt, Stocktake, StockReservation, HairstyleRecipe, complete_shaves
+from .views import HairstyleRecipeListView
+
+class InventoryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.owner = CustomUser.objects.create_user('owner@example.com', 'password')
+        cls.salon = Salon.objects.create(name='Main', owner=cls.owner)
+        barber_user = CustomUser.objects.create_user('barber@example.com', 'password', first_name='Bob', last_name='Barber')
+        cls.barber = Barber.objects.create(
+            user=barber_user, salon=cls.salon, barber_type=BarberType.objects.create(name='Senior'),
+            start_date=datetime.date(2024, 1, 1),
+        )
+        cls.register = CashRegister.objects.create(name='Front desk', salon=cls.salon, currency=Currency.get_default())
+        cls.fade = Hairstyle.objects.create(name='Fade', salon=cls.salon, current_tariff=10)
+        cls.gel = Item.objects.create(name='Gel', salon=cls.salon, current_stock=10, price=2)
+        cls.wax = Item.objects.create(name='Wax', salon=cls.salon, current_stock=10, price=3)
+
+    def setUp(self):
+        # The default currency is only cached once committed, which test transactions never are.
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.get_default()
+
+    def create_shave(self, **kwargs):
+        fields = {
+            'barber': self.barber, 'hairstyle': self.fade, 'cashregister': self.register,
+            'salon': self.salon, 'amount': 10, 'date_shave': datetime.date(2024, 6, 1),
+        }
+        fields.update(kwargs)
+        return Shave.objects.create(**fields)
+
+    def add_recipe(self, item, quantity, hairstyle=None):
+        return HairstyleRecipe.objects.create(hairstyle=hairstyle or self.fade, item=item, quantity=quantity, salon=self.salon)
+
+    def assertStock(self, item, current, reserved=0):
+        item.refresh_from_db()
+        self.assertEqual((item.current_stock, item.reserved_stock), (current, reserved))
+
+class HairstyleRecipeTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_recipe(self.gel, 2)
+        self.add_recipe(self.wax, 1)
+
+    def test_completed_shave_consumes_recipe(self):
+        shave = self.create_shave(status='COMPLETED')
+        self.assertEqual(
+            sorted(ItemUsed.objects.filter(shave=shave).values_list('item__name', 'quantity', 'barber')),
+            [('Gel', 2, self.barber.pk), ('Wax', 1, self.barber.pk)],
+        )
+        self.assertStock(self.gel, 8)
+        self.assertStock(self.wax, 9)
+
+    def test_saving_completed_shave_again_consumes_once(self):
+        shave = self.create_shave(status='COMPLETED')
+        shave.save()
+        self.assertEqual(ItemUsed.objects.filter(shave=shave).count(), 2)
+        self.assertStock(self.gel, 8)
+
+    def test_unrelated_edits_leave_the_stock_alone(self):
+        shave = Shave.objects.get(pk=self.create_shave(status='COMPLETED').pk)
+        Item.objects.filter(pk=self.gel.pk).update(current_stock=0)
+        shave.amount = 12
+        with CaptureQueriesContext(connection) as queries:
+            shave.save()
+        self.assertEqual([query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']], ['UPDATE'])
+        self.assertEqual(ItemUsed.objects.filter(shave=shave).count(), 2)
+
+    def test_status_changes_still_move_the_stock(self):
+        shave = Shave.objects.get(pk=self.create_shave().pk)
+        self.assertStock(self.gel, 10, reserved=2)
+        shave.status = 'CANCELLED'
+        shave.save()
+        self.assertStock(self.gel, 10)
+
+    def test_shortage_rolls_back_the_shave(self):
+        self.add_recipe(self.gel, 20, hairstyle=Hairstyle.objects.create(name='Perm', salon=self.salon))
+        with self.assertRaises(ValidationError):
+            self.create_shave(status='COMPLETED', hairstyle=Hairstyle.objects.get(name='Perm'))
+        self.assertFalse(Shave.objects.exists())
+        self.assertFalse(ItemUsed.objects.exists())
+        self.assertStock(self.gel, 10)
+
+    def test_complete_shaves_closes_open_shaves_of_the_day(self):
+        scheduled = self.create_shave()
+        in_progress = self.create_shave(status='IN_PROGRESS')
+        cancelled = self.create_shave(status='CANCELLED')
+        self.create_shave(date_shave=datetime.date(2024, 6, 2))
+
+        completed = complete_shaves(Shave.objects.filter(salon=self.salon, date_shave=datetime.date(2024, 6, 1)))
+
+        self.assertEqual(sorted(shave.pk for shave in completed), [scheduled.pk, in_progress.pk])
+        self.assertEqual(Shave.objects.filter(status='COMPLETED').count(), 2)
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, 'CANCELLED')
+        # The shave of the next day still holds its reservation.
+        self.assertStock(self.gel, 6, reserved=2)
+        self.assertStock(self.wax, 8, reserved=1)
+        self.fade.refresh_from_db()
+        self.assertEqual(self.fade.completed_shaves_count, 2)
+
+    def test_recipe_list_is_ordered(self):
+        other = Hairstyle.objects.create(name='Buzz', salon=self.salon)
+        self.add_recipe(self.wax, 1, hairstyle=other)
+        view = HairstyleRecipeListView()
+        view.setup(RequestFactory().get('/'), salon_id=self.salon.pk)
+        view.salon = self.salon
+        recipes = view.get_queryset()
+        self.assertTrue(recipes.ordered)
+        self.assertEqual(
+            [(recipe.hairstyle.name, recipe.item.name) for recipe in recipes],
+            [('Buzz', 'Wax'), ('Fade', 'Gel'), ('Fade', 'Wax')],
+        )
+
+class ItemReceiptTests(InventoryTestCase):
+    def line_data(self, *lines):
+        data = {'lines-TOTAL_FORMS': '5', 'lines-INITIAL_FORMS': '0', 'lines-MIN_NUM_FORMS': '0', 'lines-MAX_NUM_FORMS': '500'}
+        for index, (item, quantity, price) in enumerate(lines):
+            data.update({f'lines-{index}-item': item.pk, f'lines-{index}-quantity': quantity, f'lines-{index}-purchase_price': price})
+        return data
+
+    def test_receive_records_lines_and_debits_register_once(self):
+        receipt = ItemReceipt(supplier='Acme', cashregister=self.register, salon=self.salon)
+        lines = [
+            ItemPurchase(item=self.gel, quantity=5, purchase_price=Decimal('2.00')),
+            ItemPurchase(item=self.wax, quantity=4, purchase_price=Decimal('3.00')),
+        ]
+        receipt.receive(lines, user=self.owner)
+
+        self.assertEqual(receipt.lines.count(), 2)
+        self.assertEqual(set(receipt.lines.values_list('supplier', 'cashregister', 'salon')), {('Acme', self.register.pk, self.salon.pk)})
+        self.assertEqual(receipt.total_cost, Decimal('22.00'))
+        self.assertStock(self.gel, 15)
+        self.assertStock(self.wax, 14)
+        self.register.refresh_from_db()
+        self.assertEqual(self.register.balance, Decimal('-22.00'))
+
+    def test_receive_rejects_users_without_access(self):
+        stranger = CustomUser.objects.create_user('stranger@example.com', 'password')
+        receipt = ItemReceipt(supplier='Acme', cashregister=self.register, salon=self.salon)
+        with self.assertRaises(PermissionDenied):
+            receipt.receive([ItemPurchase(item=self.gel, quantity=5, purchase_price=2)], user=stranger)
+        self.assertFalse(ItemReceipt.objects.exists())
+        self.assertStock(self.gel, 10)
+
+    def test_create_view_receives_all_lines(self):
+        self.client.force_login(self.owner)
+        data = {
+            'supplier': 'Acme', 'purchase_date': '2024-06-01', 'currency': Currency.get_default().pk,
+            'exchange_rate': '1', 'cashregister': self.register.pk,
+            **self.line_data((self.gel, 5, '2.00'), (self.wax, 1, '3.00')),
+        }
+        response = self.client.post(reverse('salooninventory:itemreceipt_create', kwargs={'salon_id': self.salon.pk}), data)
+        self.assertRedirects(response, reverse('salooninventory:itemreceipt_list', kwargs={'salon_id': self.salon.pk}), fetch_redirect_response=False)
+        self.assertEqual(ItemPurchase.objects.filter(receipt__supplier='Acme').count(), 2)
+        self.assertStock(self.gel, 15)
+
+    def test_lines_need_at_least_one_line_of_the_salon(self):
+        other_salon = Salon.objects.create(name='Other', owner=self.owner)
+        foreign = Item.objects.create(name='Foreign gel', salon=other_salon, current_stock=1)
+        self.assertFalse(ItemReceiptLineFormSet(self.line_data(), prefix='lines', salon=self.salon).is_valid())
+        self.assertFalse(ItemReceiptLineFormSet(self.line_data((foreign, 1, '1.00')), prefix='lines', salon=self.salon).is_valid())
+        self.assertTrue(ItemReceiptLineFormSet(self.line_data((self.gel, 1, '1.00')), prefix='lines', salon=self.salon).is_valid())
+
+class StocktakeTests(InventoryTestCase):
+    def get_form(self, csv_text=None, **counts):
+        files = {'csv_file': SimpleUploadedFile('count.csv', csv_text.encode())} if csv_text is not None else {}
+        data = {'counted_at': '2024-06-01T18:00', **{f'count_{item.pk}': value for item, value in counts.values()}}
+        return StocktakeForm(data, files, user=self.owner, salon=self.salon)
+
+    def test_csv_and_grid_counts_are_merged(self):
+        form = self.get_form(f'item,counted\ngel,7\n{self.wax.pk},12\n', wax=(self.wax, 9))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.counts, {self.gel.pk: 7, self.wax.pk: 9})
+
+    def test_short_and_invalid_rows_are_form_errors(self):
+        for csv_text in ('item,counted\nGel\n', 'item\nGel\n', 'item,counted\nGel,-1\n', 'item,counted\nGel,many\n', 'item,counted\nComb,1\n'):
+            with self.subTest(csv_text=csv_text):
+                form = self.get_form(csv_text)
+                self.assertFalse(form.is_valid())
+                self.assertIn('csv_file', form.errors)
+
+    def test_apply_adjusts_only_differing_items(self):
+        form = self.get_form(gel=(self.gel, 7), wax=(self.wax, 10))
+        self.assertTrue(form.is_valid(), form.errors)
+        stocktake = form.save(commit=False)
+        adjustments = stocktake.apply(form.counts, user=self.owner)
+
+        self.assertEqual([(adjustment.item_id, adjustment.expected_quantity, adjustment.difference) for adjustment in adjustments], [(self.gel.pk, 10, -3)])
+        self.assertEqual(stocktake.adjustments.count(), 1)
+        self.assertStock(self.gel, 7)
+        self.assertStock(self.wax, 10)
+
+    def test_items_of_other_salons_are_ignored(self):
+        foreign = Item.objects.create(name='Foreign gel', salon=Salon.objects.create(name='Other', owner=self.owner), current_stock=4)
+        stocktake = Stocktake(salon=self.salon)
+        self.assertEqual(stocktake.apply({foreign.pk: 0}), [])
+        self.assertStock(foreign, 4)
+
+class StockReservationTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_recipe(self.gel, 2)
+
+    def test_open_shaves_reserve_their_recipe(self):
+        shave = self.create_shave()
+        self.assertStock(self.gel, 10, reserved=2)
+        shave.status = 'IN_PROGRESS'
+        shave.save()
+        self.assertEqual(StockReservation.objects.filter(shave=shave).count(), 1)
+        self.assertStock(self.gel, 10, reserved=2)
+
+    def test_cancelled_and_deleted_shaves_release_stock(self):
+        cancelled, deleted = self.create_shave(), self.create_shave()
+        self.assertStock(self.gel, 10, reserved=4)
+        cancelled.status = 'CANCELLED'
+        cancelled.save()
+        self.assertStock(self.gel, 10, reserved=2)
+        deleted.delete()
+        self.assertStock(self.gel, 10)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_completion_turns_reservation_into_usage(self):
+        shave = self.create_shave()
+        shave.status = 'COMPLETED'
+        shave.save()
+        self.assertStock(self.gel, 8)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_changed_hairstyle_replaces_reservations(self):
+        buzz = Hairstyle.objects.create(name='Buzz', salon=self.salon)
+        self.add_recipe(self.wax, 3, hairstyle=buzz)
+        shave = self.create_shave()
+        shave.hairstyle = buzz
+        shave.save()
+        self.assertStock(self.gel, 10)
+        self.assertStock(self.wax, 10, reserved=3)
+
+class AvailableToPromiseViewTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_recipe(self.gel, 3)
+        self.create_shave()
+        self.client.force_login(self.owner)
+        self.url = reverse('salooninventory:available_to_promise', kwargs={'salon_id': self.salon.pk})
+
+    def test_lists_available_stock(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        available = {row['name']: row['available'] for row in response.json()['items']}
+        self.assertEqual(available, {'Gel': 7, 'Wax': 10})
+
+    def test_limits_to_a_hairstyle_recipe(self):
+        response = self.client.get(self.url, {'hairstyle': self.fade.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['shaves_available'], 2)
+        self.assertEqual([row['name'] for row in response.json()['items']], ['Gel'])
+
+    def test_recipe_changes_move_open_reservations(self):
+        recipe = HairstyleRecipe.objects.get(item=self.gel)
+        recipe.quantity = 5
+        recipe.save()
+        self.assertStock(self.gel, 10, reserved=5)
+        self.assertEqual(self.client.get(self.url, {'hairstyle': self.fade.pk}).json()['shaves_available'], 1)
+        self.add_recipe(self.wax, 4)
+        self.assertStock(self.wax, 10, reserved=4)
+        recipe.delete()
+        self.assertStock(self.gel, 10)
+        self.assertStock(self.wax, 10, reserved=4)
+
+    def test_rejects_unknown_hairstyles(self):
+        foreign = Hairstyle.objects.create(name='Fade', salon=Salon.objects.create(name='Other', owner=self.owner))
+        for value in ('abc', '999999', str(foreign.pk)):
+            with self.subTest(hairstyle=value):
+                self.assertEqual(self.client.get(self.url, {'hairstyle': value}).status_code, 400)
+
+class ItemListFragmentTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.owner)
+        self.url = reverse('salooninventory:item_list', kwargs={'salon_id': self.salon.pk})
+
+    def get_rows(self, **params):
+        return self.client.get(self.url, params, headers={'HX-Request': 'true'})
+
+    def test_htmx_requests_get_only_the_rows(self):
+        response = self.get_rows(name='ge')
+        self.assertTemplateUsed(response, 'salooninventory/partials/item_rows.html')
+        self.assertTemplateNotUsed(response, 'salooninventory/item_list.html')
+        self.assertContains(response, f'id="item-{self.gel.pk}"')
+        self.assertNotContains(response, f'id="item-{self.wax.pk}"')
+        self.assertIn('HX-Request', response['Vary'])
+
+    def test_fragments_are_cached_until_the_items_change(self):
+        self.get_rows()
+        with self.assertNumQueries(3):
+            cached = self.get_rows()
+        self.assertContains(cached, 'Gel')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gel.name = 'Pomade'
+            self.gel.save()
+        self.assertContains(self.get_rows(), 'Pomade')
+
+class ConditionalGetTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.owner)
+        self.url = reverse('salooninventory:item_list', kwargs={'salon_id': self.salon.pk})
+
+    def get_rows(self, etag=None):
+        headers = {'HX-Request': 'true'}
+        if etag:
+            headers['If-None-Match'] = etag
+        return self.client.get(self.url, headers=headers)
+
+    def test_unchanged_lists_answer_not_modified(self):
+        etag = self.get_rows()['ETag']
+        response = self.get_rows(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_new_csrf_token_changes_the_etag(self):
+        etag = self.get_rows()['ETag']
+        self.client.cookies.pop(settings.CSRF_COOKIE_NAME)
+        response = self.get_rows(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_shared_lookups_change_the_etag(self):
+        etag = self.get_rows()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            currency = self.gel.currency
+            currency.name = 'Dollar'
+            currency.save()
+        self.assertEqual(self.get_rows(etag).status_code, 200)
+
+class AutocompleteTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.owner)
+
+    def search(self, kind, **params):
+        return self.client.get(reverse('autocomplete', args=[kind]), params)
+
+    def test_prefix_search_ignores_case(self):
+        response = self.search('item', q='GE', salon=self.salon.pk)
+        self.assertEqual(response.json(), {'results': [{'id': self.gel.pk, 'text': 'Gel - Main'}], 'more': False})
+
+    def test_shaves_are_searchable(self):
+        shave = self.create_shave()
+        self.assertEqual([row['id'] for row in self.search('shave', q='fa').json()['results']], [shave.pk])
+
+    def test_rejects_foreign_and_malformed_salons(self):
+        foreign = Salon.objects.create(name='Other', owner=CustomUser.objects.create_user('other@example.com', 'password'))
+        for salon in (foreign.pk, 'abc'):
+            with self.subTest(salon=salon):
+                self.assertEqual(self.search('item', salon=salon).status_code, 403)
+
+    def test_forms_render_only_selected_options(self):
+        self.create_shave()
+        html = str(ItemUsedForm(user=self.owner)['shave'])
+        self.assertEqual(html.count('<option'), 1)
+        formset = ItemReceiptLineFormSet(prefix='lines', salon=self.salon)
+        with self.assertNumQueries(0):
+            html = str(formset.forms[0]['item'])
+        self.assertEqual(html.count('<option'), 1)
+        self.assertIn('salon=%d' % self.salon.pk, html)
+
+class FormHtmlCacheTests(InventoryTestCase):
+    def test_stocktake_grid_shows_the_live_stock(self):
+        self.assertIn('In stock: 10', str(StocktakeForm(user=self.owner, salon=self.salon)))
+        Item.objects.filter(pk=self.gel.pk).update(current_stock=3)
+        Item.objects.create(name='Comb', salon=self.salon, current_stock=4, price=1)
+        html = str(StocktakeForm(user=self.owner, salon=self.salon))
+        self.assertIn('In stock: 3', html)
+        self.assertIn('Comb', html)
+
+    def test_receipt_lines_search_their_own_salon(self):
+        other = Salon.objects.create(name='Other', owner=self.owner)
+        self.assertIn(f'salon={self.salon.pk}', str(ItemReceiptLineForm(salon=self.salon)))
+        html = str(ItemReceiptLineForm(salon=other))
+        self.assertIn(f'salon={other.pk}', html)
+        self.assertNotIn(f'salon={self.salon.pk}', html)
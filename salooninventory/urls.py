@@ -18,6 +18,25 @@ urlpatterns = [
     path('<int:salon_id>/purchases/', views.ItemPurchaseListView.as_view(), name='itempurchase_list'),
     path('<int:salon_id>/purchases/create/', views.ItemPurchaseCreateView.as_view(), name='itempurchase_create'),
 
+    # ItemReceipt URLs
+    path('<int:salon_id>/receipts/', views.ItemReceiptListView.as_view(), name='itemreceipt_list'),
+    path('<int:salon_id>/receipts/create/', views.ItemReceiptCreateView.as_view(), name='itemreceipt_create'),
+
+    # Stocktake URLs
+    path('<int:salon_id>/stocktakes/', views.StocktakeListView.as_view(), name='stocktake_list'),
+    path('<int:salon_id>/stocktakes/create/', views.StocktakeCreateView.as_view(), name='stocktake_create'),
+
+    # HairstyleRecipe URLs
+    path('<int:salon_id>/recipes/', views.HairstyleRecipeListView.as_view(), name='hairstylerecipe_list'),
+    path('<int:salon_id>/recipes/create/', views.HairstyleRecipeCreateView.as_view(), name='hairstylerecipe_create'),
+    path('<int:salon_id>/recipes/<int:pk>/delete/', views.HairstyleRecipeDeleteView.as_view(), name='hairstylerecipe_delete'),
+
+    # Stock available to promise for bookings
+    path('<int:salon_id>/available-to-promise/', views.AvailableToPromiseView.as_view(), name='available_to_promise'),
+
+    # End-of-day shave closing
+    path('<int:salon_id>/shaves/close/', views.ShaveCloseView.as_view(), name='shave_close'),
+
     # HTMX specific URLs
     path('validate-field/', views.validate_field, name='validate_field'),
 ]
\ No newline at end of file
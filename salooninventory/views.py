@@ -1,18 +1,26 @@
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, FormView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
-from django.core.exceptions import PermissionDenied
-from .models import Item, ItemUsed, ItemPurchase
+from django.core.exceptions import PermissionDenied, ValidationError
+from .models import (
+    Item, ItemUsed, ItemPurchase, ItemReceipt, Stocktake, HairstyleRecipe,
+    complete_shaves, get_available_to_promise
+)
 from .forms import (
-    ItemForm, ItemUsedForm, ItemPurchaseForm,
+    ItemForm, ItemUsedForm, ItemPurchaseForm, HairstyleRecipeForm, ShaveCloseForm,
+    ItemReceiptForm, ItemReceiptLineFormSet, StocktakeForm,
     ItemSearchForm, ItemUsedSearchForm, ItemPurchaseSearchForm
 )
-from saloon.models import Salon
+from saloonservices.models import Shave, Hairstyle
 from config.permissions import is_salon_owner, is_assigned_barber
+from config.conditional import ConditionalGetMixin
+from config.fragments import HtmxFragmentMixin
+from config.salon_context import get_request_salon
+from config.validation import FieldValidator
 
 class HtmxResponseMixin:
     def form_valid(self, form):
@@ -24,21 +32,30 @@ class HtmxResponseMixin:
     def get_htmx_response(self):
         return ""
 
+    def get_template_names(self):
+        # Modal dialogs only need the form itself, not the full page.
+        if self.request.htmx and not self.request.htmx.boosted:
+            return ['form_fragment.html']
+        return super().get_template_names()
+
 class SalonPermissionMixin:
     def dispatch(self, request, *args, **kwargs):
-        self.salon = get_object_or_404(Salon, pk=self.kwargs['salon_id'])
+        self.salon = get_request_salon(request, self.kwargs['salon_id'])
         if not (is_salon_owner(request.user, self.salon) or is_assigned_barber(request.user, self.salon)):
             raise PermissionDenied(_("You don't have permission to access this salon's inventory."))
         return super().dispatch(request, *args, **kwargs)
 
-class ItemListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class ItemListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, HtmxFragmentMixin, ListView):
     model = Item
     template_name = 'salooninventory/item_list.html'
     context_object_name = 'items'
+    fragment_template_name = 'salooninventory/partials/item_rows.html'
+    version_dependencies = ('saloonservices.hairstyle', 'commonapp.currency')
     paginate_by = 10
+    query_budget = 10
 
     def get_queryset(self):
-        queryset = Item.objects.filter(salon=self.salon)
+        queryset = Item.objects.for_salon(self.salon).order_by('name', 'pk')
         form = ItemSearchForm(self.request.GET, user=self.request.user)
         if form.is_valid():
             name = form.cleaned_data.get('name')
@@ -51,7 +68,8 @@ class ItemListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = ItemSearchForm(self.request.GET, user=self.request.user)
+        if not self.is_fragment_request():
+            context['search_form'] = ItemSearchForm(self.request.GET, user=self.request.user)
         context['salon'] = self.salon
         return context
 
@@ -108,14 +126,16 @@ class ItemDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeleteView):
             return HttpResponse(f"<div class='alert alert-success'>{_('Item deleted successfully.')}</div>")
         return super().delete(request, *args, **kwargs)
 
-class ItemUsedListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class ItemUsedListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
     model = ItemUsed
     template_name = 'salooninventory/itemused_list.html'
     context_object_name = 'items_used'
+    version_dependencies = ('salooninventory.item', 'saloonservices.shave', 'saloon.barber', 'accounts.customuser')
     paginate_by = 10
+    query_budget = 11
 
     def get_queryset(self):
-        queryset = ItemUsed.objects.filter(salon=self.salon)
+        queryset = ItemUsed.objects.for_salon(self.salon)
         form = ItemUsedSearchForm(self.request.GET, user=self.request.user)
         if form.is_valid():
             item = form.cleaned_data.get('item')
@@ -158,14 +178,16 @@ class ItemUsedCreateView(LoginRequiredMixin, SalonPermissionMixin, HtmxResponseM
     def get_htmx_response(self):
         return f"<div class='alert alert-success'>{_('Item usage recorded successfully.')}</div>"
 
-class ItemPurchaseListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class ItemPurchaseListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
     model = ItemPurchase
     template_name = 'salooninventory/itempurchase_list.html'
     context_object_name = 'purchases'
+    version_dependencies = ('salooninventory.item', 'saloonfinance.cashregister', 'commonapp.currency')
     paginate_by = 10
+    query_budget = 10
 
     def get_queryset(self):
-        queryset = ItemPurchase.objects.filter(salon=self.salon)
+        queryset = ItemPurchase.objects.for_salon(self.salon)
         form = ItemPurchaseSearchForm(self.request.GET, user=self.request.user)
         if form.is_valid():
             item = form.cleaned_data.get('item')
@@ -208,24 +230,185 @@ class ItemPurchaseCreateView(LoginRequiredMixin, SalonPermissionMixin, HtmxRespo
     def get_htmx_response(self):
         return f"<div class='alert alert-success'>{_('Item purchase recorded successfully.')}</div>"
 
+class ItemReceiptListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
+    model = ItemReceipt
+    template_name = 'salooninventory/itemreceipt_list.html'
+    context_object_name = 'receipts'
+    version_dependencies = ('saloonfinance.cashregister', 'commonapp.currency')
+    paginate_by = 10
+    query_budget = 8
+
+    def get_queryset(self):
+        return ItemReceipt.objects.for_salon(self.salon).order_by('-purchase_date', '-id')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['salon'] = self.salon
+        return context
+
+class ItemReceiptCreateView(LoginRequiredMixin, SalonPermissionMixin, CreateView):
+    model = ItemReceipt
+    form_class = ItemReceiptForm
+    template_name = 'salooninventory/itemreceipt_form.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        kwargs['salon'] = self.salon
+        return kwargs
+
+    def get_lines_formset(self):
+        if self.request.method == 'POST':
+            return ItemReceiptLineFormSet(self.request.POST, prefix='lines', salon=self.salon)
+        return ItemReceiptLineFormSet(prefix='lines', salon=self.salon)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault('lines', self.get_lines_formset())
+        context['salon'] = self.salon
+        return context
+
+    def post(self, request, *args, **kwargs):
+        self.object = None
+        form = self.get_form()
+        lines = self.get_lines_formset()
+        if not (form.is_valid() and lines.is_valid()):
+            return self.render_to_response(self.get_context_data(form=form, lines=lines))
+        self.object = form.save(commit=False)
+        self.object.receive(lines.get_lines(), user=request.user)
+        if request.htmx:
+            return HttpResponse(f"<div class='alert alert-success'>{_('Delivery received successfully.')}</div>")
+        return HttpResponseRedirect(self.get_success_url())
+
+    def get_success_url(self):
+        return reverse_lazy('salooninventory:itemreceipt_list', kwargs={'salon_id': self.salon.id})
+
+class StocktakeListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
+    model = Stocktake
+    template_name = 'salooninventory/stocktake_list.html'
+    context_object_name = 'stocktakes'
+    paginate_by = 10
+    query_budget = 10
+
+    def get_queryset(self):
+        return Stocktake.objects.for_salon(self.salon).prefetch_related('adjustments__item')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['salon'] = self.salon
+        return context
+
+class StocktakeCreateView(LoginRequiredMixin, SalonPermissionMixin, CreateView):
+    model = Stocktake
+    form_class = StocktakeForm
+    template_name = 'salooninventory/stocktake_form.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        kwargs['salon'] = self.salon
+        return kwargs
+
+    def form_valid(self, form):
+        self.object = form.save(commit=False)
+        adjustments = self.object.apply(form.counts, user=self.request.user)
+        message = _("Stocktake saved with %(count)d adjustments.") % {'count': len(adjustments)}
+        if self.request.htmx:
+            return HttpResponse(f"<div class='alert alert-success'>{message}</div>")
+        messages.success(self.request, message)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def get_success_url(self):
+        return reverse_lazy('salooninventory:stocktake_list', kwargs={'salon_id': self.salon.id})
+
+class HairstyleRecipeListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
+    model = HairstyleRecipe
+    template_name = 'salooninventory/hairstylerecipe_list.html'
+    context_object_name = 'recipes'
+    version_dependencies = ('saloonservices.hairstyle', 'salooninventory.item')
+    paginate_by = 10
+    query_budget = 8
+
+    def get_queryset(self):
+        return HairstyleRecipe.objects.for_salon(self.salon).order_by('hairstyle__name', 'item__name', 'pk')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['salon'] = self.salon
+        return context
+
+class HairstyleRecipeCreateView(LoginRequiredMixin, SalonPermissionMixin, HtmxResponseMixin, CreateView):
+    model = HairstyleRecipe
+    form_class = HairstyleRecipeForm
+    template_name = 'salooninventory/hairstylerecipe_form.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        kwargs['salon'] = self.salon
+        return kwargs
+
+    def get_success_url(self):
+        return reverse_lazy('salooninventory:hairstylerecipe_list', kwargs={'salon_id': self.salon.id})
+
+    def get_htmx_response(self):
+        return f"<div class='alert alert-success'>{_('Recipe line added successfully.')}</div>"
+
+class HairstyleRecipeDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeleteView):
+    model = HairstyleRecipe
+    template_name = 'salooninventory/hairstylerecipe_confirm_delete.html'
+
+    def get_queryset(self):
+        return HairstyleRecipe.objects.filter(salon=self.salon)
+
+    def get_success_url(self):
+        return reverse_lazy('salooninventory:hairstylerecipe_list', kwargs={'salon_id': self.salon.id})
+
+class ShaveCloseView(LoginRequiredMixin, SalonPermissionMixin, FormView):
+    form_class = ShaveCloseForm
+    template_name = 'salooninventory/shave_close_form.html'
+
+    def form_valid(self, form):
+        shaves = Shave.objects.filter(salon=self.salon, date_shave=form.cleaned_data['date_shave'])
+        try:
+            completed = complete_shaves(shaves)
+        except ValidationError as e:
+            form.add_error(None, e)
+            return self.form_invalid(form)
+        message = _("%(count)d shaves completed and their recipe items recorded.") % {'count': len(completed)}
+        if self.request.htmx:
+            return HttpResponse(f"<div class='alert alert-success'>{message}</div>")
+        messages.success(self.request, message)
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        return reverse_lazy('salooninventory:itemused_list', kwargs={'salon_id': self.salon.id})
+
+class AvailableToPromiseView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, View):
+    """Available stock for the booking flow, optionally limited to one hairstyle's recipe."""
+
+    model = Item
+    version_dependencies = ('salooninventory.hairstylerecipe',)
+
+    def get(self, request, *args, **kwargs):
+        hairstyle = None
+        if request.GET.get('hairstyle'):
+            hairstyle_id = request.GET['hairstyle']
+            if hairstyle_id.isdigit():
+                hairstyle = Hairstyle.objects.filter(pk=hairstyle_id, salon=self.salon).first()
+            if hairstyle is None:
+                return JsonResponse({'error': _("Unknown hairstyle.")}, status=400)
+        items = get_available_to_promise(self.salon, hairstyle)
+        if hairstyle is None:
+            return JsonResponse({'items': list(items.values('id', 'name', 'current_stock', 'reserved_stock', 'available'))})
+        rows = list(items.values('id', 'name', 'available', 'quantity', 'shaves_available'))
+        return JsonResponse({
+            'hairstyle': hairstyle.pk,
+            'items': rows,
+            'shaves_available': min((row['shaves_available'] for row in rows), default=None),
+        })
+
+field_validator = FieldValidator(ItemForm, ItemUsedForm, ItemPurchaseForm, HairstyleRecipeForm)
+
 def validate_field(request):
-    field_name = request.POST.get('field_name')
-    field_value = request.POST.get('field_value')
-    form_class = request.POST.get('form_class')
-
-    form_classes = {
-        'ItemForm': ItemForm,
-        'ItemUsedForm': ItemUsedForm,
-        'ItemPurchaseForm': ItemPurchaseForm,
-    }
-
-    FormClass = form_classes.get(form_class)
-    if not FormClass:
-        return JsonResponse({'error': _("Invalid form class")}, status=400)
-
-    form = FormClass({field_name: field_value}, user=request.user)
-    form.is_valid()
-    
-    if field_name in form.errors:
-        return JsonResponse({'error': form.errors[field_name][0]}, status=400)
-    return JsonResponse({'success': _("Field is valid")})
\ No newline at end of file
+    return field_validator.respond(request)
\ No newline at end of file
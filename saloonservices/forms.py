@@ -6,26 +6,12 @@ from commonapp.models import Currency
 from saloon.models import Salon, Barber, Client
 from saloonfinance.models import CashRegister
 from config.permissions import is_salon_owner, is_assigned_barber
+from commonapp.forms import BootstrapFormMixin as BaseBootstrapFormMixin
+from config.choices import use_cached_choices
+from config.autocomplete import AutocompleteSelect
 
-class BootstrapFormMixin:
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        for field_name, field in self.fields.items():
-            if isinstance(field.widget, (forms.TextInput, forms.EmailInput, forms.DateInput, forms.NumberInput, forms.URLInput)):
-                field.widget.attrs.update({'class': 'form-control'})
-            elif isinstance(field.widget, forms.Select):
-                field.widget.attrs.update({'class': 'form-select'})
-            elif isinstance(field.widget, forms.Textarea):
-                field.widget.attrs.update({'class': 'form-control', 'rows': 3})
-            elif isinstance(field.widget, forms.CheckboxInput):
-                field.widget.attrs.update({'class': 'form-check-input'})
-            
-            # Add HTMX attributes for real-time validation
-            field.widget.attrs.update({
-                'hx-post': 'validate-field',
-                'hx-trigger': 'blur',
-                'hx-target': f'#{ field_name }-errors',
-            })
+class BootstrapFormMixin(BaseBootstrapFormMixin):
+    validate_fields = True
 
 class HairstyleForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
@@ -43,6 +29,7 @@ class HairstyleForm(BootstrapFormMixin, forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
+        use_cached_choices(self.fields['currency'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -56,12 +43,12 @@ class ShaveForm(BootstrapFormMixin, forms.ModelForm):
         model = Shave
         fields = ['barber', 'hairstyle', 'amount', 'currency', 'exchange_rate', 'client', 'cashregister', 'date_shave', 'salon', 'status']
         widgets = {
-            'barber': forms.Select(attrs={'hx-get': '/barbers/', 'hx-target': '#id_barber'}),
-            'hairstyle': forms.Select(attrs={'hx-get': '/hairstyles/', 'hx-target': '#id_hairstyle'}),
+            'barber': AutocompleteSelect('barber'),
+            'hairstyle': AutocompleteSelect('hairstyle'),
             'amount': forms.NumberInput(attrs={'step': '0.01'}),
             'currency': forms.Select(attrs={'hx-get': '/currencies/', 'hx-target': '#id_currency'}),
             'exchange_rate': forms.NumberInput(attrs={'step': '0.0001'}),
-            'client': forms.Select(attrs={'hx-get': '/clients/', 'hx-target': '#id_client'}),
+            'client': AutocompleteSelect('client'),
             'cashregister': forms.Select(attrs={'hx-get': '/cashregisters/', 'hx-target': '#id_cashregister'}),
             'date_shave': forms.DateInput(attrs={'type': 'date'}),
             'salon': forms.Select(attrs={'hx-get': '/salons/', 'hx-target': '#id_salon'}),
@@ -73,9 +60,10 @@ class ShaveForm(BootstrapFormMixin, forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['barber'].queryset = Barber.objects.filter(salon__owner=self.user)
-            self.fields['hairstyle'].queryset = Hairstyle.objects.filter(salon__owner=self.user)
-            self.fields['cashregister'].queryset = CashRegister.objects.filter(salon__owner=self.user)
+            self.fields['barber'].queryset = Barber.objects.for_owner(self.user)
+            self.fields['hairstyle'].queryset = Hairstyle.objects.for_owner(self.user)
+            self.fields['cashregister'].queryset = CashRegister.objects.for_owner(self.user)
+        use_cached_choices(self.fields['currency'])
 
     def clean(self):
         cleaned_data = super().clean()
@@ -109,19 +97,19 @@ class ShaveSearchForm(BootstrapFormMixin, forms.Form):
         label=_("Barber"),
         queryset=Barber.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/shaves/', 'hx-trigger': 'change', 'hx-target': '#shave-list'})
+        widget=AutocompleteSelect('barber', attrs={'hx-get': '/shaves/', 'hx-trigger': 'change', 'hx-target': '#shave-list'})
     )
     hairstyle = forms.ModelChoiceField(
         label=_("Hairstyle"),
         queryset=Hairstyle.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/shaves/', 'hx-trigger': 'change', 'hx-target': '#shave-list'})
+        widget=AutocompleteSelect('hairstyle', attrs={'hx-get': '/shaves/', 'hx-trigger': 'change', 'hx-target': '#shave-list'})
     )
     client = forms.ModelChoiceField(
         label=_("Client"),
         queryset=Client.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'hx-get': '/shaves/', 'hx-trigger': 'change', 'hx-target': '#shave-list'})
+        widget=AutocompleteSelect('client', attrs={'hx-get': '/shaves/', 'hx-trigger': 'change', 'hx-target': '#shave-list'})
     )
     start_date = forms.DateField(
         label=_("Start Date"),
@@ -151,16 +139,16 @@ class ShaveSearchForm(BootstrapFormMixin, forms.Form):
         super().__init__(*args, **kwargs)
         if self.user:
             self.fields['salon'].queryset = Salon.objects.filter(owner=self.user)
-            self.fields['barber'].queryset = Barber.objects.filter(salon__owner=self.user)
-            self.fields['hairstyle'].queryset = Hairstyle.objects.filter(salon__owner=self.user)
-            self.fields['client'].queryset = Client.objects.filter(salon__owner=self.user)
+            self.fields['barber'].queryset = Barber.objects.for_owner(self.user)
+            self.fields['hairstyle'].queryset = Hairstyle.objects.for_owner(self.user)
+            self.fields['client'].queryset = Client.objects.for_owner(self.user)
 
 class HairstyleTariffHistoryForm(BootstrapFormMixin, forms.ModelForm):
     class Meta:
         model = HairstyleTariffHistory
         fields = ['hairstyle', 'tariff', 'effective_date']
         widgets = {
-            'hairstyle': forms.Select(attrs={'hx-get': '/hairstyles/', 'hx-target': '#id_hairstyle'}),
+            'hairstyle': AutocompleteSelect('hairstyle'),
             'tariff': forms.NumberInput(attrs={'step': '0.01'}),
             'effective_date': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
         }
@@ -169,7 +157,7 @@ class HairstyleTariffHistoryForm(BootstrapFormMixin, forms.ModelForm):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         if self.user:
-            self.fields['hairstyle'].queryset = Hairstyle.objects.filter(salon__owner=self.user)
+            self.fields['hairstyle'].queryset = Hairstyle.objects.for_owner(self.user)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloon', '0003_barber_saloon_barb_salon_i_bc8b40_idx_and_more'),
+        ('saloonfinance', '0002_payment_saloonfinan_salon_i_106c41_idx_and_more'),
+        ('saloonservices', '0002_hairstyle_saloonservi_salon_i_dc80f9_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hairstyle',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='saloonservi_salon_i_0f6825_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shave',
+            index=models.Index(fields=['salon', 'modified_at', 'id'], name='saloonservi_salon_i_ec8c27_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:58
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_completed_shaves(apps, schema_editor):
+    Hairstyle = apps.get_model('saloonservices', 'Hairstyle')
+    Shave = apps.get_model('saloonservices', 'Shave')
+    completed = Shave.objects.filter(hairstyle=models.OuterRef('pk'), status='COMPLETED').order_by().values('hairstyle')
+    Hairstyle.objects.update(completed_shaves_count=Coalesce(
+        models.Subquery(completed.annotate(count=models.Count('pk')).values('count')), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloon', '0003_barber_saloon_barb_salon_i_bc8b40_idx_and_more'),
+        ('saloonservices', '0003_hairstyle_saloonservi_salon_i_0f6825_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hairstyle',
+            name='completed_shaves_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Completed shaves'),
+        ),
+        migrations.AddIndex(
+            model_name='hairstyle',
+            index=models.Index(fields=['-completed_shaves_count', 'id'], name='saloonservi_complet_001f5e_idx'),
+        ),
+        migrations.RunPython(count_completed_shaves, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:22
+
+import commonapp.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloon', '0004_deletionjob'),
+        ('saloonservices', '0004_hairstyle_completed_shaves_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hairstyle',
+            index=commonapp.models.PrefixSearchIndex('name', name='hairstyle_name_prefix_idx', scope=('salon',)),
+        ),
+    ]
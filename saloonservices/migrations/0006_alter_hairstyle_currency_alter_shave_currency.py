@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:25
+
+import commonapp.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commonapp', '0001_initial'),
+        ('saloonservices', '0005_hairstyle_hairstyle_name_prefix_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hairstyle',
+            name='currency',
+            field=models.ForeignKey(default=commonapp.models.Currency.get_default_pk, on_delete=django.db.models.deletion.SET_DEFAULT, to='commonapp.currency', verbose_name='Currency'),
+        ),
+        migrations.AlterField(
+            model_name='shave',
+            name='currency',
+            field=models.ForeignKey(default=commonapp.models.Currency.get_default_pk, on_delete=django.db.models.deletion.SET_DEFAULT, related_name='shaves', to='commonapp.currency', verbose_name='Currency'),
+        ),
+    ]
@@ -3,20 +3,34 @@
 from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from django.db.models.signals import post_save, pre_delete
+from django.db.models import F
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError, PermissionDenied
 
-from commonapp.models import TimestampMixin, Currency
+from commonapp.models import TimestampMixin, Currency, SalonQuerySet, PrefixSearchIndex
 from saloon.models import Salon, Barber, Client
 from saloonfinance.models import CashRegister
 from config.permissions import is_salon_owner, is_assigned_barber
+from config.metrics import timed_handler
+from config.pubsub import publish_on_commit
+from config.deletion import balance_reversal_skipped
+
+class HairstyleTariffHistoryQuerySet(SalonQuerySet):
+    salon_field = 'hairstyle__salon'
+    profiles = {
+        'list': {'select_related': ('hairstyle',)},
+        'detail': {'select_related': ('hairstyle__salon',)},
+        'export': {'select_related': ('hairstyle__salon',)},
+    }
 
 class HairstyleTariffHistory(TimestampMixin):
     hairstyle = models.ForeignKey('Hairstyle', on_delete=models.CASCADE, related_name='tariff_history', verbose_name=_("Hairstyle"))
     tariff = models.DecimalField(_("Tariff"), max_digits=19, decimal_places=2)
     effective_date = models.DateTimeField(_("Effective Date"), default=timezone.now)
 
+    objects = HairstyleTariffHistoryQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Hairstyle Tariff History")
         verbose_name_plural = _("Hairstyle Tariff Histories")
@@ -25,11 +39,22 @@ class HairstyleTariffHistory(TimestampMixin):
     def __str__(self):
         return f"{self.hairstyle.name} - {self.tariff} - {self.effective_date}"
 
+class HairstyleQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('currency',)},
+        'detail': {'select_related': ('currency', 'salon'), 'prefetch_related': ('tariff_history',)},
+        'export': {'select_related': ('currency', 'salon')},
+        'choices': {},
+    }
+
 class Hairstyle(TimestampMixin):
     name = models.CharField(_("Name"), max_length=255)
     current_tariff = models.DecimalField(_("Current Tariff"), max_digits=19, decimal_places=2, default=0)
-    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default, verbose_name=_("Currency"))
+    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default_pk, verbose_name=_("Currency"))
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='hairstyles', verbose_name=_("Salon"))
+    completed_shaves_count = models.PositiveIntegerField(_("Completed shaves"), default=0, editable=False)
+
+    objects = HairstyleQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -52,6 +77,17 @@ class Hairstyle(TimestampMixin):
                 effective_date=timezone.now()
             )
 
+    @classmethod
+    def adjust_completed_shaves(cls, counts):
+        """Add ``{hairstyle_id: delta}`` to the popularity counters, one UPDATE per hairstyle."""
+        for hairstyle_id, delta in counts.items():
+            if delta > 0:
+                cls.objects.filter(pk=hairstyle_id).update(completed_shaves_count=F('completed_shaves_count') + delta)
+            elif delta < 0:
+                cls.objects.filter(pk=hairstyle_id, completed_shaves_count__gte=-delta).update(
+                    completed_shaves_count=F('completed_shaves_count') + delta
+                )
+
     def get_tariff_at_date(self, date):
         tariff_history = self.tariff_history.filter(effective_date__lte=date).order_by('-effective_date').first()
         return tariff_history.tariff if tariff_history else self.current_tariff
@@ -60,6 +96,23 @@ class Hairstyle(TimestampMixin):
         verbose_name = _("Hairstyle")
         verbose_name_plural = _("Hairstyles")
         unique_together = ['name', 'salon']
+        indexes = [
+            models.Index(fields=['salon', 'name']),
+            PrefixSearchIndex('name', scope=['salon'], name='hairstyle_name_prefix_idx'),
+            models.Index(fields=['salon', 'modified_at', 'id']),
+            models.Index(fields=['-completed_shaves_count', 'id']),
+        ]
+
+class ShaveQuerySet(SalonQuerySet):
+    profiles = {
+        'list': {'select_related': ('barber__user', 'hairstyle', 'client__user', 'currency', 'cashregister')},
+        'detail': {
+            'select_related': ('barber__user', 'hairstyle', 'client__user', 'currency', 'cashregister', 'salon'),
+            'prefetch_related': ('items_used__item',),
+        },
+        'export': {'select_related': ('barber__user', 'hairstyle', 'client__user', 'currency', 'cashregister', 'salon')},
+        'choices': {'select_related': ('barber__user', 'hairstyle')},
+    }
 
 class Shave(TimestampMixin):
     STATUS_CHOICES = [
@@ -72,7 +125,7 @@ class Shave(TimestampMixin):
     barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='shaves', verbose_name=_("Barber"))
     hairstyle = models.ForeignKey(Hairstyle, on_delete=models.CASCADE, related_name='shaves', verbose_name=_("Hairstyle"))
     amount = models.DecimalField(_("Amount"), max_digits=19, decimal_places=2, default=0)
-    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default, related_name='shaves', verbose_name=_("Currency"))
+    currency = models.ForeignKey(Currency, on_delete=models.SET_DEFAULT, default=Currency.get_default_pk, related_name='shaves', verbose_name=_("Currency"))
     exchange_rate = models.DecimalField(_("Exchange rate"), max_digits=10, decimal_places=4, default=1.0)
     amount_in_default_currency = models.DecimalField(_("Amount in default currency"), max_digits=19, decimal_places=2, default=0)
     client = models.ForeignKey(Client, on_delete=models.SET_NULL, null=True, blank=True, related_name='shaves', verbose_name=_("Client"))
@@ -81,9 +134,25 @@ class Shave(TimestampMixin):
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='shaves', verbose_name=_("Salon"))
     status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default='SCHEDULED')
 
+    objects = ShaveQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.barber} - {self.hairstyle}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The hairstyle whose completed_shaves_count includes this row, if any.
+        if 'status' in field_names and 'hairstyle_id' in field_names:
+            instance._counted_hairstyle_id = instance.hairstyle_id if instance.status == 'COMPLETED' else None
+        # The stored status, so a completion is announced only when it happens.
+        if 'status' in field_names:
+            instance._saved_status = instance.status
+        # What the stock receivers last reserved or consumed for (salooninventory).
+        if {'status', 'hairstyle_id', 'salon_id'} <= set(field_names):
+            instance._stock_state = (instance.status, instance.hairstyle_id, instance.salon_id)
+        return instance
+
     def clean(self):
         if self.amount < 0:
             raise ValidationError(_("Amount cannot be negative."))
@@ -95,11 +164,12 @@ class Shave(TimestampMixin):
         if user:
             if not (is_salon_owner(user, self.salon) or is_assigned_barber(user, self.salon)):
                 raise PermissionDenied(_("You don't have permission to manage shaves for this salon."))
-        if self.currency != Currency.get_default():
+        if self.currency_id != Currency.get_default_pk():
             self.amount_in_default_currency = self.amount / self.exchange_rate
         else:
             self.amount_in_default_currency = self.amount
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     @property
     def total_amount(self):
@@ -122,16 +192,56 @@ class Shave(TimestampMixin):
     class Meta:
         verbose_name = _("Shave")
         verbose_name_plural = _("Shaves")
+        indexes = [models.Index(fields=['salon', 'modified_at', 'id'])]
 
 # Signals to update CashRegister balance
 @receiver(post_save, sender=Shave)
+@timed_handler
 def update_cashregister_balance(sender, instance, created, **kwargs):
     with transaction.atomic():
         if created and instance.status == 'COMPLETED':
             instance.cashregister.update_balance(instance.amount, 'INCOME')
 
 @receiver(pre_delete, sender=Shave)
+@timed_handler
 def revert_cashregister_balance(sender, instance, **kwargs):
+    if balance_reversal_skipped():
+        return
     with transaction.atomic():
         if instance.status == 'COMPLETED':
-            instance.cashregister.update_balance(instance.amount, 'EXPENSE')
\ No newline at end of file
+            instance.cashregister.update_balance(instance.amount, 'EXPENSE')
+
+def shave_completed_event(shave):
+    return {
+        'type': 'shave_completed', 'id': shave.pk, 'barber': shave.barber_id, 'hairstyle': shave.hairstyle_id,
+        'amount': shave.amount, 'date_shave': shave.date_shave,
+    }
+
+@receiver(post_save, sender=Shave)
+def publish_completed_shave(sender, instance, created, raw=False, **kwargs):
+    if raw or not (created or hasattr(instance, '_saved_status')):
+        # Loaded without status (only()/defer()): whether it just completed is unknown.
+        return
+    previous = None if created else instance._saved_status
+    instance._saved_status = instance.status
+    if instance.status == 'COMPLETED' and previous != 'COMPLETED':
+        publish_on_commit(instance.salon_id, lambda: shave_completed_event(instance))
+
+@receiver(post_save, sender=Shave)
+def count_completed_shave(sender, instance, created, raw=False, **kwargs):
+    if raw or not (created or hasattr(instance, '_counted_hairstyle_id')):
+        # Loaded without status or hairstyle (only()/defer()): what is counted is unknown.
+        return
+    counted = getattr(instance, '_counted_hairstyle_id', None)
+    current = instance.hairstyle_id if instance.status == 'COMPLETED' else None
+    if counted != current:
+        Hairstyle.adjust_completed_shaves({
+            hairstyle_id: delta for hairstyle_id, delta in ((counted, -1), (current, 1)) if hairstyle_id
+        })
+    instance._counted_hairstyle_id = current
+
+@receiver(post_delete, sender=Shave)
+def uncount_completed_shave(sender, instance, **kwargs):
+    counted = getattr(instance, '_counted_hairstyle_id', None)
+    if counted:
+        Hairstyle.adjust_completed_shaves({counted: -1})
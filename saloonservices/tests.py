@@ -1,3 +1,75 @@
+import datetime
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import CustomUser
+from commonapp.models import Currency
+from saloon.models import Salon, Barber, BarberType
+from saloonfinance.models import CashRegister
+from salooninventory.models import complete_shaves
+from .models import Hairstyle, Shave
+
+class CompletedShavesCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.owner = CustomUser.objects.create_user('owner@example.com', 'password')
+        cls.salon = Salon.objects.create(name='Main', owner=cls.owner)
+        barber_user = CustomUser.objects.create_user('barber@example.com', 'password', first_name='Bob', last_name='Barber')
+        cls.barber = Barber.objects.create(
+            user=barber_user, salon=cls.salon, barber_type=BarberType.objects.create(name='Senior'),
+            start_date=datetime.date(2024, 1, 1),
+        )
+        cls.register = CashRegister.objects.create(name='Front desk', salon=cls.salon, currency=Currency.get_default())
+        cls.fade = Hairstyle.objects.create(name='Fade', salon=cls.salon, current_tariff=10)
+        cls.buzz = Hairstyle.objects.create(name='Buzz', salon=cls.salon, current_tariff=8)
+
+    def setUp(self):
+        # The default currency is only cached once committed, which test transactions never are.
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.get_default()
+
+    def create_shave(self, **kwargs):
+        fields = {'barber': self.barber, 'hairstyle': self.fade, 'cashregister': self.register, 'salon': self.salon, 'amount': 10}
+        fields.update(kwargs)
+        return Shave.objects.create(**fields)
+
+    def assertCounts(self, fade, buzz):
+        self.assertEqual(
+            dict(Hairstyle.objects.filter(salon=self.salon).values_list('name', 'completed_shaves_count')),
+            {'Fade': fade, 'Buzz': buzz},
+        )
+
+    def test_saves_and_deletes_follow_the_completed_status(self):
+        shave = self.create_shave(status='COMPLETED')
+        self.create_shave()
+        self.assertCounts(1, 0)
+        shave.save()
+        self.assertCounts(1, 0)
+        shave = Shave.objects.get(pk=shave.pk)
+        shave.hairstyle = self.buzz
+        shave.save()
+        self.assertCounts(0, 1)
+        shave.status = 'CANCELLED'
+        shave.save()
+        self.assertCounts(0, 0)
+        shave.status = 'COMPLETED'
+        shave.save()
+        shave.delete()
+        self.assertCounts(0, 0)
+
+    def test_bulk_completion_counts_each_shave(self):
+        self.create_shave(status='COMPLETED')
+        for hairstyle in (self.fade, self.buzz):
+            self.create_shave(hairstyle=hairstyle)
+        complete_shaves(Shave.objects.filter(salon=self.salon))
+        self.assertCounts(2, 1)
+
+    def test_rows_loaded_without_status_are_left_alone(self):
+        shave = self.create_shave(status='COMPLETED')
+        partial = Shave.objects.only('id', 'amount').get(pk=shave.pk)
+        partial.amount = 12
+        partial.save()
+        self.assertCounts(1, 0)
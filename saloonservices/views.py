@@ -2,21 +2,28 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ValidationError
 from .models import Hairstyle, Shave, HairstyleTariffHistory
 from .forms import (
     HairstyleForm, ShaveForm, HairstyleSearchForm, ShaveSearchForm,
     HairstyleTariffHistoryForm
 )
-from saloon.models import Salon
 from config.permissions import is_salon_owner, is_assigned_barber
+from config.conditional import ConditionalGetMixin
+from config.fragments import HtmxFragmentMixin
+from config.salon_context import get_request_salon
+from config.validation import FieldValidator
 
 class HtmxResponseMixin:
     def form_valid(self, form):
-        self.object = form.save()
+        try:
+            self.object = form.save()
+        except ValidationError as e:
+            form.add_error(None, e)
+            return self.form_invalid(form)
         if self.request.htmx:
             return HttpResponse(self.get_htmx_response())
         return super().form_valid(form)
@@ -24,21 +31,29 @@ class HtmxResponseMixin:
     def get_htmx_response(self):
         return ""
 
+    def get_template_names(self):
+        # Modal dialogs only need the form itself, not the full page.
+        if self.request.htmx and not self.request.htmx.boosted:
+            return ['form_fragment.html']
+        return super().get_template_names()
+
 class SalonPermissionMixin:
     def dispatch(self, request, *args, **kwargs):
-        self.salon = get_object_or_404(Salon, pk=self.kwargs['salon_id'])
+        self.salon = get_request_salon(request, self.kwargs['salon_id'])
         if not (is_salon_owner(request.user, self.salon) or is_assigned_barber(request.user, self.salon)):
             raise PermissionDenied(_("You don't have permission to access this salon."))
         return super().dispatch(request, *args, **kwargs)
 
-class HairstyleListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class HairstyleListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
     model = Hairstyle
     template_name = 'saloonservices/hairstyle_list.html'
     context_object_name = 'hairstyles'
+    version_dependencies = ('commonapp.currency',)
     paginate_by = 10
+    query_budget = 9
 
     def get_queryset(self):
-        queryset = Hairstyle.objects.filter(salon=self.salon)
+        queryset = Hairstyle.objects.for_salon(self.salon)
         form = HairstyleSearchForm(self.request.GET, user=self.request.user)
         if form.is_valid():
             name = form.cleaned_data.get('name')
@@ -103,14 +118,17 @@ class HairstyleDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeleteView):
             return HttpResponse(f"<div class='alert alert-success'>{_('Hairstyle deleted successfully.')}</div>")
         return super().delete(request, *args, **kwargs)
 
-class ShaveListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class ShaveListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, HtmxFragmentMixin, ListView):
     model = Shave
     template_name = 'saloonservices/shave_list.html'
     context_object_name = 'shaves'
+    fragment_template_name = 'saloonservices/partials/shave_rows.html'
+    version_dependencies = ('saloon.barber', 'saloon.client', 'saloonservices.hairstyle', 'saloonfinance.cashregister', 'accounts.customuser', 'commonapp.currency')
     paginate_by = 10
+    query_budget = 12
 
     def get_queryset(self):
-        queryset = Shave.objects.filter(salon=self.salon)
+        queryset = Shave.objects.for_salon(self.salon)
         form = ShaveSearchForm(self.request.GET, user=self.request.user)
         if form.is_valid():
             barber = form.cleaned_data.get('barber')
@@ -135,7 +153,8 @@ class ShaveListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = ShaveSearchForm(self.request.GET, user=self.request.user)
+        if not self.is_fragment_request():
+            context['search_form'] = ShaveSearchForm(self.request.GET, user=self.request.user)
         context['salon'] = self.salon
         return context
 
@@ -190,14 +209,16 @@ class ShaveDeleteView(LoginRequiredMixin, SalonPermissionMixin, DeleteView):
             return HttpResponse(f"<div class='alert alert-success'>{_('Shave deleted successfully.')}</div>")
         return super().delete(request, *args, **kwargs)
 
-class HairstyleTariffHistoryListView(LoginRequiredMixin, SalonPermissionMixin, ListView):
+class HairstyleTariffHistoryListView(LoginRequiredMixin, SalonPermissionMixin, ConditionalGetMixin, ListView):
     model = HairstyleTariffHistory
     template_name = 'saloonservices/hairstyletariffhistory_list.html'
     context_object_name = 'tariff_histories'
+    version_dependencies = ('saloonservices.hairstyle',)
     paginate_by = 10
+    query_budget = 8
 
     def get_queryset(self):
-        return HairstyleTariffHistory.objects.filter(hairstyle__salon=self.salon)
+        return HairstyleTariffHistory.objects.for_salon(self.salon)
 
 class HairstyleTariffHistoryCreateView(LoginRequiredMixin, SalonPermissionMixin, HtmxResponseMixin, CreateView):
     model = HairstyleTariffHistory
@@ -215,24 +236,7 @@ class HairstyleTariffHistoryCreateView(LoginRequiredMixin, SalonPermissionMixin,
     def get_htmx_response(self):
         return f"<div class='alert alert-success'>{_('Hairstyle tariff history created successfully.')}</div>"
 
+field_validator = FieldValidator(HairstyleForm, ShaveForm, HairstyleTariffHistoryForm)
+
 def validate_field(request):
-    field_name = request.POST.get('field_name')
-    field_value = request.POST.get('field_value')
-    form_class = request.POST.get('form_class')
-
-    form_classes = {
-        'HairstyleForm': HairstyleForm,
-        'ShaveForm': ShaveForm,
-        'HairstyleTariffHistoryForm': HairstyleTariffHistoryForm,
-    }
-
-    FormClass = form_classes.get(form_class)
-    if not FormClass:
-        return JsonResponse({'error': _("Invalid form class")}, status=400)
-
-    form = FormClass({field_name: field_value}, user=request.user)
-    form.is_valid()
-    
-    if field_name in form.errors:
-        return JsonResponse({'error': form.errors[field_name][0]}, status=400)
-    return JsonResponse({'success': _("Field is valid")})
\ No newline at end of file
+    return field_validator.respond(request)
\ No newline at end of file